@@ -3,6 +3,15 @@ from smolagents import CodeAgent, ToolCallingAgent, Tool, LiteLLMModel
 from smolagents.memory import ActionStep
 from pydantic import BaseModel
 import asyncio
+import threading
+from .executor import AgentRunExecutor, get_agent_executor
+from .tools import bind_event_loop
+from ..services.token_budget import TokenBudget
+from ..telemetry.openai_metrics import llm_request_span, llm_turn_round_trips, record_usage
+from ..telemetry.stages import timed_stage
+
+# `endpoint` attribute of the LLM metrics recorded for smolagents runs
+AGENT_ENDPOINT = "bluapp_agent"
 
 class AgentConfig(BaseModel):
     """Configuration for BluApp agents"""
@@ -11,11 +20,29 @@ class AgentConfig(BaseModel):
     max_steps: int = 6
     planning_interval: Optional[int] = None
     verbosity_level: int = 1
+    history_policy: str = "drop_oldest"  # How chat_history is fitted: drop_oldest, summarize or truncate
+    history_max_tokens: Optional[int] = None  # Defaults to the model's context window
     
     model_config = {
         'protected_namespaces': ()  # This fixes the warning
     }
 
+class InstrumentedLiteLLMModel(LiteLLMModel):
+    """LiteLLMModel recording the same LLM request metrics as direct OpenAI calls"""
+
+    def __call__(self, *args, **kwargs):
+        with llm_request_span(self.model_id, AGENT_ENDPOINT) as (span, attributes):
+            message = super().__call__(*args, **kwargs)
+            record_usage(getattr(message.raw, "usage", None), attributes, span)
+        return message
+
+# Queue markers for a finished or failed agent run
+_RUN_DONE = object()
+
+class _RunFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
 class BluAppAgent:
     """
     Main agent class for BluApp that wraps smolagents functionality.
@@ -25,13 +52,16 @@ class BluAppAgent:
         self,
         config: AgentConfig,
         tools: List[Tool],
-        use_code_agent: bool = False
+        use_code_agent: bool = False,
+        executor: Optional[AgentRunExecutor] = None
     ):
         self.config = config
         self.tools = tools
+        # Dedicated pool for agent runs; defaults to the shared, settings-sized one
+        self.executor = executor
         
         # Initialize model
-        self.model = LiteLLMModel(
+        self.model = InstrumentedLiteLLMModel(
             model_id=config.model_name,
             api_key=config.api_key
         )
@@ -47,6 +77,14 @@ class BluAppAgent:
         )
 
         self.chat_history = []
+        # smolagents agents are not thread-safe; one run at a time, held by the worker thread
+        self._run_lock = threading.Lock()
+        # Bounds chat_history to the model's context window
+        self.history_budget = TokenBudget(
+            config.model_name,
+            policy=config.history_policy,
+            max_context_tokens=config.history_max_tokens
+        )
 
     async def process_message(
         self, 
@@ -73,16 +111,19 @@ class BluAppAgent:
             "content": message
         })
 
-        # Run agent in a separate thread to not block
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, self.agent.run, message)
-        
-        # Get steps from memory
-        steps = self.agent.memory.steps
-        
-        # Yield each step
-        for step in steps:
-            yield step
+        # Run the agent in a worker thread; steps are handed to the event loop as they finish
+        result = None
+        steps = 0
+        # No span: it would stay current across the yields to the caller
+        with timed_stage("agent_run", span=False, model=self.config.model_name):
+            async for item in self._stream_run(message):
+                if isinstance(item, ActionStep):
+                    # Each action step is one model call
+                    steps += 1
+                    yield item
+                else:
+                    result = item
+        llm_turn_round_trips.record(steps, {"model": self.config.model_name, "endpoint": AGENT_ENDPOINT})
             
         # Store final answer in chat history
         if result:
@@ -90,11 +131,72 @@ class BluAppAgent:
                 "role": "assistant",
                 "content": str(result)
             })
+        
+        # Drop or summarize old turns once the history outgrows the budget
+        self.chat_history = self.history_budget.fit(self.chat_history)
 
+    async def _stream_run(self, message: str) -> AsyncGenerator[object, None]:
+        """
+        Run `agent.run(message, stream=True)` in a worker thread, yielding each step
+        as soon as smolagents produces it, followed by the final answer.
+        
+        Runs go through the dedicated agent executor. Only steps of this run are
+        yielded. If the consumer stops early, the run is stopped after the step
+        in progress.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def run():
+            # Tools called by the agent run their service calls on this loop
+            bind_event_loop(loop)
+            try:
+                with self._run_lock:
+                    for item in self.agent.run(message, stream=True):
+                        loop.call_soon_threadsafe(queue.put_nowait, item)
+                        if stop.is_set():
+                            break
+                loop.call_soon_threadsafe(queue.put_nowait, _RUN_DONE)
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, _RunFailed(e))
+
+        # Waits for admission; raises AgentQueueFullError if the run is rejected
+        executor = self.executor or get_agent_executor()
+        worker = await executor.submit(run)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _RUN_DONE:
+                    break
+                if isinstance(item, _RunFailed):
+                    raise item.error
+                yield item
+        finally:
+            stop.set()
+            if not worker.done():
+                # Let the thread finish its current step without blocking the loop
+                worker.add_done_callback(lambda f: f.exception())
+        
     def get_agent_logs(self) -> List[ActionStep]:
         """Get the agent's execution logs"""
         return self.agent.memory.steps
 
     def clear_history(self):
         """Clear chat history"""
-        self.chat_history = [] 
\ No newline at end of file
+        self.chat_history = []
+
+    @property
+    def busy(self) -> bool:
+        """True while a run is still executing in a worker thread"""
+        return self._run_lock.locked()
+
+    def reset(self):
+        """Clear history, memory and variables so the agent can serve another caller"""
+        self.clear_history()
+        self.agent.memory.reset()
+        self.agent.monitor.reset()
+        self.agent.state.clear()
+        python_executor = getattr(self.agent, "python_executor", None)
+        if python_executor is not None and hasattr(python_executor, "state"):
+            python_executor.state = {} 
\ No newline at end of file
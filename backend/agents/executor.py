@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import time
+from ..config import get_settings
+from ..telemetry.agent_metrics import (
+    agent_queue_depth,
+    agent_queue_wait,
+    agent_run_duration,
+    agent_runs_active,
+    agent_runs_rejected,
+)
+
+QUEUE_POLICIES = ("reject", "wait")
+
+class AgentQueueFullError(Exception):
+    """Raised when an agent run is not admitted: the queue is full or the wait timed out"""
+
+class AgentRunExecutor:
+    """
+    Dedicated, sized thread pool for blocking agent runs.
+
+    At most `max_workers` runs execute at once and at most `max_queue_depth`
+    more wait for a worker. When the queue is full, the "reject" policy fails
+    fast with AgentQueueFullError while "wait" holds the caller back until
+    there is room. Runs that have not started within `queue_timeout` seconds
+    are rejected either way.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue_depth: int = 16,
+        policy: str = "reject",
+        queue_timeout: Optional[float] = 30.0
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown agent queue policy: {policy}")
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.policy = policy
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Runs admitted (running or queued), and runs holding a worker
+        self._admitted = asyncio.Semaphore(max_workers + max_queue_depth)
+        self._workers = asyncio.Semaphore(max_workers)
+        self._queued = 0
+        self._running = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self._running, "queued": self._queued}
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent-run")
+        return self._pool
+
+    def _reject(self, reason: str, message: str) -> None:
+        agent_runs_rejected.add(1, {"reason": reason})
+        raise AgentQueueFullError(message)
+
+    def _run_done(self) -> None:
+        self._running -= 1
+        self._workers.release()
+        self._admitted.release()
+
+    async def submit(self, func: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        """
+        Wait for admission and a free worker, then start `func(*args)` on it.
+
+        Returns:
+            A future for the running call; its worker stays busy until `func`
+            returns, even if the caller stops waiting
+        """
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        deadline = None if self.queue_timeout is None else loop.time() + self.queue_timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(deadline - loop.time(), 0)
+
+        if self._admitted.locked() and self.policy == "reject":
+            self._reject("queue_full", "Agent queue is full, please retry later")
+        try:
+            await asyncio.wait_for(self._admitted.acquire(), remaining())
+        except asyncio.TimeoutError:
+            self._reject("timeout", f"No room in the agent queue after {self.queue_timeout}s")
+
+        self._queued += 1
+        agent_queue_depth.add(1)
+        try:
+            await asyncio.wait_for(self._workers.acquire(), remaining())
+        except BaseException as e:
+            self._admitted.release()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout", f"No agent worker became available within {self.queue_timeout}s")
+            raise
+        finally:
+            self._queued -= 1
+            agent_queue_depth.add(-1)
+
+        agent_queue_wait.record((time.perf_counter() - queued_at) * 1000)
+        self._running += 1
+        try:
+            future = self._get_pool().submit(func, *args)
+        except BaseException:
+            self._run_done()
+            raise
+
+        agent_runs_active.add(1)
+        started_at = time.perf_counter()
+
+        def on_done(_future):
+            agent_run_duration.record((time.perf_counter() - started_at) * 1000)
+            agent_runs_active.add(-1)
+            # Released only when the thread is really done, so abandoned runs still count
+            try:
+                loop.call_soon_threadsafe(self._run_done)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        future.add_done_callback(on_done)
+        return asyncio.wrap_future(future)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run `func(*args)` on a worker and await its result"""
+        return await (await self.submit(func, *args))
+
+    def shutdown(self) -> None:
+        """Stop the pool; runs already executing finish in the background"""
+        if self._pool is not None:
+            logging.info("Shutting down agent run pool")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+_agent_executor: Optional[AgentRunExecutor] = None
+
+def get_agent_executor() -> AgentRunExecutor:
+    """Return the process-wide agent run executor, sized from settings on first use"""
+    global _agent_executor
+    if _agent_executor is None:
+        settings = get_settings()
+        _agent_executor = AgentRunExecutor(
+            max_workers=settings.agent_max_workers,
+            max_queue_depth=settings.agent_max_queue_depth,
+            policy=settings.agent_queue_policy,
+            queue_timeout=settings.agent_queue_timeout
+        )
+    return _agent_executor
+
+def shutdown_agent_executor() -> None:
+    if _agent_executor is not None:
+        _agent_executor.shutdown()
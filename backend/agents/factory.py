@@ -1,7 +1,7 @@
 from typing import List, Optional
 from enum import Enum
 from .base import BluAppAgent, AgentConfig
-from .tools import generate_prompt, analyze_document, store_prompt
+from .tools import generate_prompt, analyze_document, analyze_documents, store_prompt
 from smolagents import Tool
 
 class AgentType(Enum):
@@ -18,6 +18,7 @@ def create_agent(
     base_tools = [
         generate_prompt,
         analyze_document,
+        analyze_documents,
         store_prompt
     ]
     
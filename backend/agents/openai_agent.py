@@ -1,7 +1,22 @@
-from openai import AsyncOpenAI
 import json
-from typing import Dict, Optional
-from ..telemetry.openai_metrics import trace_openai_request
+import logging
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+from openai.types.chat import ChatCompletion
+from .response_cache import ResponseCache
+from .retrieval import DocumentRetriever
+from .session import ChatSession
+from ..services.openai_clients import get_openai_client
+from ..services.token_budget import TokenBudget
+from ..telemetry.openai_metrics import (
+    create_chat_completion,
+    llm_cache_requests,
+    llm_tool_duration,
+    llm_turn_round_trips,
+)
+from ..telemetry.stages import timed, timed_stage
+
+logger = logging.getLogger(__name__)
 
 # Define function definitions to be passed to the Chat API.
 # Here we define a function "analyze_document" that can be called by the model.
@@ -38,24 +53,84 @@ async def analyze_document_func(doc_content: str, instruction: str) -> str:
     return f"Analyzed document based on instruction: '{instruction}'. Document excerpt: {doc_content[:100]}..."
 
 class OpenAIAgent:
-    def __init__(self, model_name: str, api_key: str, system_prompt: Optional[str] = None):
+    def __init__(
+        self,
+        model_name: str,
+        api_key: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        response_cache: Optional[ResponseCache] = None,
+        retriever: Optional[DocumentRetriever] = None,
+        token_budget: Optional[TokenBudget] = None,
+        endpoint: str = "openai_agent"
+    ):
         self.model_name = model_name
         self.api_key = api_key
-        # Initialize the async client from OpenAI's new API
-        self.async_client = AsyncOpenAI(api_key=api_key)
+        # Shared process-wide client, so connections are pooled across agents
+        self.async_client = get_openai_client(api_key)
         self.system_prompt = system_prompt or "You are a helpful assistant."
+        self.temperature = temperature
+        # Opt-in exact-match cache; only used for deterministic requests
+        self.response_cache = response_cache
+        # Reduces large documents to the chunks relevant to the question
+        self.retriever = retriever
+        # Fits prompts into the model's context window
+        self.token_budget = token_budget
+        # Reported as the `endpoint` attribute of LLM metrics
+        self.endpoint = endpoint
+    
+    async def _call_openai(self, messages, tools: Optional[List[Dict]] = FUNCTION_DEFINITIONS, **kwargs):
+        """
+        Make an OpenAI API call, served from the response cache when possible.
+        Pass `tools=None` to disable function calling.
+        """
+        if self.token_budget:
+            with timed_stage("fit_prompt"):
+                messages = self.token_budget.fit(messages)
+        if tools:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = "auto"
+        if self.temperature is not None:
+            kwargs.setdefault("temperature", self.temperature)
+        
+        with timed_stage("llm_call", model=self.model_name, stream=bool(kwargs.get("stream"))):
+            return await self._cached_completion(messages, **kwargs)
     
-    @trace_openai_request
-    async def _call_openai(self, messages, **kwargs):
-        """Make an OpenAI API call with telemetry."""
-        return await self.async_client.chat.completions.create(
+    async def _cached_completion(self, messages, **kwargs):
+        """Return the cached completion for a deterministic request, or ask the API"""
+        cache = self.response_cache
+        if cache is None:
+            return await self._create_completion(messages, **kwargs)
+        
+        if not cache.is_cacheable(kwargs):
+            cache.record_bypass()
+            llm_cache_requests.add(1, {"result": "bypass", "model": self.model_name})
+            return await self._create_completion(messages, **kwargs)
+        
+        key = cache.make_key(self.model_name, messages, kwargs)
+        cached = await cache.get(key)
+        if cached is not None:
+            llm_cache_requests.add(1, {"result": "hit", "model": self.model_name})
+            return ChatCompletion.model_validate(cached)
+        
+        llm_cache_requests.add(1, {"result": "miss", "model": self.model_name})
+        response = await self._create_completion(messages, **kwargs)
+        await cache.put(key, response.model_dump(mode="json"))
+        return response
+    
+    async def _create_completion(self, messages, **kwargs):
+        """Send a chat completion request with telemetry."""
+        return await create_chat_completion(
+            self.async_client,
+            self.endpoint,
             model=self.model_name,
             messages=messages,
-            tools=FUNCTION_DEFINITIONS,
-            tool_choice="auto",
             **kwargs
         )
     
+    def _record_round_trips(self, count: int) -> None:
+        llm_turn_round_trips.record(count, {"model": self.model_name, "endpoint": self.endpoint})
+    
     async def get_completion(self, messages, **kwargs):
         """Get a completion from OpenAI with telemetry."""
         try:
@@ -65,32 +140,113 @@ class OpenAIAgent:
             logger.error(f"Error getting completion: {str(e)}")
             raise
     
-    async def process_message(self, message: str, context: Optional[Dict] = None) -> str:
+    @timed("build_prompt")
+    async def _build_messages(self, session: ChatSession, message: str, context: Optional[Dict] = None) -> List[Dict]:
         """
-        Process a user message using OpenAI's ChatCompletion API with function calling.
+        Build the conversation messages for a user message: the session's stable
+        prefix and history, followed by the new user message.
         """
-        # Build the conversation messages.
-        messages = [{"role": "system", "content": self.system_prompt}]
-        
-        # If the context includes document information, add it as a system message.
+        # If the context includes document information, attach it to the session.
         if context and "document" in context:
-            doc = context["document"]
-            messages.append({
-                "role": "system",
-                "content": f"Document information: {doc.get('text', '')}"
-            })
+            doc_text = context["document"].get("text", "")
+            # Large documents are only sent as excerpts relevant to each question
+            inline = not (self.retriever and len(doc_text) > self.retriever.min_chars)
+            session.set_document(doc_text, context["document"].get("type"), inline=inline)
         
-        # Append the user message.
-        messages.append({"role": "user", "content": message})
+        content = message
+        if session.document_text is not None and not session.document_inline and self.retriever:
+            # Excerpts change per question, so they travel with the user turn
+            # instead of the prefix, which stays byte-stable for prompt caching
+            excerpts = await self.retriever.select_context(session.document_text, message)
+            content = f"Relevant document excerpts:\n{excerpts}\n\nQuestion: {message}"
         
-        # Call OpenAI ChatCompletion with function calling enabled.
-        response = await self.async_client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            tools=FUNCTION_DEFINITIONS,
-            tool_choice="auto"
+        messages = session.history()
+        messages.append({"role": "user", "content": content})
+        return messages
+    
+    async def _run_tool_call(
+        self,
+        messages: List[Dict],
+        call_id: str,
+        tool_name: str,
+        arguments: str,
+        content: Optional[str] = None
+    ) -> bool:
+        """
+        Execute a tool call requested by the model and append the call and its result to `messages`.
+        `content` is any text the model sent along with the call.
+        
+        Returns:
+            False if the tool is unknown, True otherwise
+        """
+        if tool_name != "analyze_document":
+            return False
+        
+        try:
+            tool_args = json.loads(arguments)
+        except Exception:
+            tool_args = {}
+        
+        doc_content = tool_args.get("doc_content", "")
+        instruction = tool_args.get("instruction", "")
+        # Execute the local function.
+        start_time = time.perf_counter()
+        with timed_stage("tool_call", tool=tool_name):
+            func_result = await analyze_document_func(doc_content, instruction)
+        llm_tool_duration.record(
+            (time.perf_counter() - start_time) * 1000,
+            {"model": self.model_name, "endpoint": self.endpoint, "tool": tool_name}
         )
         
+        # Add the function call message and its result to the conversation.
+        messages.append({
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {
+                    "id": call_id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_name,
+                        "arguments": json.dumps(tool_args)
+                    }
+                }
+            ]
+        })
+        messages.append({
+            "role": "tool",
+            "content": func_result,
+            "tool_call_id": call_id
+        })
+        return True
+    
+    async def process_message(
+        self,
+        message: str,
+        context: Optional[Dict] = None,
+        session: Optional[ChatSession] = None
+    ) -> str:
+        """
+        Process a user message using OpenAI's ChatCompletion API with function calling.
+        
+        Args:
+            message: The user's message
+            context: Optional context like document info
+            session: Conversation to continue; without one the message is answered on its own
+        """
+        session = session or ChatSession(system_prompt=self.system_prompt)
+        async with session.lock:
+            messages = await self._build_messages(session, message, context)
+            turn_start = len(messages) - 1
+            answer = await self._answer(messages)
+            session.add_turn(messages[turn_start:] + [{"role": "assistant", "content": answer}])
+            return answer
+    
+    async def _answer(self, messages: List[Dict]) -> str:
+        """Get the answer for `messages`, running a requested tool; tool messages are appended to `messages`."""
+        # Call OpenAI ChatCompletion with function calling enabled.
+        response = await self._call_openai(messages)
+        
         message_obj = response.choices[0].message
 
         # Check if the model wants to call a tool
@@ -98,46 +254,90 @@ class OpenAIAgent:
             tool_call = message_obj.tool_calls[0]
             tool_name = tool_call.function.name
             
-            try:
-                tool_args = json.loads(tool_call.function.arguments)
-            except Exception:
-                tool_args = {}
-            
-            if tool_name == "analyze_document":
-                doc_content = tool_args.get("doc_content", "")
-                instruction = tool_args.get("instruction", "")
-                # Execute the local function.
-                func_result = await analyze_document_func(doc_content, instruction)
-                
-                # Add the function call message and its result to the conversation.
-                messages.append({
-                    "role": "assistant",
-                    "content": None,
-                    "tool_calls": [
-                        {
-                            "id": tool_call.id,
-                            "type": "function",
-                            "function": {
-                                "name": tool_name,
-                                "arguments": json.dumps(tool_args)
-                            }
-                        }
-                    ]
-                })
-                messages.append({
-                    "role": "tool",
-                    "content": func_result,
-                    "tool_call_id": tool_call.id
-                })
-                
-                # Re-call the API to get the final answer.
-                second_response = await self.async_client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages
-                )
-                return second_response.choices[0].message.content or ""
-            else:
+            if not await self._run_tool_call(
+                messages, tool_call.id, tool_name, tool_call.function.arguments, message_obj.content
+            ):
+                self._record_round_trips(1)
                 return f"Unknown tool call: {tool_name}"
+            
+            # Re-call the API to get the final answer.
+            second_response = await self._call_openai(messages, tools=None)
+            self._record_round_trips(2)
+            return second_response.choices[0].message.content or ""
         else:
             # No tool was called. Return the assistant's reply.
-            return message_obj.content or "" 
\ No newline at end of file
+            self._record_round_trips(1)
+            return message_obj.content or ""
+    
+    async def stream_message(
+        self,
+        message: str,
+        context: Optional[Dict] = None,
+        session: Optional[ChatSession] = None
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Process a user message like `process_message`, streaming the answer as it is generated.
+        
+        Yields:
+            Event dicts: {"type": "delta", "content": ...} for each token delta,
+            {"type": "tool_call", "name": ...} when a tool is executed, and a final
+            {"type": "message", "content": ...} with the complete answer
+        """
+        session = session or ChatSession(system_prompt=self.system_prompt)
+        async with session.lock:
+            messages = await self._build_messages(session, message, context)
+            turn_start = len(messages) - 1
+            answer = ""
+            async for event in self._stream_answer(messages):
+                if event["type"] == "message":
+                    answer = event["content"]
+                yield event
+            session.add_turn(messages[turn_start:] + [{"role": "assistant", "content": answer}])
+    
+    async def _stream_answer(self, messages: List[Dict]) -> AsyncGenerator[Dict, None]:
+        """Streaming counterpart of `_answer`, yielding the events of `stream_message`."""
+        parts: List[str] = []
+        # Tool calls arrive as fragments keyed by index: id and name first, then argument chunks
+        tool_calls: Dict[int, Dict[str, str]] = {}
+        stream = await self._call_openai(messages, stream=True)
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                parts.append(delta.content)
+                yield {"type": "delta", "content": delta.content}
+            for fragment in delta.tool_calls or []:
+                call = tool_calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    call["name"] += fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    call["arguments"] += fragment.function.arguments
+        
+        if tool_calls:
+            # Like process_message, only the first tool call is executed
+            tool_call = tool_calls[min(tool_calls)]
+            yield {"type": "tool_call", "name": tool_call["name"]}
+            if not await self._run_tool_call(
+                messages, tool_call["id"], tool_call["name"], tool_call["arguments"], "".join(parts) or None
+            ):
+                self._record_round_trips(1)
+                notice = f"Unknown tool call: {tool_call['name']}"
+                parts.append(notice)
+                yield {"type": "delta", "content": notice}
+                yield {"type": "message", "content": "".join(parts)}
+                return
+            
+            # Stream the final answer after the tool result; text sent before the
+            # tool call was already streamed, so the final message keeps it.
+            stream = await self._call_openai(messages, tools=None, stream=True)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    parts.append(content)
+                    yield {"type": "delta", "content": content}
+        
+        self._record_round_trips(2 if tool_calls else 1)
+        yield {"type": "message", "content": "".join(parts)}
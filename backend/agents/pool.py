@@ -0,0 +1,108 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+from .base import AgentConfig, BluAppAgent
+from .factory import AgentType, create_agent
+from ..config import get_settings
+from ..telemetry.agent_metrics import agent_pool_checkouts, agent_pool_idle, agent_pool_in_use
+
+PoolKey = Tuple[str, str]
+
+class AgentPool:
+    """
+    Pool of pre-built agents keyed by agent type and config.
+
+    Building an agent (model client, tool schemas, system prompt) is kept out
+    of the request path: agents are checked out, reset on check-in and reused.
+    Up to `max_idle` idle agents are kept per key; a miss builds a new agent in
+    a worker thread.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._idle: Dict[PoolKey, List[BluAppAgent]] = {}
+        self._keys: Dict[int, PoolKey] = {}
+
+    @staticmethod
+    def make_key(agent_type: AgentType, config: AgentConfig) -> PoolKey:
+        return agent_type.value, config.model_dump_json()
+
+    def _build(self, agent_type: AgentType, config: AgentConfig) -> BluAppAgent:
+        return create_agent(agent_type, config)
+
+    async def checkout(self, agent_type: AgentType, config: AgentConfig) -> BluAppAgent:
+        """Take an idle agent for `config`, building one if none is available"""
+        key = self.make_key(agent_type, config)
+        idle = self._idle.get(key)
+        if idle:
+            agent = idle.pop()
+            agent_pool_idle.add(-1, {"agent_type": agent_type.value})
+            agent_pool_checkouts.add(1, {"result": "hit", "agent_type": agent_type.value})
+        else:
+            agent = await asyncio.to_thread(self._build, agent_type, config)
+            agent_pool_checkouts.add(1, {"result": "miss", "agent_type": agent_type.value})
+        self._keys[id(agent)] = key
+        agent_pool_in_use.add(1, {"agent_type": agent_type.value})
+        return agent
+
+    def checkin(self, agent: BluAppAgent) -> None:
+        """Reset `agent` and return it to the pool; busy or surplus agents are dropped"""
+        key = self._keys.pop(id(agent), None)
+        if key is None:
+            return
+        agent_type = key[0]
+        agent_pool_in_use.add(-1, {"agent_type": agent_type})
+        # A run abandoned mid-way is still executing; it cannot be reset safely
+        if agent.busy:
+            return
+        idle = self._idle.setdefault(key, [])
+        if len(idle) >= self.max_idle:
+            return
+        try:
+            agent.reset()
+        except Exception as e:
+            logging.error(f"Error resetting agent, dropping it: {str(e)}")
+            return
+        idle.append(agent)
+        agent_pool_idle.add(1, {"agent_type": agent_type})
+
+    @asynccontextmanager
+    async def agent(self, agent_type: AgentType, config: AgentConfig) -> AsyncIterator[BluAppAgent]:
+        """Check out an agent for the duration of the block"""
+        agent = await self.checkout(agent_type, config)
+        try:
+            yield agent
+        finally:
+            self.checkin(agent)
+
+    async def warm(self, agent_type: AgentType, config: AgentConfig, count: int) -> None:
+        """Pre-build agents for `config` until `count` are idle"""
+        key = self.make_key(agent_type, config)
+        missing = min(count, self.max_idle) - len(self._idle.get(key, []))
+        if missing <= 0:
+            return
+        agents = await asyncio.gather(*(asyncio.to_thread(self._build, agent_type, config) for _ in range(missing)))
+        self._idle.setdefault(key, []).extend(agents)
+        agent_pool_idle.add(len(agents), {"agent_type": agent_type.value})
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "idle": sum(len(agents) for agents in self._idle.values()),
+            "in_use": len(self._keys)
+        }
+
+    def clear(self) -> None:
+        """Drop all idle agents"""
+        for key, agents in self._idle.items():
+            agent_pool_idle.add(-len(agents), {"agent_type": key[0]})
+        self._idle.clear()
+
+_agent_pool: Optional[AgentPool] = None
+
+def get_agent_pool() -> AgentPool:
+    """Return the process-wide agent pool, sized from settings on first use"""
+    global _agent_pool
+    if _agent_pool is None:
+        _agent_pool = AgentPool(max_idle=get_settings().agent_pool_max_idle)
+    return _agent_pool
@@ -0,0 +1,120 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+class ResponseCache:
+    """
+    Exact-match cache for chat completion responses.
+
+    Keys are a canonical hash of the model, messages, tools and sampling
+    parameters. Entries live in an in-memory LRU with a TTL, optionally backed
+    by a directory of JSON files shared across restarts and workers.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def is_cacheable(params: Dict[str, Any]) -> bool:
+        """Only deterministic, non-streaming requests (temperature 0, single choice) are cached"""
+        if params.get("stream"):
+            return False
+        if params.get("n", 1) != 1:
+            return False
+        return params.get("temperature") == 0
+
+    @staticmethod
+    def make_key(model: str, messages: Any, params: Dict[str, Any]) -> str:
+        """Build a canonical hash of the request; `params` includes tools and sampling settings"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Return the cached response payload, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None or time.time() - entry[0] > self.ttl:
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def put(self, key: str, response: Dict) -> None:
+        """Store a response payload (a JSON-serialisable dict)"""
+        entry = (time.time(), response)
+        self._remember(key, entry)
+        if self.cache_dir:
+            try:
+                await asyncio.to_thread(self._write_disk, key, entry)
+            except OSError as e:
+                logging.error(f"Error writing response cache entry: {str(e)}")
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return cache counters and the hit ratio of cacheable lookups"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "entries": len(self._entries),
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        """Clear the in-memory entries"""
+        self._entries.clear()
+
+    def _remember(self, key: str, entry: Tuple[float, Dict]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["created"], data["response"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, entry: Tuple[float, Dict]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": entry[0], "response": entry[1]}, f)
+        os.replace(tmp_path, path)
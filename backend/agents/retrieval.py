@@ -0,0 +1,139 @@
+from typing import List, Tuple
+from collections import Counter, OrderedDict
+import asyncio
+import hashlib
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for indexing and queries"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> List[str]:
+    """
+    Split text into chunks of at most `chunk_size` characters.
+
+    Paragraphs are packed together where they fit; oversized paragraphs are split
+    on whitespace. Each chunk starts with up to `overlap` characters from the end
+    of the previous one so facts spanning a boundary stay retrievable.
+    """
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > chunk_size:
+            cut = paragraph.rfind(" ", 0, chunk_size)
+            cut = cut if cut > 0 else chunk_size
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > chunk_size:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            # Start the overlap at a word boundary
+            space = tail.find(" ")
+            tail = tail[space + 1:] if space >= 0 else tail
+            current = f"{tail}\n\n{piece}" if tail and len(tail) + len(piece) + 2 <= chunk_size else piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+class BM25Index:
+    """In-process Okapi BM25 index over a list of chunks"""
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self._lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(chunks)) if chunks else 0.0
+        doc_freqs: Counter = Counter()
+        for freqs in self._term_freqs:
+            doc_freqs.update(freqs.keys())
+        total = len(chunks)
+        self._idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in doc_freqs.items()
+        }
+
+    def search(self, query: str, top_k: int = 4) -> List[Tuple[int, float]]:
+        """Return (chunk_index, score) pairs for the best matching chunks, best first"""
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        scores: List[Tuple[int, float]] = []
+        for index, freqs in enumerate(self._term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / (self._avg_length or 1))
+            for term in terms:
+                freq = freqs.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((index, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:top_k]
+
+class DocumentRetriever:
+    """
+    Selects the chunks of a document most relevant to a question.
+
+    Chunk lists and indexes are cached per document hash, so follow-up
+    questions about the same document skip re-indexing.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+        top_k: int = 4,
+        min_chars: int = 8000,
+        max_documents: int = 64
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.top_k = top_k
+        self.min_chars = min_chars
+        self.max_documents = max_documents
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+
+    def _build_index(self, text: str) -> BM25Index:
+        return BM25Index(chunk_text(text, self.chunk_size, self.chunk_overlap))
+
+    async def get_index(self, text: str) -> BM25Index:
+        """Return the cached index for `text`, building it off the event loop on a miss"""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        index = self._indexes.get(key)
+        if index is None:
+            index = await asyncio.to_thread(self._build_index, text)
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_documents:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(key)
+        return index
+
+    async def select_context(self, text: str, question: str) -> str:
+        """
+        Return the document context to send to the model.
+
+        Short documents are returned unchanged; longer ones are reduced to the
+        top-k chunks for `question`, kept in document order. If nothing matches,
+        the beginning of the document is used.
+        """
+        if len(text) <= self.min_chars:
+            return text
+
+        index = await self.get_index(text)
+        matches = index.search(question, self.top_k)
+        selected = sorted(i for i, _ in matches) or list(range(min(self.top_k, len(index.chunks))))
+        return "\n\n[...]\n\n".join(index.chunks[i] for i in selected)
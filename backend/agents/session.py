@@ -0,0 +1,139 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import asyncio
+import time
+import uuid
+
+class ChatSession:
+    """
+    Conversation state for one chat, appended to turn by turn.
+
+    The system prompt and document block are built once and kept byte-for-byte
+    identical at the front of every request, and past turns are replayed exactly
+    as they were sent, so provider-side prompt-prefix caching can reuse them.
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        system_prompt: str = "You are a helpful assistant.",
+        max_messages: int = 100,
+        max_chars: int = 200_000
+    ):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        # Serialises turns when several connections share the session
+        self.lock = asyncio.Lock()
+        self.document_text: Optional[str] = None
+        self.document_type: Optional[str] = None
+        self.document_inline = False
+        self._prefix: List[Dict] = [{"role": "system", "content": system_prompt}]
+        self._turns: List[List[Dict]] = []
+        self._turn_chars = 0
+
+    @property
+    def system_prompt(self) -> str:
+        return self._prefix[0]["content"]
+
+    @property
+    def turn_count(self) -> int:
+        return len(self._turns)
+
+    def set_document(self, text: str, file_type: Optional[str] = None, inline: bool = True) -> None:
+        """
+        Attach a document to the session.
+
+        Inline documents become a system block right after the system prompt.
+        Otherwise the text is only kept for retrieval, and excerpts are sent with
+        each question so the prefix does not change from turn to turn.
+        """
+        self.document_text = text
+        self.document_type = file_type
+        self.document_inline = inline
+        self._prefix = self._prefix[:1]
+        if inline:
+            self._prefix.append({"role": "system", "content": f"Document information: {text}"})
+
+    def history(self) -> List[Dict]:
+        """The stable prefix followed by all retained turns"""
+        return self._prefix + [message for turn in self._turns for message in turn]
+
+    def add_turn(self, messages: List[Dict]) -> None:
+        """Append one completed turn (user message, tool calls and results, answer)"""
+        self._turns.append(list(messages))
+        self._turn_chars += _count_chars(messages)
+        self.last_active = time.time()
+        self._enforce_bounds()
+
+    def clear(self) -> None:
+        """Drop all turns, keeping the system prompt and document"""
+        self._turns = []
+        self._turn_chars = 0
+
+    def _enforce_bounds(self) -> None:
+        """Drop whole turns, oldest first, until the session fits its memory bound"""
+        message_count = sum(len(turn) for turn in self._turns)
+        while len(self._turns) > 1 and (message_count > self.max_messages or self._turn_chars > self.max_chars):
+            dropped = self._turns.pop(0)
+            message_count -= len(dropped)
+            self._turn_chars -= _count_chars(dropped)
+
+def _count_chars(messages: List[Dict]) -> int:
+    return sum(len(message["content"]) for message in messages if isinstance(message.get("content"), str))
+
+class SessionStore:
+    """
+    In-memory chat sessions, resumable by id.
+
+    Sessions expire after `ttl` seconds of inactivity; beyond `max_sessions`
+    the least recently used session is evicted.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl: float = 3600.0,
+        max_messages: int = 100,
+        max_chars: int = 200_000
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def create(self, system_prompt: str = "You are a helpful assistant.") -> ChatSession:
+        session = ChatSession(
+            system_prompt=system_prompt,
+            max_messages=self.max_messages,
+            max_chars=self.max_chars
+        )
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Return the session, or None if it is unknown or expired"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.time() - session.last_active > self.ttl:
+            del self._sessions[session_id]
+            return None
+        session.last_active = time.time()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: Optional[str], system_prompt: str = "You are a helpful assistant.") -> ChatSession:
+        session = self.get(session_id) if session_id else None
+        return session or self.create(system_prompt)
+
+    def remove(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
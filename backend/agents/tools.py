@@ -1,13 +1,43 @@
-from typing import Optional, Dict
+from typing import Any, Awaitable, Optional, Dict, List
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import asyncio
+import threading
 from smolagents import tool
-from ..services.bludelta_service import BluDeltaService
+from ..config import get_settings
+from ..services.bludelta_service import bludelta_service  # Import the singleton instance
 from ..database.prompt_store import prompt_store  # Import the singleton instance
 
-# Create singleton instances
-bludelta_service = BluDeltaService()
+# smolagents calls tools synchronously from the agent's worker thread, while the
+# services they use belong to the application's event loop
+_thread_state = threading.local()
+
+def bind_event_loop(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Run tools called from the current (worker) thread on `loop`"""
+    _thread_state.loop = loop
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Run `coro` on the bound event loop and wait for its result"""
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        # No application loop (e.g. a script calling the tool directly)
+        return asyncio.run(coro)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("Agent tools block and must be called from a worker thread")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    timeout = get_settings().agent_tool_timeout
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Tool call timed out after {timeout}s")
 
 @tool
-async def generate_prompt(doc_type: str, context: Optional[Dict] = None) -> str:
+def generate_prompt(doc_type: str, context: Optional[Dict] = None) -> str:
     """
     Generate a custom prompt for a specific document type.
     
@@ -16,7 +46,7 @@ async def generate_prompt(doc_type: str, context: Optional[Dict] = None) -> str:
         context: Optional context information
     """
     # First check if we have a stored prompt
-    existing_prompt = await prompt_store.get_prompt(doc_type)
+    existing_prompt = run_async(prompt_store.get_prompt(doc_type))
     if existing_prompt:
         return existing_prompt
         
@@ -30,11 +60,11 @@ async def generate_prompt(doc_type: str, context: Optional[Dict] = None) -> str:
         prompt = f"{base_prompt} and provide a detailed summary."
         
     # Store the generated prompt
-    await prompt_store.store_prompt(doc_type, prompt)
+    run_async(prompt_store.store_prompt(doc_type, prompt))
     return prompt
 
 @tool
-async def analyze_document(doc_id: str, prompt: str) -> Dict:
+def analyze_document(doc_id: str, prompt: str) -> Dict:
     """
     Analyze a document using BluDelta service.
     
@@ -42,10 +72,21 @@ async def analyze_document(doc_id: str, prompt: str) -> Dict:
         doc_id: Document ID to analyze
         prompt: Prompt to use for analysis
     """
-    return await bludelta_service.analyze_document(doc_id, prompt)
+    return run_async(bludelta_service.analyze_document(doc_id, prompt))
+
+@tool
+def analyze_documents(doc_ids: List[str], prompt: str) -> List[Dict]:
+    """
+    Analyze several documents at once using BluDelta service.
+    
+    Args:
+        doc_ids: Document IDs to analyze
+        prompt: Prompt to use for analysis of every document
+    """
+    return run_async(bludelta_service.analyze_documents(doc_ids, prompt))
 
 @tool
-async def store_prompt(doc_type: str, prompt: str) -> bool:
+def store_prompt(doc_type: str, prompt: str) -> bool:
     """
     Store a custom prompt for future use.
     
@@ -53,4 +94,4 @@ async def store_prompt(doc_type: str, prompt: str) -> bool:
         doc_type: Type of document
         prompt: The prompt to store
     """
-    return await prompt_store.store_prompt(doc_type, prompt) 
\ No newline at end of file
+    return run_async(prompt_store.store_prompt(doc_type, prompt)) 
\ No newline at end of file
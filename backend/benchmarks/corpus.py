@@ -0,0 +1,101 @@
+"""
+Deterministic document corpus for the extraction benchmarks.
+
+Text PDFs are written by hand (one Helvetica text stream per page), so no PDF
+writer library is needed; scanned pages are rendered with Pillow and get
+noise and a slight skew like a real scan. The same `seed` always produces
+byte-identical documents.
+"""
+from typing import List
+import io
+import random
+
+# A4 in PDF points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+LINES_PER_PAGE = 48
+
+WORDS = (
+    "invoice total amount net gross tax vat due date customer supplier order "
+    "number item quantity unit price discount payment terms account bank "
+    "reference delivery address shipping service product description currency "
+    "euro subtotal balance credit note receipt period contract signed"
+).split()
+
+def _lines(rng: random.Random, count: int, words_per_line: int = 11) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(count)]
+
+def make_text_pdf(pages: int, seed: int = 0) -> bytes:
+    """
+    A PDF of `pages` A4 pages, each holding LINES_PER_PAGE lines of text.
+
+    Args:
+        pages: Number of pages
+        seed: Seed for the page text
+    """
+    rng = random.Random(f"pdf-{pages}-{seed}")
+    # Object 1 is the catalog, 2 the page tree, 3 the font; each page adds a page and a content object
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    kids = []
+    for page in range(pages):
+        lines = [f"Page {page + 1} of {pages}"] + _lines(rng, LINES_PER_PAGE - 1)
+        text = " Tj T* ".join(f"({line})" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 800 Td {text} Tj ET".encode("latin-1")
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def make_scanned_image(dpi: int, seed: int = 0, lines: int = 30, image_format: str = "PNG") -> bytes:
+    """
+    An A4 page of printed text as a scanner would produce it at `dpi`.
+
+    Args:
+        dpi: Scan resolution; a 300 dpi page is 2480x3508 pixels
+        seed: Seed for the page text and the scan noise
+        lines: Number of text lines on the page
+        image_format: Pillow format name of the encoded image
+    """
+    from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+    rng = random.Random(f"scan-{dpi}-{seed}")
+    width, height = round(PAGE_WIDTH * dpi / 72), round(PAGE_HEIGHT * dpi / 72)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=round(12 * dpi / 72))
+    except TypeError:
+        font = ImageFont.load_default()  # Pillow < 10.1 only has the fixed bitmap font
+    margin, line_height = round(0.7 * dpi), round(0.3 * dpi)
+    for number, line in enumerate(_lines(rng, lines, words_per_line=8)):
+        draw.text((margin, margin + number * line_height), line, fill=0, font=font)
+
+    # Grey paper noise and a slight skew, as from a flatbed scanner
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height)).point(lambda v: v // 8)
+    image = ImageChops.subtract(image, noise)
+    image = image.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=255)
+
+    out = io.BytesIO()
+    image.save(out, format=image_format)
+    return out.getvalue()
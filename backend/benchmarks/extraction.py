@@ -0,0 +1,253 @@
+"""
+Micro-benchmarks for the document extractors.
+
+Generates the deterministic corpus from `corpus.py` and measures, for each
+extractor and document size, throughput (pages/sec, MB/sec), per-page
+latency percentiles and peak RSS of the benchmark process and of the
+extraction workers. Every case runs in a fresh process, so the peaks belong
+to that case alone:
+
+    python -m backend.benchmarks.extraction --output extraction.json
+    python -m backend.benchmarks.extraction --baseline backend/benchmarks/baselines/extraction.json
+
+Both extractors go through `ExtractionExecutor`, configured with the
+`Settings` defaults, the way uploads are processed:
+- pdf: `iter_pdf_pages`, the page stream `main.extract_pdf_prefix` reads,
+  in batches of `pdf_page_batch_size` pages
+- ocr: `extract_image_text` with the ocr_* preprocessing and tiling
+  settings; skipped when tesseract is not installed
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from ..config import Settings
+from ..services.extraction_service import ExtractionExecutor
+from .corpus import make_scanned_image, make_text_pdf
+from .report import compare, latency_summary, load_report, parse_thresholds, peak_rss_bytes, write_report
+
+EXTRACTORS = ("pdf", "ocr")
+
+def _default(name: str) -> Any:
+    return Settings.model_fields[name].default
+
+def ocr_options() -> Dict[str, Any]:
+    """Keyword arguments of `ExtractionExecutor.extract_image_text` as the server passes them"""
+    return {
+        "target_dpi": _default("ocr_target_dpi"),
+        "binarize": _default("ocr_binarize"),
+        "deskew": _default("ocr_deskew"),
+        "tile_min_pixels": _default("ocr_tile_min_pixels"),
+        "tiles": _default("ocr_tiles")
+    }
+
+# Each runner returns (seconds, pages extracted) per batch of pages the caller received
+
+async def _pdf(executor: ExtractionExecutor, data: bytes, batch_size: int) -> List[Tuple[float, int]]:
+    calls: List[Tuple[float, int]] = []
+    last = time.perf_counter()
+    async for page_number, _, _ in executor.iter_pdf_pages(data, batch_size=batch_size):
+        if (page_number - 1) % batch_size == 0:
+            # First page of a batch; the wait for it covers the whole batch
+            now = time.perf_counter()
+            calls.append((now - last, 0))
+            last = now
+        seconds, count = calls[-1]
+        calls[-1] = (seconds, count + 1)
+    return calls
+
+async def _ocr(executor: ExtractionExecutor, data: bytes) -> List[Tuple[float, int]]:
+    start = time.perf_counter()
+    await executor.extract_image_text(data, **ocr_options())
+    return [(time.perf_counter() - start, 1)]
+
+def ocr_unavailable_reason() -> Optional[str]:
+    """Why OCR cannot run here, or None if pytesseract and the tesseract binary are usable"""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except ImportError:
+        return "pytesseract is not installed"
+    except Exception as e:
+        return f"tesseract is not available: {e}"
+    return None
+
+async def _measure(
+    extractor: str,
+    documents: List[bytes],
+    repeat: int,
+    warmup: int,
+    batch_size: int
+) -> Dict[str, Any]:
+    if extractor == "pdf":
+        run = lambda executor, data: _pdf(executor, data, batch_size)
+    elif extractor == "ocr":
+        run = _ocr
+    else:
+        raise ValueError(f"Unknown extractor: {extractor}")
+
+    executor = ExtractionExecutor(
+        max_workers=_default("extraction_max_workers") or None,
+        job_timeout=_default("extraction_job_timeout"),
+        max_queue_depth=_default("extraction_max_queue_depth")
+    )
+    try:
+        # Warm-up also starts the workers, so process spawning is not measured
+        for _ in range(warmup):
+            for data in documents:
+                await run(executor, data)
+
+        page_seconds: List[float] = []
+        pages = 0
+        elapsed = 0.0
+        for _ in range(repeat):
+            for data in documents:
+                for seconds, count in await run(executor, data):
+                    elapsed += seconds
+                    pages += count
+                    page_seconds.extend([seconds / count] * count)
+        worker_peaks = [peak_rss_bytes(pid) or 0 for pid in executor.worker_pids]
+    finally:
+        executor.shutdown()
+
+    size = sum(len(data) for data in documents) * repeat
+    return {
+        "documents": len(documents),
+        "pages": pages // repeat if repeat else 0,
+        "document_kb": round(sum(len(data) for data in documents) / 1024, 1),
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+        "mb_per_sec": round(size / elapsed / 1_000_000, 3) if elapsed else 0.0,
+        "page_latency": latency_summary(page_seconds),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "worker_peak_rss_bytes": max(worker_peaks, default=None)
+    }
+
+def measure(
+    extractor: str,
+    documents: List[bytes],
+    repeat: int = 3,
+    warmup: int = 1,
+    batch_size: int = 4
+) -> Dict[str, Any]:
+    """
+    Run one extractor over `documents` and summarize the timings.
+
+    Documents are extracted one after another, as for a single upload. Page
+    latency is the wait for each batch of pages divided by its size, so
+    streamed PDF pages and OCRed images compare directly.
+
+    Args:
+        extractor: One of EXTRACTORS
+        documents: Encoded documents to extract, each processed `repeat` times
+        repeat: Timed passes over the documents
+        warmup: Untimed passes first, so worker start-up and imports are not measured
+        batch_size: Pages per batch for the pdf extractor
+    """
+    return asyncio.run(_measure(extractor, documents, repeat, warmup, batch_size))
+
+def build_cases(
+    extractors: List[str],
+    pdf_pages: List[int],
+    image_dpis: List[int],
+    images: int = 3,
+    seed: int = 0
+) -> Dict[str, Tuple[str, List[bytes]]]:
+    """Benchmark cases by name, e.g. {"pdf.100p": ("pdf", [pdf])}"""
+    cases: Dict[str, Tuple[str, List[bytes]]] = {}
+    if "pdf" in extractors:
+        for pages in pdf_pages:
+            cases[f"pdf.{pages}p"] = ("pdf", [make_text_pdf(pages, seed)])
+    if "ocr" in extractors:
+        for dpi in image_dpis:
+            cases[f"ocr.{dpi}dpi"] = ("ocr", [make_scanned_image(dpi, seed + n) for n in range(images)])
+    return cases
+
+def write_corpus(cases: Dict[str, Tuple[str, List[bytes]]], directory: str) -> None:
+    """Save the generated documents, e.g. to look at them or feed them to other tools"""
+    os.makedirs(directory, exist_ok=True)
+    for name, (extractor, documents) in cases.items():
+        extension = "png" if extractor == "ocr" else "pdf"
+        for number, data in enumerate(documents):
+            with open(os.path.join(directory, f"{name.split('.', 1)[1]}-{number}.{extension}"), "wb") as file:
+                file.write(data)
+
+def run_benchmarks(
+    cases: Dict[str, Tuple[str, List[bytes]]],
+    repeat: int = 3,
+    warmup: int = 1,
+    batch_size: int = 4,
+    isolate: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """Measure every case, each in its own spawned process when `isolate` is set"""
+    results = {}
+    for name, (extractor, documents) in cases.items():
+        print(f"Measuring {name}...", file=sys.stderr)
+        if not isolate:
+            results[name] = measure(extractor, documents, repeat, warmup, batch_size)
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results[name] = pool.submit(measure, extractor, documents, repeat, warmup, batch_size).result()
+    return results
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF and OCR extractors")
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS))
+    parser.add_argument("--pdf-pages", type=_int_list, default=[1, 10, 100, 500], help="Comma separated page counts")
+    parser.add_argument("--image-dpi", type=_int_list, default=[100, 200, 300], help="Comma separated scan resolutions")
+    parser.add_argument("--images", type=int, default=3, help="Scanned pages per resolution")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=_default("pdf_page_batch_size"), help="Pages per batch for pdf (pdf_page_batch_size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true", help="Skip the per-case worker process (peak RSS is then cumulative)")
+    parser.add_argument("--corpus-dir", help="Also write the generated documents to this directory")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Report to compare against, e.g. backend/benchmarks/baselines/extraction.json; exits with 1 on regressions")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    parser.add_argument("--threshold", action="append", default=[], help="Per-metric limit, e.g. 'cases.ocr.*=0.25'")
+    args = parser.parse_args()
+
+    extractors = [name.strip() for name in args.extractors.split(",") if name.strip()]
+    unknown = set(extractors) - set(EXTRACTORS)
+    if unknown:
+        parser.error(f"Unknown extractors: {', '.join(sorted(unknown))}")
+
+    skipped = {}
+    if "ocr" in extractors:
+        reason = ocr_unavailable_reason()
+        if reason:
+            print(f"Skipping OCR: {reason}", file=sys.stderr)
+            skipped["ocr"] = reason
+            extractors.remove("ocr")
+
+    cases = build_cases(extractors, args.pdf_pages, args.image_dpi, args.images, args.seed)
+    if args.corpus_dir:
+        write_corpus(cases, args.corpus_dir)
+
+    report = {
+        "cases": run_benchmarks(cases, args.repeat, args.warmup, args.batch_size, not args.in_process),
+        "skipped": skipped,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        }
+    }
+    write_report(report, args.output)
+    if args.baseline:
+        regressions = compare(report, load_report(args.baseline), args.max_regression, parse_thresholds(args.threshold))
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
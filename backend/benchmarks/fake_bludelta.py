@@ -0,0 +1,72 @@
+"""
+Local stand-in for the BluDelta service, for load tests.
+
+Serves `POST /analyze` and `GET /documents/{doc_id}` with canned results
+after a configurable delay; `error_rate` of analyze calls fail with 503.
+
+Run with `python -m backend.benchmarks.fake_bludelta --port 8902`.
+"""
+from typing import Optional
+from dataclasses import dataclass
+import argparse
+import asyncio
+import random
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+@dataclass
+class FakeBluDeltaConfig:
+    analyze_latency: float = 0.3  # Seconds per /analyze call
+    info_latency: float = 0.02  # Seconds per /documents/{id} call
+    error_rate: float = 0.0  # Share of /analyze calls answered with 503
+
+class AnalyzeRequest(BaseModel):
+    doc_id: str
+    prompt: str
+
+def create_app(config: Optional[FakeBluDeltaConfig] = None) -> FastAPI:
+    config = config or FakeBluDeltaConfig()
+    app = FastAPI(title="Fake BluDelta")
+    app.state.config = config
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/analyze")
+    async def analyze(request: AnalyzeRequest):
+        await asyncio.sleep(config.analyze_latency)
+        if config.error_rate and random.random() < config.error_rate:
+            raise HTTPException(status_code=503, detail="Simulated overload")
+        return {
+            "doc_id": request.doc_id,
+            "status": "completed",
+            "result": {
+                "invoice_number": f"INV-{request.doc_id}",
+                "total_amount": "42.00",
+                "currency": "EUR"
+            }
+        }
+
+    @app.get("/documents/{doc_id}")
+    async def get_document_info(doc_id: str):
+        await asyncio.sleep(config.info_latency)
+        return {"doc_id": doc_id, "type": "invoice", "pages": 1}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake BluDelta server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8902)
+    parser.add_argument("--analyze-latency", type=float, default=FakeBluDeltaConfig.analyze_latency)
+    parser.add_argument("--info-latency", type=float, default=FakeBluDeltaConfig.info_latency)
+    parser.add_argument("--error-rate", type=float, default=FakeBluDeltaConfig.error_rate)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FakeBluDeltaConfig(args.analyze_latency, args.info_latency, args.error_rate)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Local stand-in for the OpenAI chat completions API, for load tests.
+
+Answers `POST /v1/chat/completions` with canned text after a configurable
+delay, streamed token by token when `stream` is set. Agents get answers they
+can act on:
+
+- smolagents CodeAgent action steps (no `tools`, the CodeAgent system
+  prompt) get a code blob: `analyze_document(...)` for "Analyze document ..."
+  requests, `code_steps` intermediate steps, then `final_answer(...)`
+- smolagents tool-calling agents get the same sequence as tool calls
+- OpenAIAgent gets `analyze_document` for a share (`tool_call_rate`) of
+  user messages, chosen deterministically from the message text
+
+Run with `python -m backend.benchmarks.fake_openai --port 8901`.
+"""
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.2  # Seconds before the first token
+    token_delay: float = 0.01  # Seconds between streamed tokens
+    completion_tokens: int = 32  # Tokens per answer
+    tool_call_rate: float = 0.0  # Share of OpenAIAgent requests answered with a tool call
+    code_steps: int = 0  # Intermediate steps a smolagents agent takes before its final answer
+
+# Opening of the smolagents CodeAgent system prompt used for action steps
+CODE_AGENT_PROMPT_START = "You are an expert assistant who can solve any task using code blobs"
+
+def _tool_names(body: Dict) -> List[str]:
+    return [tool.get("function", {}).get("name", "") for tool in body.get("tools") or []]
+
+def _text(message: Dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def _last_user_text(messages: List[Dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return _text(message)
+    return ""
+
+def _sampled(text: str, rate: float) -> bool:
+    """Deterministic per-message coin flip, so repeated runs make the same calls"""
+    if rate <= 0:
+        return False
+    bucket = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < rate
+
+def _observations(messages: List[Dict]) -> int:
+    # smolagents feeds tool and code results back as "Observation:" messages; its
+    # system prompts use the word in examples
+    return sum(1 for message in messages if message.get("role") != "system" and "Observation:" in _text(message))
+
+def _agent_action(messages: List[Dict], config: FakeLLMConfig, can_analyze: bool) -> Dict[str, Any]:
+    """Next smolagents action: analyze the document first, then intermediate steps, then answer"""
+    observed = _observations(messages)
+    task = " ".join(_text(message) for message in messages if message.get("role") == "user")
+    if can_analyze and "Analyze document" in task:
+        if observed == 0:
+            return {"name": "analyze_document", "arguments": {"doc_id": "bench-doc", "prompt": "Extract the totals"}}
+        observed -= 1
+    if observed < config.code_steps:
+        return {"name": "print", "arguments": {"value": f"Intermediate step {observed + 1}"}}
+    return {"name": "final_answer", "arguments": {"answer": "Benchmark answer"}}
+
+def code_agent_reply(body: Dict, config: FakeLLMConfig) -> Optional[str]:
+    """The code blob to answer a smolagents CodeAgent step with, or None for other requests"""
+    if body.get("tools"):
+        return None
+    messages = body.get("messages") or []
+    system = " ".join(_text(message) for message in messages if message.get("role") == "system").strip()
+    # Planning steps have their own system prompts and are answered with text
+    if not system.startswith(CODE_AGENT_PROMPT_START):
+        return None
+    action = _agent_action(messages, config, "analyze_document" in system)
+    # Positional, as the agent's own final_answer and print take no keywords
+    code = f"{action['name']}({', '.join(repr(value) for value in action['arguments'].values())})"
+    if action["name"] == "analyze_document":
+        code = f"result = {code}\nprint(result)"
+    return f"Thought: Next step.\nCode:\n```py\n{code}\n```<end_code>"
+
+def choose_tool_call(body: Dict, config: FakeLLMConfig) -> Optional[Dict[str, Any]]:
+    """The tool call to answer `body` with, or None for a plain text answer"""
+    tools = _tool_names(body)
+    if not tools:
+        return None
+    messages = body.get("messages") or []
+    question = _last_user_text(messages)
+    if "final_answer" in tools:
+        action = _agent_action(messages, config, "analyze_document" in tools)
+        if action["name"] == "print":
+            # Tool-calling agents have no print; any cheap tool call will do
+            return {"name": "final_answer", "arguments": {"answer": "Benchmark answer"}}
+        return action
+    if any(message.get("role") == "tool" for message in messages):
+        return None
+    if "analyze_document" in tools and _sampled(question, config.tool_call_rate):
+        return {"name": "analyze_document", "arguments": {"doc_content": question[:200], "instruction": "Summarize"}}
+    return None
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0}
+    }
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    app = FastAPI(title="Fake OpenAI")
+    app.state.config = config
+    app.state.requests = 0
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "gpt-4o-mini")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(_text(message)) for message in body.get("messages") or []) // 4 + 1
+        tool_call = choose_tool_call(body, config)
+        code = code_agent_reply(body, config)
+        words = [f"token{i} " for i in range(config.completion_tokens)]
+        if code is not None:
+            # Stream the blob line by line so the agent still sees several chunks
+            words = code.splitlines(keepends=True)
+
+        if tool_call is not None:
+            message: Dict[str, Any] = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])}
+                }]
+            }
+            completion_tokens = 16
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "".join(words)}
+            completion_tokens = config.completion_tokens if code is None else len(code) // 4 + 1
+            finish_reason = "stop"
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.latency + config.token_delay * completion_tokens)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": _usage(prompt_tokens, completion_tokens)
+            }
+
+        def chunk(delta: Dict, finish: Optional[str] = None, usage: Optional[Dict] = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish}]
+            }
+            if usage:
+                data["usage"] = usage
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def events():
+            await asyncio.sleep(config.latency)
+            if tool_call is not None:
+                call = dict(message["tool_calls"][0], index=0)
+                yield chunk({"role": "assistant", "tool_calls": [call]})
+            else:
+                yield chunk({"role": "assistant", "content": ""})
+                for word in words:
+                    yield chunk({"content": word})
+                    await asyncio.sleep(config.token_delay)
+            yield chunk({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk({}, usage=_usage(prompt_tokens, completion_tokens))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=FakeLLMConfig.latency)
+    parser.add_argument("--token-delay", type=float, default=FakeLLMConfig.token_delay)
+    parser.add_argument("--completion-tokens", type=int, default=FakeLLMConfig.completion_tokens)
+    parser.add_argument("--tool-call-rate", type=float, default=FakeLLMConfig.tool_call_rate)
+    parser.add_argument("--code-steps", type=int, default=FakeLLMConfig.code_steps)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FakeLLMConfig(args.latency, args.token_delay, args.completion_tokens, args.tool_call_rate, args.code_steps)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
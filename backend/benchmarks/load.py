@@ -0,0 +1,340 @@
+"""
+Load generator for the backend's chat and agent endpoints.
+
+Drives each scenario at a fixed concurrency and reports latency percentiles,
+throughput, error rate and the server's peak RSS as JSON. With `--spawn` it
+starts the fake OpenAI and BluDelta servers and a backend wired to them, so
+no API money is spent:
+
+    python -m backend.benchmarks.load --spawn --concurrency 16 --requests 200 \\
+        --output load.json --baseline baseline.json
+
+Against a running server, pass `--target http://host:port` (and
+`--server-pid` for the RSS figure).
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from .report import compare, latency_summary, load_report, parse_thresholds, peak_rss_bytes, write_report
+
+Scenario = Callable[["LoadContext", int], Awaitable[None]]
+
+@dataclass
+class LoadContext:
+    base_url: str
+    client: httpx.AsyncClient
+    timeout: float = 60.0
+    max_steps: int = 6  # The backend's max_steps setting
+
+    @property
+    def ws_url(self) -> str:
+        return "ws" + self.base_url[len("http"):]
+
+class AgentStepError(RuntimeError):
+    """An agent run failed a step or ran out of steps, so its timing is not a real answer"""
+
+def check_agent_steps(steps: List[Dict], max_steps: int) -> None:
+    """
+    Fail unless the agent answered in fewer than `max_steps` steps without step errors.
+
+    Args:
+        steps: One dict per action step with "step" and "error" keys
+    """
+    errors = [step["error"] for step in steps if step.get("error")]
+    if errors:
+        raise AgentStepError(f"{len(errors)} failed steps: {str(errors[0])[:200]}")
+    if not steps or max(step["step"] for step in steps) >= max_steps:
+        raise AgentStepError(f"Agent used all {max_steps} steps")
+
+@dataclass
+class ScenarioResult:
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    def record_error(self, error: BaseException) -> None:
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+def _check(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+async def chat_http(ctx: LoadContext, i: int) -> None:
+    """POST /chat with a JSON message"""
+    _check(await ctx.client.post("/chat", json={"content": f"Question {i}: what is the total?"}))
+
+async def _ws_exchange(url: str, request: Dict, timeout: float, skip_first: bool = False) -> List[Dict]:
+    """Send `request` and wait for the final message; returns the status frames' metadata"""
+    import websockets
+    statuses = []
+    async with websockets.connect(url, open_timeout=timeout) as ws:
+        if skip_first:
+            await asyncio.wait_for(ws.recv(), timeout)  # Session frame
+        await ws.send(json.dumps(request))
+        while True:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+            if frame.get("type") == "message":
+                return statuses
+            if frame.get("type") == "error":
+                raise RuntimeError(frame.get("content"))
+            if frame.get("type") == "status" and frame.get("metadata"):
+                statuses.append(frame["metadata"])
+
+def _agent_steps(response: httpx.Response) -> List[Dict]:
+    _check(response)
+    return [log for log in response.json()["logs"] if "step" in log]
+
+async def chat_ws(ctx: LoadContext, i: int) -> None:
+    """One streamed question over the /chat WebSocket, until the complete answer arrives"""
+    await _ws_exchange(f"{ctx.ws_url}/chat", {"content": f"Question {i}: what is the total?"}, ctx.timeout, skip_first=True)
+
+async def agent_chat(ctx: LoadContext, i: int) -> None:
+    """POST /api/agent/chat"""
+    response = await ctx.client.post("/api/agent/chat", json={"message": f"Question {i}"})
+    check_agent_steps(_agent_steps(response), ctx.max_steps)
+
+async def agent_analyze(ctx: LoadContext, i: int) -> None:
+    """POST /api/agent/analyze-document"""
+    response = await ctx.client.post(
+        "/api/agent/analyze-document",
+        json={"doc_id": f"doc-{i}", "doc_type": "invoice"}
+    )
+    check_agent_steps(_agent_steps(response), ctx.max_steps)
+
+async def agent_ws(ctx: LoadContext, i: int) -> None:
+    """One message over the /api/agent/ws WebSocket, until the final answer arrives"""
+    statuses = await _ws_exchange(f"{ctx.ws_url}/api/agent/ws", {"type": "message", "content": f"Question {i}"}, ctx.timeout)
+    # Planning steps are reported without a step number
+    check_agent_steps([status for status in statuses if status.get("step") is not None], ctx.max_steps)
+
+async def analyze_batch(ctx: LoadContext, i: int) -> None:
+    """POST /api/documents/analyze-batch with 5 documents (exercises BluDelta)"""
+    response = await ctx.client.post(
+        "/api/documents/analyze-batch",
+        json={"doc_ids": [f"doc-{i}-{n}" for n in range(5)], "prompt": "Extract the totals"}
+    )
+    _check(response)
+    # Failed documents come back as per-item errors inside a 200 response
+    failed = [item["error"] for item in response.json()["results"] if "error" in item]
+    if failed:
+        raise RuntimeError(f"{len(failed)} documents failed: {failed[0]}")
+
+SCENARIOS: Dict[str, Scenario] = {
+    "chat_http": chat_http,
+    "chat_ws": chat_ws,
+    "agent_chat": agent_chat,
+    "agent_analyze": agent_analyze,
+    "agent_ws": agent_ws,
+    "analyze_batch": analyze_batch,
+}
+
+async def run_scenario(
+    ctx: LoadContext,
+    scenario: Scenario,
+    concurrency: int,
+    requests: int,
+    duration: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Run `scenario` from `concurrency` workers until `requests` calls were made
+    or, if given, `duration` seconds have passed.
+    """
+    result = ScenarioResult()
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal issued
+        while (deadline is None and issued < requests) or (deadline is not None and time.perf_counter() < deadline):
+            i = issued
+            issued += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(scenario(ctx, i), ctx.timeout)
+                result.latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                result.record_error(e)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = len(result.latencies) + sum(result.errors.values())
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(result.latencies) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(sum(result.errors.values()) / total, 4) if total else 0.0,
+        "errors": result.errors,
+        "latency": latency_summary(result.latencies)
+    }
+
+async def run_load(
+    base_url: str,
+    scenarios: List[str],
+    concurrency: int,
+    requests: int,
+    duration: Optional[float] = None,
+    timeout: float = 60.0,
+    server_pid: Optional[int] = None,
+    max_steps: int = 6
+) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        ctx = LoadContext(base_url, client, timeout, max_steps)
+        results = {}
+        for name in scenarios:
+            results[name] = await run_scenario(ctx, SCENARIOS[name], concurrency, requests, duration)
+    return {
+        "target": base_url,
+        "scenarios": results,
+        "server": {"peak_rss_bytes": peak_rss_bytes(server_pid) if server_pid else None}
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 90.0) -> None:
+    """Poll a /health endpoint until it answers and, for the backend, its agent pool is warm"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process for {url} exited with code {process.returncode}")
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if response.status_code < 500 and response.json().get("ready", True):
+                return
+        except (httpx.HTTPError, ValueError):
+            pass  # Not listening yet, or still starting up
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+class SpawnedStack:
+    """Fake OpenAI and BluDelta servers plus a backend configured to use them"""
+
+    def __init__(self, fake_openai_args: List[str], fake_bludelta_args: List[str], backend_env: Dict[str, str]):
+        self.fake_openai_args = fake_openai_args
+        self.fake_bludelta_args = fake_bludelta_args
+        self.backend_env = backend_env
+        self.processes: List[subprocess.Popen] = []
+        self.backend: Optional[subprocess.Popen] = None
+        self.base_url = ""
+
+    def _start(self, args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        # Run from the repository root so `backend` is importable
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        process = subprocess.Popen([sys.executable, *args], cwd=root, env={**os.environ, **(env or {})})
+        self.processes.append(process)
+        return process
+
+    def __enter__(self) -> "SpawnedStack":
+        openai_port, bludelta_port, backend_port = free_port(), free_port(), free_port()
+        try:
+            fake_openai = self._start(["-m", "backend.benchmarks.fake_openai", "--port", str(openai_port), *self.fake_openai_args])
+            fake_bludelta = self._start(["-m", "backend.benchmarks.fake_bludelta", "--port", str(bludelta_port), *self.fake_bludelta_args])
+            wait_until_ready(f"http://127.0.0.1:{openai_port}/health", fake_openai)
+            wait_until_ready(f"http://127.0.0.1:{bludelta_port}/health", fake_bludelta)
+
+            openai_url = f"http://127.0.0.1:{openai_port}/v1"
+            env = {
+                "OPENAI_API_KEY": "benchmark",
+                "OPENAI_BASE_URL": openai_url,
+                "OPENAI_API_BASE": openai_url,  # LiteLLM, used by the smolagents agents
+                "OPENAI_HTTP2": "false",
+                "BLUDELTA_SERVICE_URL": f"http://127.0.0.1:{bludelta_port}",
+                "BLUDELTA_API_KEY": "benchmark",
+                "BLUDELTA_HTTP2": "false",
+                "TELEMETRY_ENABLED": "false",
+                "PROMPT_STORE_URL": "sqlite://",
+                "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+                **self.backend_env
+            }
+            self.backend = self._start(
+                ["-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(backend_port), "--log-level", "warning"],
+                env
+            )
+            self.base_url = f"http://127.0.0.1:{backend_port}"
+            wait_until_ready(f"{self.base_url}/health", self.backend)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the backend chat and agent endpoints")
+    parser.add_argument("--target", help="Base URL of a running backend, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--spawn", action="store_true", help="Start fake OpenAI/BluDelta servers and a backend")
+    parser.add_argument("--scenarios", default="chat_http,chat_ws,agent_chat,agent_analyze,agent_ws,analyze_batch")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--duration", type=float, help="Seconds per scenario, instead of --requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--server-pid", type=int, help="Backend process id, for peak RSS with --target")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake OpenAI time to first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01)
+    parser.add_argument("--tool-call-rate", type=float, default=0.3)
+    parser.add_argument("--code-steps", type=int, default=1, help="Intermediate agent steps before the final answer")
+    parser.add_argument("--max-steps", type=int, default=6, help="Backend max_steps; agent runs using all of them fail")
+    parser.add_argument("--bludelta-latency", type=float, default=0.3)
+    parser.add_argument("--env", action="append", default=[], help="Extra NAME=VALUE backend setting with --spawn")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Report to compare against; exits with 1 on regressions")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    parser.add_argument("--threshold", action="append", default=[], help="Per-metric limit, e.g. '*.p99_ms=0.25'")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if bool(args.target) == args.spawn:
+        parser.error("Pass either --target or --spawn")
+
+    def run(base_url: str, server_pid: Optional[int]) -> Dict[str, Any]:
+        return asyncio.run(run_load(
+            base_url, scenarios, args.concurrency, args.requests, args.duration, args.timeout, server_pid, args.max_steps
+        ))
+
+    if args.spawn:
+        stack = SpawnedStack(
+            [
+                "--latency", str(args.llm_latency), "--token-delay", str(args.llm_token_delay),
+                "--tool-call-rate", str(args.tool_call_rate), "--code-steps", str(args.code_steps)
+            ],
+            ["--analyze-latency", str(args.bludelta_latency)],
+            {"MAX_STEPS": str(args.max_steps), **dict(item.split("=", 1) for item in args.env)}
+        )
+        with stack:
+            report = run(stack.base_url, stack.backend.pid)
+    else:
+        report = run(args.target, args.server_pid)
+
+    write_report(report, args.output)
+    if args.baseline:
+        regressions = compare(report, load_report(args.baseline), args.max_regression, parse_thresholds(args.threshold))
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from typing import Any, Dict, List, Optional, Sequence
+import fnmatch
+import json
+import math
+import os
+import resource
+import sys
+
+# Flattened metric names ending like this get worse as they grow...
+LOWER_IS_BETTER = ("_ms", "_bytes", "error_rate")
+# ...and these get worse as they shrink
+HIGHER_IS_BETTER = ("_per_sec", "_rps")
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile, `q` in [0, 100]"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of latencies given in seconds, in milliseconds"""
+    ms = [value * 1000 for value in seconds]
+    return {
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max_ms": round(max(ms), 2) if ms else 0.0
+    }
+
+def peak_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Peak resident set size of `pid` (default: this process); None if unavailable"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None or pid == os.getpid():
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a nested report, keyed by dotted path"""
+    flat: Dict[str, float] = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+def _threshold(name: str, default: float, thresholds: Dict[str, float]) -> float:
+    for pattern, value in thresholds.items():
+        if fnmatch.fnmatch(name, pattern):
+            return value
+    return default
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    max_regression: float = 0.10,
+    thresholds: Optional[Dict[str, float]] = None
+) -> List[str]:
+    """
+    Compare two reports and describe every metric that regressed.
+
+    Args:
+        current: Report of this run
+        baseline: Stored report to compare against
+        max_regression: Allowed relative change in the bad direction (0.10 = 10%)
+        thresholds: Per-metric overrides, as glob patterns on the dotted name
+            (e.g. {"*.p99_ms": 0.25})
+    """
+    thresholds = thresholds or {}
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    for name, old in sorted(before.items()):
+        new = now.get(name)
+        if new is None:
+            continue
+        limit = _threshold(name, max_regression, thresholds)
+        if name.endswith(LOWER_IS_BETTER):
+            worse = new > old * (1 + limit) if old else (name.endswith("error_rate") and new > 0)
+        elif name.endswith(HIGHER_IS_BETTER):
+            worse = new < old * (1 - limit)
+        else:
+            continue
+        if worse:
+            change = f"{(new - old) / old:+.1%}" if old else "new"
+            regressions.append(f"{name}: {old:g} -> {new:g} ({change}, limit {limit:.0%})")
+    return regressions
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as file:
+        return json.load(file)
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None) -> None:
+    """Write the report as JSON to `path`, or to stdout"""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+def parse_thresholds(values: Sequence[str]) -> Dict[str, float]:
+    """Parse `pattern=fraction` command line options"""
+    thresholds = {}
+    for value in values:
+        pattern, _, limit = value.partition("=")
+        thresholds[pattern] = float(limit)
+    return thresholds
@@ -0,0 +1,161 @@
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Type
+import hashlib
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from .models import AnalysisResult, Base, Prompt, utcnow
+from ..config import Settings, get_settings
+
+# Async drivers substituted for the sync defaults in database URLs
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+}
+
+# Rows per INSERT statement; keeps bulk upserts under driver parameter limits
+UPSERT_BATCH_SIZE = 500
+
+# Dialects with a native multi-row upsert; writes to others fall back to ORM merges
+UPSERT_DIALECTS = ("postgresql", "sqlite", "mysql", "mariadb")
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of `url` for its async counterpart (asyncpg, aiosqlite, ...)"""
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for database backend: {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def engine_options(url: str, settings: Settings) -> Dict[str, Any]:
+    """Pool options for `url`; in-memory SQLite shares a single connection instead"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {"pool_pre_ping": settings.database_pool_pre_ping}
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_timeout": settings.database_pool_timeout,
+    }
+
+def create_async_db_engine(url: Optional[str] = None, settings: Optional[Settings] = None) -> AsyncEngine:
+    """Create a pooled async engine, by default for `Settings.database_url`"""
+    settings = settings or get_settings()
+    url = to_async_url(url or settings.database_url)
+    return create_async_engine(url, echo=settings.database_echo, **engine_options(url, settings))
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+
+def get_engine() -> AsyncEngine:
+    """Return the process-wide async engine, created on first use"""
+    global _engine, _sessionmaker
+    if _engine is None:
+        _engine = create_async_db_engine()
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+def get_sessionmaker() -> async_sessionmaker:
+    get_engine()
+    return _sessionmaker
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency yielding a pooled async session"""
+    async with get_sessionmaker()() as session:
+        yield session
+
+async def create_tables() -> None:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def dispose_engine() -> None:
+    """Close all pooled connections"""
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _sessionmaker = None
+
+def upsert_statement(model: Type[Base], rows: Sequence[Dict[str, Any]], dialect_name: str):
+    """
+    Build one multi-row INSERT that updates rows whose primary key already exists.
+
+    Args:
+        model: Mapped class to write to
+        rows: Column values per row; every row must have the same keys
+        dialect_name: Name of the target dialect, one of UPSERT_DIALECTS
+    """
+    table = model.__table__
+    keys = [column.name for column in sa_inspect(model).primary_key]
+    updates = [name for name in rows[0] if name not in keys]
+
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(list(rows))
+        return stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: stmt.excluded[name] for name in updates}
+        )
+    if dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(list(rows))
+        return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in updates})
+    raise NotImplementedError(f"Bulk upsert is not supported for {dialect_name}")
+
+def batched(rows: Sequence[Dict[str, Any]], size: int = UPSERT_BATCH_SIZE) -> List[Sequence[Dict[str, Any]]]:
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+async def bulk_upsert(session: AsyncSession, model: Type[Base], rows: Sequence[Dict[str, Any]]) -> int:
+    """
+    Upsert `rows` with one statement per batch and commit; returns the row count.
+
+    Dialects without a native upsert get one ORM merge (a primary key lookup
+    plus an insert or update) per row instead.
+    """
+    if not rows:
+        return 0
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name not in UPSERT_DIALECTS:
+        for row in rows:
+            await session.merge(model(**row))
+    else:
+        for batch in batched(rows):
+            await session.execute(upsert_statement(model, batch, dialect_name))
+    await session.commit()
+    return len(rows)
+
+def prompt_rows(prompts: Dict[str, str]) -> List[Dict[str, Any]]:
+    now = utcnow()
+    return [{"doc_type": doc_type, "prompt": prompt, "updated_at": now} for doc_type, prompt in prompts.items()]
+
+def result_rows(results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows for analysis results given as {"doc_id", "prompt", "result"} dicts"""
+    now = utcnow()
+    return [
+        {
+            "doc_id": item["doc_id"],
+            "prompt_hash": hashlib.sha256(item["prompt"].encode("utf-8")).hexdigest(),
+            "prompt": item["prompt"],
+            "result": item["result"],
+            "updated_at": now
+        }
+        for item in results
+    ]
+
+async def upsert_prompts(session: AsyncSession, prompts: Dict[str, str]) -> int:
+    """Store many prompts (doc_type -> prompt) in one round-trip per batch"""
+    return await bulk_upsert(session, Prompt, prompt_rows(prompts))
+
+async def upsert_results(session: AsyncSession, results: Sequence[Dict[str, Any]]) -> int:
+    """Store many BluDelta analysis results in one round-trip per batch"""
+    return await bulk_upsert(session, AnalysisResult, result_rows(results))
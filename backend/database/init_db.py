@@ -1,8 +1,16 @@
-# Since we're using in-memory storage, no initialization needed
-def init_database():
-    """Placeholder for database initialization"""
-    pass
+from typing import Optional
+from sqlalchemy import create_engine
+from .models import Base
+from ..config import get_settings
+
+def init_database(database_url: Optional[str] = None):
+    """Create all tables in the prompt store database"""
+    engine = create_engine(database_url or get_settings().prompt_store_url)
+    try:
+        Base.metadata.create_all(engine)
+    finally:
+        engine.dispose()
 
 if __name__ == "__main__":
     init_database()
-    print("Database initialized successfully") 
\ No newline at end of file
+    print("Database initialized successfully")
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from sqlalchemy import JSON, DateTime, String, Text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+class Base(DeclarativeBase):
+    """Declarative base for all BluApp tables"""
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+class Prompt(Base):
+    """Extraction prompt stored per document type"""
+    __tablename__ = "prompts"
+
+    doc_type: Mapped[str] = mapped_column(String(255), primary_key=True)
+    prompt: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+class AnalysisResult(Base):
+    """BluDelta analysis result per document and prompt"""
+    __tablename__ = "analysis_results"
+
+    doc_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    prompt_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    prompt: Mapped[str] = mapped_column(Text)
+    result: Mapped[dict] = mapped_column(JSON)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
@@ -1,31 +1,124 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
+import asyncio
+import logging
+import time
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from .engine import UPSERT_DIALECTS, batched, prompt_rows, upsert_statement
+from .models import Base, Prompt
 
 class PromptStore:
-    """Simple in-memory prompt store implementation"""
-    
-    def __init__(self):
-        self._prompts: Dict[str, str] = {}
-    
+    """
+    Durable prompt store fronted by an in-memory read-through cache.
+
+    Prompts live in any SQLAlchemy database (in-memory SQLite by default). Lookups,
+    including misses, are cached for `cache_ttl` seconds; writes update the local
+    cache immediately, and other workers pick them up once their entry expires.
+    """
+
+    def __init__(self, database_url: Optional[str] = None, cache_ttl: float = 30.0):
+        self.database_url = database_url or "sqlite://"
+        self.cache_ttl = cache_ttl
+        self._engine: Optional[Engine] = None
+        self._cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def configure(self, database_url: str, cache_ttl: Optional[float] = None):
+        """Point the store at another database, e.g. from settings at startup"""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+        self.database_url = database_url
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
+        self._cache.clear()
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            if self.database_url in ("sqlite://", "sqlite:///:memory:"):
+                # One shared connection, so every thread sees the same in-memory database
+                engine = create_engine(
+                    self.database_url,
+                    connect_args={"check_same_thread": False},
+                    poolclass=StaticPool
+                )
+            else:
+                engine = create_engine(self.database_url, pool_pre_ping=True)
+            Base.metadata.create_all(engine)
+            self._engine = engine
+        return self._engine
+
+    def _write(self, prompts: Dict[str, str]) -> None:
+        engine = self._get_engine()
+        if engine.dialect.name not in UPSERT_DIALECTS:
+            # No native upsert: a lookup plus insert or update per prompt
+            with Session(engine) as session, session.begin():
+                for row in prompt_rows(prompts):
+                    session.merge(Prompt(**row))
+            return
+        # Upsert in one statement per batch instead of a lookup plus insert per prompt
+        with engine.begin() as conn:
+            for batch in batched(prompt_rows(prompts)):
+                conn.execute(upsert_statement(Prompt, batch, engine.dialect.name))
+
+    def _read(self, doc_type: str) -> Optional[str]:
+        with Session(self._get_engine()) as session:
+            return session.scalar(select(Prompt.prompt).where(Prompt.doc_type == doc_type))
+
     async def store_prompt(self, doc_type: str, prompt: str) -> bool:
-        """Store a prompt in memory"""
+        """Store a prompt durably and update the cache"""
+        return await self.store_prompts({doc_type: prompt})
+
+    async def store_prompts(self, prompts: Dict[str, str]) -> bool:
+        """Store many prompts (doc_type -> prompt) in a single transaction"""
         try:
-            self._prompts[doc_type] = prompt
-            return True
-        except Exception as e:
-            print(f"Error storing prompt: {e}")
+            await asyncio.to_thread(self._write, prompts)
+        except SQLAlchemyError as e:
+            logging.error(f"Error storing prompt: {str(e)}")
             return False
-            
+        now = time.monotonic()
+        for doc_type, prompt in prompts.items():
+            self._cache[doc_type] = (now, prompt)
+        return True
+
     async def get_prompt(self, doc_type: str) -> Optional[str]:
-        """Retrieve a prompt from memory"""
-        return self._prompts.get(doc_type)
-    
+        """Retrieve a prompt, from the cache if the entry is still fresh"""
+        entry = self._cache.get(doc_type)
+        if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+            return entry[1]
+        try:
+            prompt = await asyncio.to_thread(self._read, doc_type)
+        except SQLAlchemyError as e:
+            logging.error(f"Error reading prompt: {str(e)}")
+            # Serve the stale entry rather than nothing while the database is unavailable
+            return entry[1] if entry is not None else None
+        self._cache[doc_type] = (time.monotonic(), prompt)
+        return prompt
+
+    def invalidate(self, doc_type: Optional[str] = None):
+        """Drop cached entries so the next lookup reads the database"""
+        if doc_type is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(doc_type, None)
+
     def clear(self):
         """Clear all stored prompts"""
-        self._prompts.clear()
+        with Session(self._get_engine()) as session, session.begin():
+            session.execute(delete(Prompt))
+        self._cache.clear()
+
+    def close(self):
+        """Release database connections"""
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
 
-# Create a singleton instance
+# Create a singleton instance; configured from settings at application startup
 prompt_store = PromptStore()
 
 # Export the store_prompt function for convenience
 async def store_prompt(doc_type: str, prompt: str) -> bool:
-    return await prompt_store.store_prompt(doc_type, prompt) 
\ No newline at end of file
+    return await prompt_store.store_prompt(doc_type, prompt)
@@ -1,34 +1,76 @@
-from fastapi import FastAPI, WebSocket, UploadFile, File, HTTPException, Form, Request
+from .telemetry.startup import startup_timer
+startup_timer.profile_imports()
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, Dict, List, Union
-from pydantic import BaseModel, field_validator
+from typing import Optional, Dict, List, Union, Callable, Awaitable, Tuple, AsyncGenerator
+from pydantic import BaseModel, ValidationError, field_validator
+from contextlib import asynccontextmanager
+from functools import partial
 import asyncio
-import io
 import base64
 import logging
-import PyPDF2
-from PIL import Image
-import pytesseract
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from starlette.datastructures import UploadFile as FormUpload
+from starlette.formparsers import MultiPartException, MultiPartParser
 import sys
 
 # Change to relative imports
 from .services.openai_service import generate_chat_response, generate_extraction_prompt
 from .agents.openai_agent import OpenAIAgent
+from .agents.response_cache import ResponseCache
+from .agents.retrieval import DocumentRetriever
+from .agents.session import SessionStore
+from .agents.executor import shutdown_agent_executor
+from .services.token_budget import TokenBudget, load_encodings
+from .services.connection_manager import get_connection_manager
+from .services.broadcast_bus import create_broadcast_bus
 from .config import get_settings
+from .services.extraction_service import (
+    ExtractionExecutor,
+    ExtractionError,
+    ExtractionQueueFullError,
+    ExtractionTimeoutError,
+)
+from .services.extraction_cache import ExtractionCache
+from .services.openai_clients import openai_clients
+from .services.bludelta_service import bludelta_service
+from .database.prompt_store import prompt_store
+from .database.engine import dispose_engine
+from .routers import agent_router, document_router
+from .telemetry.setup import init_telemetry, shutdown_telemetry
+from .telemetry.prometheus import CONTENT_TYPE, prometheus_metrics
+from .telemetry.stages import timed, timed_stage
+
+startup_timer.stop_profiling_imports()
 
 class FileData(BaseModel):
-    content: Union[str, List[int]]  # Can be either base64 string or byte array
+    # Base64 string, byte array, or None when the bytes arrive separately
+    # (multipart upload or binary WebSocket frames)
+    content: Optional[Union[str, bytes]] = None
     type: str    # MIME type
+    size: Optional[int] = None  # Byte count of binary WebSocket frames that follow
     
-    @field_validator('content')
+    @field_validator('content', mode='before')
     def validate_content(cls, v):
         if isinstance(v, list):
-            # Convert byte array to base64 string
-            return base64.b64encode(bytes(v)).decode('utf-8')
+            # Convert byte array straight to bytes, no base64 round-trip
+            return bytes(v)
         return v
     
+    def to_bytes(self) -> bytes:
+        """Return the decoded file content"""
+        return decode_file_content(self.content)
+    
+    def content_size(self) -> int:
+        """Byte count of the inline content, estimated from the base64 length without decoding it"""
+        if isinstance(self.content, bytes):
+            return len(self.content)
+        payload = self.content.split(',', 1)[1] if ',' in self.content else self.content
+        return len(payload) * 3 // 4
+    
     model_config = {
         "json_schema_extra": {
             "example": {
@@ -38,6 +80,44 @@ class FileData(BaseModel):
         }
     }
 
+@timed("decode")
+def decode_file_content(content: Union[str, bytes]) -> bytes:
+    """Decode base64 (optionally a data URI) file content; raw bytes pass through unchanged"""
+    if isinstance(content, bytes):
+        return content
+    # Handle data URI format (e.g., "data:image/jpeg;base64,/9j/4AAQSkZ...")
+    if ',' in content:
+        content = content.split(',', 1)[1]
+    return base64.b64decode(content)
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded file exceeds max_upload_bytes"""
+    
+    def __init__(self):
+        super().__init__(f"File exceeds the upload limit of {settings.max_upload_bytes} bytes")
+
+def check_upload_size(size: int) -> None:
+    """Raise UploadTooLargeError if a file of `size` bytes exceeds the upload limit"""
+    if size > settings.max_upload_bytes:
+        raise UploadTooLargeError()
+
+# Room for the JSON or form fields around the file in a /chat request body
+REQUEST_ENVELOPE_BYTES = 64 * 1024
+
+async def limited_body(request: Request, limit: int) -> AsyncGenerator[bytes, None]:
+    """
+    Stream the request body, stopping with UploadTooLargeError as soon as it grows past `limit` bytes
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise UploadTooLargeError()
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise UploadTooLargeError()
+        yield chunk
+
 class ChatMessage(BaseModel):
     content: str
     role: str = "user"  # Default to "user"
@@ -56,24 +136,125 @@ class ChatMessage(BaseModel):
         }
     }
 
-app = FastAPI(title="BluService", description="Backend service for BluDoc Integration Demo App")
+# Get settings
+settings = get_settings()
+
+# Process pool for OCR and PDF parsing, kept off the event loop
+extraction_executor = ExtractionExecutor(
+    max_workers=settings.extraction_max_workers or None,
+    job_timeout=settings.extraction_job_timeout,
+    max_queue_depth=settings.extraction_max_queue_depth
+)
+
+# Extracted text keyed by file hash, so re-uploads skip OCR and PDF parsing
+extraction_cache = ExtractionCache(
+    max_chars=settings.extraction_cache_max_chars,
+    cache_dir=settings.extraction_cache_dir
+)
+
+# Exact-match LLM response cache, shared by all agents when enabled
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl=settings.response_cache_ttl,
+    cache_dir=settings.response_cache_dir
+) if settings.response_cache_enabled else None
+
+# Lexical retrieval over large documents, with indexes cached per document hash
+document_retriever = DocumentRetriever(
+    chunk_size=settings.retrieval_chunk_size,
+    chunk_overlap=settings.retrieval_chunk_overlap,
+    top_k=settings.retrieval_top_k,
+    min_chars=settings.retrieval_min_chars,
+    max_documents=settings.retrieval_max_documents
+) if settings.retrieval_enabled else None
+
+# Keeps prompts within the context window of the default model
+token_budget = TokenBudget(
+    settings.default_model,
+    policy=settings.token_budget_policy,
+    reserve_output_tokens=settings.token_budget_reserve_output,
+    max_context_tokens=settings.token_budget_max_context
+) if settings.token_budget_enabled else None
+
+# WebSocket chat sessions, resumable with /chat?session_id=...
+session_store = SessionStore(
+    max_sessions=settings.session_max_sessions,
+    ttl=settings.session_ttl,
+    max_messages=settings.session_max_messages,
+    max_chars=settings.session_max_chars
+)
+
+async def warm_agent_pool(app: FastAPI, count: int) -> None:
+    """Pre-build agents so requests do not pay for construction; sets app.state.agent_pool"""
+    with startup_timer.stage("agent_pool"):
+        try:
+            await agent_router.warm_agent_pool(count)
+            app.state.agent_pool = "ready"
+        except Exception as e:
+            app.state.agent_pool = "failed"
+            logging.error(f"Error warming agent pool: {str(e)}")
+    logging.info(f"Agent pool warm-up finished in {startup_timer.stages['agent_pool'] * 1000:.1f} ms")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop application-wide resources"""
+    with startup_timer.stage("telemetry"):
+        init_telemetry(settings)
+    with startup_timer.stage("prompt_store"):
+        prompt_store.configure(settings.prompt_store_url, cache_ttl=settings.prompt_cache_ttl)
+    with startup_timer.stage("broadcast_bus"):
+        await get_connection_manager().attach_bus(create_broadcast_bus(settings))
+    with startup_timer.stage("tokenizer"):
+        try:
+            # Token counts are estimated until the encodings are loaded; requests never download them
+            await asyncio.wait_for(
+                asyncio.to_thread(load_encodings, [settings.default_model]),
+                settings.tokenizer_load_timeout
+            )
+        except asyncio.TimeoutError:
+            logging.warning("Tokenizer still loading, estimating token counts until it is ready")
+    warmup = None
+    app.state.agent_pool = "disabled"
+    if settings.agent_pool_warm > 0:
+        # Build agents in the background; requests that arrive first construct their own
+        app.state.agent_pool = "warming"
+        warmup = asyncio.create_task(warm_agent_pool(app, settings.agent_pool_warm))
+    startup_timer.log_report()
+    yield
+    if warmup is not None:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    await get_connection_manager().detach_bus()
+    extraction_executor.shutdown()
+    shutdown_agent_executor()
+    await openai_clients.aclose()
+    await bludelta_service.aclose()
+    prompt_store.close()
+    await dispose_engine()
+    shutdown_telemetry()
+
+app = FastAPI(
+    title="BluService",
+    description="Backend service for BluDoc Integration Demo App",
+    lifespan=lifespan
+)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors with more detail"""
     exc_str = f'{exc}'.replace('\n', ' ').replace('   ', ' ')
     logging.error(f"Request validation error: {exc_str}")
-    # Log the actual request body
-    body = await request.body()
-    logging.error(f"Request body: {body.decode()}")
+    # Log the actual request body, unless a form parser already consumed it
+    try:
+        body = await request.body()
+        logging.error(f"Request body: {body.decode(errors='replace')}")
+    except RuntimeError:
+        pass
     return JSONResponse(
         status_code=422,
-        content={"detail": exc.errors(), "body": exc_str},
+        content=jsonable_encoder({"detail": exc.errors(), "body": exc_str}),
     )
 
-# Get settings
-settings = get_settings()
-
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -83,32 +264,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store active WebSocket connections
-active_connections: List[WebSocket] = []
+# Include API routers
+app.include_router(document_router.router)
+app.include_router(agent_router.router)
+
+# Called with (page_number, total_pages) after each extracted PDF page
+PageCallback = Callable[[int, int], Awaitable[None]]
 
 @app.websocket("/chat")
 async def chat_websocket(websocket: WebSocket):
-    """Single WebSocket endpoint for all chat interactions"""
+    """
+    Single WebSocket endpoint for all chat interactions
+    
+    The first frame sent is {"type": "session", "content": <session id>}; reconnect
+    with /chat?session_id=<id> to continue the conversation.
+    """
     await websocket.accept()
-    active_connections.append(websocket)
+    # Replies go through the connection's send queue, so broadcasts never block on this client
+    connection = get_connection_manager().connect(websocket, channel="chat")
     
     try:
         # Create agent with all available tools
         agent = OpenAIAgent(
             model_name=settings.default_model,
             api_key=settings.openai_api_key,
-            system_prompt="You are a helpful assistant."
+            system_prompt="You are a helpful assistant.",
+            temperature=settings.openai_temperature,
+            response_cache=response_cache,
+            retriever=document_retriever,
+            token_budget=token_budget,
+            endpoint="chat_ws"
         )
         
+        # Continue an existing conversation if the client passes its session id
+        requested_id = websocket.query_params.get("session_id")
+        session = session_store.get_or_create(requested_id, agent.system_prompt)
+        await connection.send_json({
+            "type": "session",
+            "content": session.session_id,
+            "metadata": {
+                "resumed": session.session_id == requested_id,
+                "turns": session.turn_count
+            }
+        })
+        
+        async def send_page_progress(page_number: int, total_pages: int):
+            await connection.send_json({
+                "type": "status",
+                "content": f"Extracted page {page_number} of {total_pages}",
+                "metadata": {
+                    "page": page_number,
+                    "total_pages": total_pages
+                }
+            })
+        
         while True:
             try:
-                # Receive message
-                message = ChatMessage(**await websocket.receive_json())
+                # Receive message, followed by binary frames if the file is sent as bytes
+                message, file_content = await receive_chat_message(websocket)
                 context = {}
                 
                 # If there's a file, process it and add to context
                 if message.file:
-                    file_content = message.file.content
                     file_type = message.file.type
                     
                     if not file_content:
@@ -118,7 +335,7 @@ async def chat_websocket(websocket: WebSocket):
                     if file_type.startswith('image/'):
                         document_text = await extract_text_from_image(file_content)
                     elif file_type == 'application/pdf':
-                        document_text = await extract_text_from_pdf(file_content)
+                        document_text = await extract_text_from_pdf(file_content, on_page=send_page_progress)
                     else:
                         raise ValueError("Unsupported file format")
                         
@@ -128,97 +345,304 @@ async def chat_websocket(websocket: WebSocket):
                         "type": file_type
                     }
                 
-                # Process through agent
-                async for step in agent.process_message(message.content, context):
-                    # Send step updates
-                    await websocket.send_json({
-                        "type": "status",
-                        "content": f"Processing step {step.step_number}",
-                        "metadata": {
-                            "step": step.step_number,
-                            "tool": step.tool_calls[0].name if step.tool_calls else None,
-                            "total_steps": config.max_steps
-                        }
-                    })
-                    
-                    # If we have a final answer, send it
-                    if step.action_output:
-                        await websocket.send_json({
+                # Process through agent, forwarding tokens as they are generated
+                async for event in agent.stream_message(message.content, context, session=session):
+                    if event["type"] == "delta":
+                        await connection.send_json({
+                            "type": "delta",
+                            "role": "assistant",
+                            "content": event["content"]
+                        })
+                    elif event["type"] == "tool_call":
+                        await connection.send_json({
+                            "type": "status",
+                            "content": f"Calling tool {event['name']}",
+                            "metadata": {
+                                "tool": event["name"]
+                            }
+                        })
+                    elif event["type"] == "message":
+                        # Send the complete answer once streaming is done
+                        await connection.send_json({
                             "type": "message",
                             "role": "assistant",
-                            "content": step.action_output
+                            "content": event["content"]
                         })
                 
+            except WebSocketDisconnect:
+                raise
+                
             except asyncio.TimeoutError:
-                await websocket.send_json({
+                await connection.send_json({
                     "type": "error",
                     "content": "Processing timed out"
                 })
                 
             except Exception as e:
                 logging.error(f"Error processing message: {str(e)}")
-                await websocket.send_json({
+                await connection.send_json({
                     "type": "error",
                     "content": str(e)
                 })
                 
+    except WebSocketDisconnect:
+        logging.info("WebSocket client disconnected")
+        
     except Exception as e:
         logging.error(f"WebSocket error: {str(e)}")
         
     finally:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        await get_connection_manager().disconnect(connection)
         if not websocket.client_state.DISCONNECTED:
             await websocket.close()
 
-async def extract_text_from_pdf(content: str) -> str:
+async def receive_chat_message(websocket: WebSocket) -> Tuple[ChatMessage, Optional[bytes]]:
+    """
+    Receive one chat message from the WebSocket.
+    
+    The message is a JSON text frame. Its file content is either inline (base64 or
+    byte array) or announced with `file.size` and sent as binary frames right after.
+    
+    Returns:
+        The parsed message and the decoded file bytes, if any
+    """
+    frame = await websocket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", 1000))
+    if frame.get("text") is None:
+        raise ValueError("Expected a JSON message frame before binary file data")
+    
+    message = ChatMessage.model_validate_json(frame["text"])
+    if not message.file:
+        return message, None
+    if message.file.content is not None:
+        check_upload_size(message.file.content_size())
+        return message, message.file.to_bytes()
+    if not message.file.size:
+        return message, None
+    
+    size = message.file.size
+    check_upload_size(size)
+    
+    # Collect binary frames until the announced size is reached
+    chunks: List[bytes] = []
+    received = 0
+    while received < size:
+        chunk = await websocket.receive_bytes()
+        received += len(chunk)
+        if received > size:
+            raise ValueError("Received more file data than announced")
+        chunks.append(chunk)
+    return message, chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+async def receive_multipart_message(request: Request) -> Tuple[ChatMessage, Optional[bytes]]:
     """
-    Extract text content from a PDF file
+    Parse a multipart /chat upload with a `content` text field and an optional binary `file`
+    
+    The body is parsed as it arrives and rejected with UploadTooLargeError once it
+    outgrows max_upload_bytes, before the rest of it is read.
+    
+    Returns:
+        The parsed message and the raw file bytes, if any
+    """
+    body = limited_body(request, settings.max_upload_bytes + REQUEST_ENVELOPE_BYTES)
+    try:
+        form = await MultiPartParser(request.headers, body).parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    try:
+        upload = form.get("file")
+        if upload is not None and not isinstance(upload, FormUpload):
+            raise RequestValidationError([{
+                "type": "value_error",
+                "loc": ("body", "file"),
+                "msg": "file must be an uploaded file, not a text field"
+            }])
+        message = ChatMessage(
+            content=form.get("content") or "",
+            role=form.get("role") or "user",
+            file=FileData(type=upload.content_type or "application/octet-stream") if upload else None
+        )
+        if not upload:
+            return message, None
+        check_upload_size(upload.size or 0)
+        return message, await upload.read()
+    finally:
+        await form.close()
+
+async def extract_cached(
+    binary_content: bytes,
+    kind: str,
+    extract: Callable[[bytes], Awaitable[str]]
+) -> str:
+    """
+    Extract text from a file, reusing cached text for known files
+    
+    Args:
+        binary_content: Decoded file bytes
+        kind: Extractor kind used in the cache key
+        extract: Coroutine function producing the text on a cache miss
+    """
+    key = extraction_cache.make_key(binary_content, kind)
+    text = await extraction_cache.get(key)
+    if text is None:
+        text = await extract(binary_content)
+        await extraction_cache.put(key, text)
+    return text
+
+async def extract_pdf_prefix(binary_content: bytes, on_page: Optional[PageCallback] = None) -> str:
+    """
+    Extract PDF pages in order until the page or character budget is reached
     
     Args:
-        content: Base64 encoded PDF content
+        binary_content: Raw PDF bytes
+        on_page: Optional callback invoked after each extracted page
     """
+    max_pages = settings.pdf_max_pages
+    max_chars = settings.pdf_max_chars
+    parts: List[str] = []
+    chars = 0
+    pages = extraction_executor.iter_pdf_pages(
+        binary_content,
+        batch_size=settings.pdf_page_batch_size,
+        max_pages=max_pages
+    )
     try:
-        # Decode base64 content
-        binary_content = base64.b64decode(content.split(',')[-1])  # Handle data URI format
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(binary_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        async for page_number, total_pages, page_text in pages:
+            page_text += "\n"
+            if max_chars and chars + len(page_text) > max_chars:
+                page_text = page_text[:max_chars - chars]
+            parts.append(page_text)
+            chars += len(page_text)
+            
+            if on_page:
+                await on_page(page_number, total_pages)
+            
+            if max_chars and chars >= max_chars:
+                logging.info(f"PDF character budget reached at page {page_number} of {total_pages}")
+                break
+    finally:
+        # Stop submitting page batches once we are done
+        await pages.aclose()
+    return "".join(parts)
+
+async def extract_text_from_pdf(
+    content: Union[str, bytes],
+    on_page: Optional[PageCallback] = None
+) -> str:
+    """
+    Extract text content from a PDF file, up to the configured page and character budget
+    
+    Args:
+        content: Raw PDF bytes or base64 encoded PDF content
+        on_page: Optional callback receiving (page_number, total_pages) per extracted page
+    """
+    try:
+        binary_content = decode_file_content(content)
+        # Parse the PDF page by page in the extraction pool
+        kind = f"pdf-{settings.pdf_max_pages}p-{settings.pdf_max_chars}c"
+        with timed_stage("pdf_parse"):
+            return await extract_cached(binary_content, kind, partial(extract_pdf_prefix, on_page=on_page))
+    except ExtractionError:
+        raise
     except Exception as e:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
-async def extract_text_from_image(content: str) -> str:
+async def extract_text_from_image(content: Union[str, bytes]) -> str:
     """
     Extract text content from an image using OCR
     
     Args:
-        content: Base64 encoded image content
+        content: Raw image bytes or base64 encoded image content
     """
     try:
-        # Handle data URI format (e.g., "data:image/jpeg;base64,/9j/4AAQSkZ...")
-        if ',' in content:
-            content = content.split(',', 1)[1]
-            
-        # Decode base64 content
-        binary_content = base64.b64decode(content)
-        # Open image using PIL
-        image = Image.open(io.BytesIO(binary_content))
-        # Use pytesseract to extract text
-        text = pytesseract.image_to_string(image)
-        return text
+        binary_content = decode_file_content(content)
+        # Preprocess and OCR in the extraction pool, large scans in parallel strips
+        kind = (
+            f"image-{settings.ocr_target_dpi}dpi-{int(settings.ocr_binarize)}{int(settings.ocr_deskew)}"
+            f"-{settings.ocr_tile_min_pixels}x{settings.ocr_tiles}"
+        )
+        extract = partial(
+            extraction_executor.extract_image_text,
+            target_dpi=settings.ocr_target_dpi,
+            binarize=settings.ocr_binarize,
+            deskew=settings.ocr_deskew,
+            tile_min_pixels=settings.ocr_tile_min_pixels,
+            tiles=settings.ocr_tiles
+        )
+        with timed_stage("ocr"):
+            return await extract_cached(binary_content, kind, extract)
+    except ExtractionError:
+        raise
     except Exception as e:
         raise Exception(f"Failed to extract text from image: {str(e)}")
 
-@app.post("/chat")
-async def chat(request: Request, message: ChatMessage):
-    """Endpoint for chat interactions using OpenAI's API with function calling."""
+@app.get("/health")
+async def health(request: Request):
+    """
+    Liveness and readiness.
+
+    The server answers requests as soon as it is up; `ready` turns true once
+    the agent pool warm-up has finished (or failed, or is disabled), after
+    which agent requests no longer pay for building their agent.
+    """
+    agent_pool = getattr(request.app.state, "agent_pool", "disabled")
+    return {"status": "ok", "ready": agent_pool != "warming", "agent_pool": agent_pool}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint, served from process-local metrics"""
+    if not settings.metrics_endpoint_enabled:
+        raise HTTPException(status_code=404, detail="Metrics endpoint is disabled")
+    return Response(prometheus_metrics.render(), media_type=CONTENT_TYPE)
+
+@app.post(
+    "/chat",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": ChatMessage.model_json_schema()},
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "content": {"type": "string"},
+                            "role": {"type": "string", "default": "user"},
+                            "file": {"type": "string", "format": "binary"}
+                        },
+                        "required": ["content"]
+                    }
+                }
+            }
+        }
+    }
+)
+async def chat(request: Request):
+    """
+    Endpoint for chat interactions using OpenAI's API with function calling.
+    
+    Accepts a JSON ChatMessage (base64 or byte-array file content) or a multipart
+    form with a binary `file` part, which skips the base64 round-trip. Bodies with a
+    file over max_upload_bytes are rejected with 413 while they are still arriving.
+    """
     try:
-        # Log the raw request for debugging
-        body = await request.body()
-        logging.info(f"Raw request body: {body.decode()}")
-        logging.info(f"Parsed message: {message.dict()}")
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            message, file_content = await receive_multipart_message(request)
+        else:
+            # Base64 makes the file a third larger than its bytes
+            limit = settings.max_upload_bytes * 4 // 3 + REQUEST_ENVELOPE_BYTES
+            body = b"".join([chunk async for chunk in limited_body(request, limit)])
+            try:
+                message = ChatMessage.model_validate_json(body)
+            except ValidationError as e:
+                # The raw body is not JSON serializable; leave it out of the error details
+                raise RequestValidationError(e.errors(include_input=False, include_url=False))
+            file_content = None
+            if message.file and message.file.content:
+                check_upload_size(message.file.content_size())
+                file_content = message.file.to_bytes()
         
         # Log incoming request
         logging.info(f"Received chat request with content: {message.content}")
@@ -228,7 +652,6 @@ async def chat(request: Request, message: ChatMessage):
         # Prepare context (if a file is provided)
         context: Dict = {}
         if message.file:
-            file_content = message.file.content
             file_type = message.file.type
             
             if not file_content:
@@ -253,6 +676,12 @@ async def chat(request: Request, message: ChatMessage):
                     "text": document_text,
                     "type": file_type
                 }
+            except HTTPException:
+                raise
+            except ExtractionQueueFullError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except ExtractionTimeoutError as e:
+                raise HTTPException(status_code=504, detail=str(e))
             except Exception as e:
                 logging.error(f"Error processing file: {str(e)}")
                 raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
@@ -261,7 +690,12 @@ async def chat(request: Request, message: ChatMessage):
         agent = OpenAIAgent(
             model_name=settings.default_model,
             api_key=settings.openai_api_key,
-            system_prompt="You are a helpful assistant."
+            system_prompt="You are a helpful assistant.",
+            temperature=settings.openai_temperature,
+            response_cache=response_cache,
+            retriever=document_retriever,
+            token_budget=token_budget,
+            endpoint="chat_http"
         )
         
         final_response = await agent.process_message(message.content, context)
@@ -270,6 +704,10 @@ async def chat(request: Request, message: ChatMessage):
             "response": final_response
         }
                 
+    except RequestValidationError:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logging.error(f"Error processing chat: {str(e)}")
         if isinstance(e, HTTPException):
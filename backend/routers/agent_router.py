@@ -1,19 +1,19 @@
-from fastapi import APIRouter, HTTPException, WebSocket, Depends
-from typing import Dict, Optional, List
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from typing import Dict, Optional
 from pydantic import BaseModel
 import logging
 import asyncio
 
-from agents.factory import create_agent, AgentType
-from agents.base import AgentConfig
-from config import get_settings
-from database.prompt_store import store_prompt
+from ..agents.factory import AgentType
+from ..agents.base import AgentConfig
+from ..agents.executor import AgentQueueFullError
+from ..agents.pool import get_agent_pool
+from ..config import get_settings
+from ..database.prompt_store import store_prompt
+from ..services.connection_manager import get_connection_manager
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
 
-# Store active WebSocket connections
-active_connections: List[WebSocket] = []
-
 class ChatRequest(BaseModel):
     message: str
     context: Optional[Dict] = None
@@ -28,6 +28,34 @@ class AgentMessage(BaseModel):
     content: str
     metadata: Optional[Dict] = None
 
+def step_update(step, max_steps: int) -> Dict:
+    """Status frame for a finished agent step, sent while the agent keeps working"""
+    return {
+        "type": "status",
+        "content": f"Processing step {step.step_number}",
+        "metadata": {
+            "step": step.step_number,
+            "tool": step.tool_calls[0].name if step.tool_calls else None,
+            "total_steps": max_steps,
+            "duration": step.duration,
+            "observations": step.observations,
+            "error": str(step.error) if step.error else None
+        }
+    }
+
+async def run_agent(agent, message: str, context: Optional[Dict] = None) -> Dict:
+    """Run one agent turn to completion and return the final answer with this turn's steps"""
+    steps = [step async for step in agent.process_message(message, context)]
+    answer = steps[-1].action_output if steps else None
+    return {
+        "response": str(answer) if answer is not None else "",
+        # Model inputs and raw outputs are large and not JSON-serialisable
+        "logs": [
+            {key: value for key, value in step.dict().items() if key not in ("model_input_messages", "model_output_message")}
+            for step in steps
+        ]
+    }
+
 async def get_agent_config():
     settings = get_settings()
     return AgentConfig(
@@ -37,23 +65,32 @@ async def get_agent_config():
         planning_interval=settings.planning_interval
     )
 
+def document_mode(config: AgentConfig) -> AgentConfig:
+    """Config for document processing: plan every 2 steps"""
+    return config.model_copy(update={"planning_interval": 2})
+
+def http_agent_config() -> AgentConfig:
+    settings = get_settings()
+    return AgentConfig(
+        model_name="gpt-4",
+        api_key=settings.openai_api_key
+    )
+
+async def warm_agent_pool(count: int) -> None:
+    """Pre-build agents for every config the routes use, so requests skip construction"""
+    ws_config = await get_agent_config()
+    http_config = http_agent_config()
+    for config in (ws_config, document_mode(ws_config), http_config, document_mode(http_config)):
+        await get_agent_pool().warm(AgentType.CHAT, config, count)
+
 @router.post("/chat")
 async def chat_with_agent(request: ChatRequest):
     """Handle regular chat interactions"""
     try:
-        settings = get_settings()
-        config = AgentConfig(
-            model_name="gpt-4",
-            api_key=settings.openai_api_key
-        )
-        
-        agent = create_agent(AgentType.CHAT, config)
-        response = await agent.process_message(request.message, request.context)
-        
-        return {
-            "response": response,
-            "logs": [step.dict() for step in agent.get_agent_logs()]
-        }
+        async with get_agent_pool().agent(AgentType.CHAT, http_agent_config()) as agent:
+            return await run_agent(agent, request.message, request.context)
+    except AgentQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -61,23 +98,14 @@ async def chat_with_agent(request: ChatRequest):
 async def analyze_document(request: DocumentRequest):
     """Handle document analysis requests"""
     try:
-        settings = get_settings()
-        config = AgentConfig(
-            model_name="gpt-4",
-            api_key=settings.openai_api_key,
-            planning_interval=2  # Plan every 2 steps for document analysis
-        )
-        
-        agent = create_agent(AgentType.DOCUMENT, config)
-        response = await agent.process_message(
-            f"Analyze document {request.doc_id} of type {request.doc_type}",
-            context=request.context
-        )
-        
-        return {
-            "response": response,
-            "logs": [step.dict() for step in agent.get_agent_logs()]
-        }
+        async with get_agent_pool().agent(AgentType.CHAT, document_mode(http_agent_config())) as agent:
+            return await run_agent(
+                agent,
+                f"Analyze document {request.doc_id} of type {request.doc_type}",
+                context=request.context
+            )
+    except AgentQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -88,11 +116,13 @@ async def agent_websocket(
 ):
     """WebSocket endpoint for all agent interactions"""
     await websocket.accept()
-    active_connections.append(websocket)
+    connection = get_connection_manager().connect(websocket, channel="agent")
+    pool = get_agent_pool()
+    agent = None
     
     try:
-        # Create a single agent instance for this connection
-        agent = create_agent(AgentType.CHAT, config)
+        # Check out a single agent for this connection
+        agent = await pool.checkout(AgentType.CHAT, config)
         
         while True:
             try:
@@ -103,7 +133,9 @@ async def agent_websocket(
                 # Handle different message types
                 if message.type == "document":
                     # Switch to document processing mode
-                    agent = create_agent(AgentType.DOCUMENT, config)
+                    pool.checkin(agent)
+                    agent = None
+                    agent = await pool.checkout(AgentType.CHAT, document_mode(config))
                     context = message.metadata
                 elif message.type == "store_prompt":
                     # Handle storing custom prompts
@@ -116,7 +148,7 @@ async def agent_websocket(
                         prompt=message.content
                     )
                     
-                    await websocket.send_json({
+                    await connection.send_json({
                         "type": "status",
                         "content": "Prompt stored successfully" if success else "Failed to store prompt"
                     })
@@ -124,56 +156,48 @@ async def agent_websocket(
                 else:
                     context = message.metadata
                 
-                # Process through agent
+                # Process through agent, sending each step as soon as it finishes
+                final_step = None
                 async for step in agent.process_message(message.content, context):
-                    # Send step updates
-                    await websocket.send_json({
-                        "type": "status",
-                        "content": f"Processing step {step.step_number}",
-                        "metadata": {
-                            "step": step.step_number,
-                            "tool": step.tool_calls[0].name if step.tool_calls else None,
-                            "total_steps": config.max_steps
-                        }
+                    final_step = step
+                    await connection.send_json(step_update(step, config.max_steps))
+                
+                # The last step carries the final answer
+                if final_step is not None and final_step.action_output is not None:
+                    await connection.send_json({
+                        "type": "message",
+                        "content": str(final_step.action_output)
                     })
-                    
-                    # If we have a final answer, send it as a message
-                    if step.action_output:
-                        await websocket.send_json({
-                            "type": "message",
-                            "content": step.action_output
-                        })
+                
+            except WebSocketDisconnect:
+                raise
                 
             except asyncio.TimeoutError:
-                await websocket.send_json({
+                await connection.send_json({
                     "type": "error",
                     "content": "Processing timed out. Please try again."
                 })
                 
             except Exception as e:
                 logging.error(f"Error processing message: {str(e)}")
-                await websocket.send_json({
+                await connection.send_json({
                     "type": "error",
                     "content": f"Error: {str(e)}"
                 })
                 
+    except WebSocketDisconnect:
+        logging.info("Agent WebSocket client disconnected")
+        
     except Exception as e:
         logging.error(f"WebSocket error: {str(e)}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-            
+        
     finally:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        if agent is not None:
+            pool.checkin(agent)
+        await get_connection_manager().disconnect(connection)
         if not websocket.client_state.DISCONNECTED:
             await websocket.close()
 
-async def broadcast_to_connections(message: Dict):
-    """Broadcast a message to all active connections"""
-    for connection in active_connections:
-        try:
-            await connection.send_json(message)
-        except Exception as e:
-            logging.error(f"Error broadcasting to connection: {str(e)}")
-            if connection in active_connections:
-                active_connections.remove(connection) 
\ No newline at end of file
+async def broadcast_to_connections(message: Dict) -> int:
+    """Broadcast a message to all agent connections without waiting on slow clients"""
+    return await get_connection_manager().broadcast(message, channel="agent")
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from pydantic import BaseModel
+import json
+
+from ..config import get_settings
+from ..services.bludelta_service import bludelta_service
+
+router = APIRouter(prefix="/api/documents", tags=["documents"])
+
+class BatchAnalyzeRequest(BaseModel):
+    doc_ids: List[str]
+    prompt: str
+    concurrency: Optional[int] = None  # Defaults to bludelta_batch_concurrency
+    stream: bool = False  # Stream NDJSON results as they complete
+
+@router.post("/analyze-batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """
+    Analyze many documents with BluDelta using bounded concurrency.
+
+    Returns results in request order with per-item errors, or, with `stream`,
+    one NDJSON line per document as soon as it completes.
+    """
+    settings = get_settings()
+    if len(request.doc_ids) > settings.bludelta_batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the limit of {settings.bludelta_batch_max_size} documents"
+        )
+    concurrency = min(
+        request.concurrency or settings.bludelta_batch_concurrency,
+        settings.bludelta_batch_concurrency
+    )
+
+    if request.stream:
+        async def stream_results():
+            async for item in bludelta_service.iter_analyze_documents(
+                request.doc_ids, request.prompt, concurrency
+            ):
+                yield json.dumps(item) + "\n"
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    results = await bludelta_service.analyze_documents(request.doc_ids, request.prompt, concurrency)
+    return {
+        "results": results
+    }
@@ -1,36 +1,232 @@
-from typing import Dict
+from typing import AsyncGenerator, Dict, List, Optional
+import asyncio
+import logging
+import random
+import time
 import httpx
-from ..config import get_settings
+from ..config import Settings, get_settings
+from ..telemetry.bludelta_metrics import (
+    bludelta_request_duration,
+    bludelta_request_retries,
+    bludelta_requests_in_flight,
+    register_pool_observer,
+)
+from ..telemetry.stages import timed
+
+# Responses worth retrying on idempotent calls
+RETRY_STATUS_CODES = {429, 502, 503, 504}
 
 class BluDeltaService:
-    def __init__(self):
-        self.settings = get_settings()
-        self.base_url = self.settings.bludelta_service_url
-        
+    """
+    Client for BluDeltaService backed by one long-lived, pooled HTTP client.
+
+    The client is created on first use and closed from the FastAPI lifespan.
+    Pass `transport` to run against a local stand-in server in tests.
+    """
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self._settings = settings
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+
+    @property
+    def settings(self) -> Settings:
+        return self._settings or get_settings()
+
+    @property
+    def base_url(self) -> str:
+        return self.settings.bludelta_service_url
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            settings = self.settings
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {settings.bludelta_api_key}"},
+                http2=settings.bludelta_http2,
+                limits=httpx.Limits(
+                    max_connections=settings.bludelta_max_connections,
+                    max_keepalive_connections=settings.bludelta_max_keepalive_connections
+                ),
+                timeout=httpx.Timeout(
+                    settings.bludelta_info_timeout,
+                    connect=settings.bludelta_connect_timeout
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the HTTP client and its connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Return connection pool usage (best effort, based on the httpcore pool)"""
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "active": len(connections) - idle,
+            "idle": idle,
+            "in_flight": self._in_flight
+        }
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        operation: str,
+        timeout: float,
+        idempotent: bool,
+        **kwargs
+    ) -> Dict:
+        """
+        Send a request, retrying with jittered exponential backoff.
+
+        Idempotent calls are retried on transport errors and retryable status codes;
+        other calls only when the connection could not be established, so the
+        request never reached BluDelta.
+        """
+        settings = self.settings
+        client = self._get_client()
+        attempt = 0
+        status = "error"
+        start_time = time.perf_counter()
+        self._in_flight += 1
+        bludelta_requests_in_flight.add(1, {"operation": operation})
+        try:
+            while True:
+                try:
+                    response = await client.request(
+                        method,
+                        path,
+                        timeout=httpx.Timeout(timeout, connect=settings.bludelta_connect_timeout),
+                        **kwargs
+                    )
+                    if not (idempotent and response.status_code in RETRY_STATUS_CODES):
+                        status = str(response.status_code)
+                        response.raise_for_status()
+                        return response.json()
+                    retry_error: Exception = httpx.HTTPStatusError(
+                        f"BluDelta returned {response.status_code}",
+                        request=response.request,
+                        response=response
+                    )
+                except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                    retry_error = e
+                except httpx.TransportError as e:
+                    if not idempotent:
+                        raise
+                    retry_error = e
+
+                if attempt >= settings.bludelta_max_retries:
+                    if isinstance(retry_error, httpx.HTTPStatusError):
+                        status = str(retry_error.response.status_code)
+                    raise retry_error
+
+                # Full jitter keeps retries from many workers from synchronising
+                delay = random.uniform(0, settings.bludelta_retry_backoff * 2 ** attempt)
+                attempt += 1
+                logging.warning(f"Retrying BluDelta {operation} ({attempt}) after error: {str(retry_error)}")
+                bludelta_request_retries.add(1, {"operation": operation})
+                await asyncio.sleep(delay)
+        finally:
+            self._in_flight -= 1
+            bludelta_requests_in_flight.add(-1, {"operation": operation})
+            duration = (time.perf_counter() - start_time) * 1000
+            bludelta_request_duration.record(duration, {"operation": operation, "status": status})
+
+    @timed("bludelta", operation="analyze_document")
     async def analyze_document(self, doc_id: str, prompt: str) -> Dict:
         """
         Send document to BluDeltaService for analysis
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/analyze",
-                json={
-                    "doc_id": doc_id,
-                    "prompt": prompt
-                },
-                headers={"Authorization": f"Bearer {self.settings.bludelta_api_key}"}
-            )
-            response.raise_for_status()
-            return response.json()
+        return await self._request(
+            "POST",
+            "/analyze",
+            operation="analyze_document",
+            timeout=self.settings.bludelta_analyze_timeout,
+            idempotent=False,
+            json={
+                "doc_id": doc_id,
+                "prompt": prompt
+            }
+        )
 
+    @timed("bludelta", operation="get_document_info")
     async def get_document_info(self, doc_id: str) -> Dict:
         """
         Get document metadata from BluDeltaService
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/documents/{doc_id}",
-                headers={"Authorization": f"Bearer {self.settings.bludelta_api_key}"}
-            )
-            response.raise_for_status()
-            return response.json() 
\ No newline at end of file
+        return await self._request(
+            "GET",
+            f"/documents/{doc_id}",
+            operation="get_document_info",
+            timeout=self.settings.bludelta_info_timeout,
+            idempotent=True
+        )
+
+    async def iter_analyze_documents(
+        self,
+        doc_ids: List[str],
+        prompt: str,
+        concurrency: Optional[int] = None
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Analyze many documents concurrently, yielding results as they complete.
+
+        At most `concurrency` requests (default `bludelta_batch_concurrency`) are in
+        flight at once; closing the generator early cancels the remaining work.
+
+        Yields:
+            {"index", "doc_id", "result"} on success or {"index", "doc_id", "error"} on failure
+        """
+        concurrency = max(1, min(concurrency or self.settings.bludelta_batch_concurrency, len(doc_ids) or 1))
+        pending = iter(enumerate(doc_ids))
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            for index, doc_id in pending:
+                try:
+                    item = {"index": index, "doc_id": doc_id, "result": await self.analyze_document(doc_id, prompt)}
+                except Exception as e:
+                    logging.error(f"Error analyzing document {doc_id}: {str(e)}")
+                    item = {"index": index, "doc_id": doc_id, "error": str(e)}
+                await results.put(item)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(len(doc_ids)):
+                yield await results.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def analyze_documents(
+        self,
+        doc_ids: List[str],
+        prompt: str,
+        concurrency: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Analyze many documents with bounded concurrency.
+
+        Returns:
+            One entry per document, in the order of `doc_ids`, holding either
+            a "result" or an "error"
+        """
+        ordered: List[Optional[Dict]] = [None] * len(doc_ids)
+        async for item in self.iter_analyze_documents(doc_ids, prompt, concurrency):
+            ordered[item.pop("index")] = item
+        return ordered
+
+# Create a singleton instance
+bludelta_service = BluDeltaService()
+register_pool_observer(bludelta_service.pool_stats)
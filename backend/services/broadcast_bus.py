@@ -0,0 +1,188 @@
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from ..config import Settings
+
+# (channel, message) pairs handed to the local connection manager
+Broadcast = Tuple[Optional[str], Any]
+Deliver = Callable[[List[Broadcast]], int]
+
+class BroadcastBus:
+    """
+    In-process broadcast bus: messages reach the connections of this worker only.
+
+    Subclasses also forward broadcasts to other workers and hand the ones they
+    receive to `deliver`, the local connection manager's fan-out.
+    """
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, message: Any, channel: Optional[str] = None) -> int:
+        """Broadcast `message`; returns the number of local connections that accepted it"""
+        if self._deliver is None:
+            return 0
+        return self._deliver([(channel, message)])
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+class SQLiteBroadcastBus(BroadcastBus):
+    """
+    Broadcast bus shared by all workers on a host through a SQLite file.
+
+    Published messages are delivered locally right away and appended to the
+    file; each worker polls for rows written by the others. Writes and reads
+    are batched: everything published while the previous exchange ran goes
+    out in one transaction, and new rows are delivered in batches of up to
+    `batch_size`. Rows older than `retention` seconds are pruned.
+    """
+
+    def __init__(
+        self,
+        path: str = "./broadcast.db",
+        poll_interval: float = 0.05,
+        batch_size: int = 500,
+        retention: float = 60.0
+    ):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._conn: Optional[sqlite3.Connection] = None
+        # Cancelling _run does not stop an exchange already running in its thread
+        self._conn_lock = threading.Lock()
+        self._outbox: List[Tuple[Optional[str], str]] = []
+        self._wake = asyncio.Event()
+        self._last_id = 0
+        self._last_prune = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _open(self) -> None:
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcasts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, "
+            "channel TEXT, payload TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # Only deliver what is published from now on
+        self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM broadcasts").fetchone()[0]
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._run())
+
+    async def publish(self, message: Any, channel: Optional[str] = None) -> int:
+        delivered = await super().publish(message, channel)
+        self._outbox.append((channel, json.dumps(message)))
+        self._wake.set()
+        return delivered
+
+    def _exchange(self, outbox: List[Tuple[Optional[str], str]]) -> List[Broadcast]:
+        """Write our pending broadcasts and read the other workers' new ones"""
+        now = time.time()
+        with self._conn_lock:
+            if self._conn is None:
+                return []
+            if outbox:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO broadcasts (origin, channel, payload, created) VALUES (?, ?, ?, ?)",
+                        [(self.origin, channel, payload, now) for channel, payload in outbox]
+                    )
+            rows = self._conn.execute(
+                "SELECT id, origin, channel, payload FROM broadcasts WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, self.batch_size)
+            ).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+            if now - self._last_prune > self.retention:
+                with self._conn:
+                    self._conn.execute("DELETE FROM broadcasts WHERE created < ?", (now - self.retention,))
+                self._last_prune = now
+        received = []
+        for row_id, origin, channel, payload in rows:
+            if origin == self.origin:
+                continue
+            try:
+                received.append((channel, json.loads(payload)))
+            except (TypeError, ValueError) as e:
+                # Already behind _last_id, so it is skipped rather than read again on every poll
+                logging.error(f"Skipping malformed broadcast {row_id}: {str(e)}")
+        return received
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            outbox, self._outbox = self._outbox, []
+            try:
+                received = await asyncio.to_thread(self._exchange, outbox)
+            except sqlite3.Error as e:
+                logging.error(f"Error exchanging broadcasts: {str(e)}")
+                # Keep the messages for the next attempt
+                self._outbox[:0] = outbox
+                continue
+            except Exception as e:
+                # Anything else must not end the poll loop, or this worker stops hearing the others
+                logging.error(f"Error exchanging broadcasts: {str(e)}")
+                continue
+            if received and self._deliver is not None:
+                try:
+                    self._deliver(received)
+                except Exception as e:
+                    logging.error(f"Error delivering broadcasts: {str(e)}")
+            if len(received) >= self.batch_size:
+                # More rows are waiting; read them without sleeping
+                self._wake.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._outbox and self._conn is not None:
+            # Flush what was published during shutdown
+            outbox, self._outbox = self._outbox, []
+            await asyncio.to_thread(self._exchange, outbox)
+        await asyncio.to_thread(self._close)
+        await super().stop()
+
+    def _close(self) -> None:
+        # Waits for an exchange still running in a worker thread
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def create_broadcast_bus(settings: Settings) -> BroadcastBus:
+    """Create the bus selected by `settings.broadcast_backend` ("local" or "sqlite")"""
+    if settings.broadcast_backend == "local":
+        return BroadcastBus()
+    if settings.broadcast_backend == "sqlite":
+        return SQLiteBroadcastBus(
+            path=settings.broadcast_sqlite_path,
+            poll_interval=settings.broadcast_poll_interval,
+            retention=settings.broadcast_retention
+        )
+    raise ValueError(f"Unknown broadcast backend: {settings.broadcast_backend}")
@@ -0,0 +1,264 @@
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import logging
+import time
+import uuid
+from fastapi import WebSocket, WebSocketDisconnect
+from ..config import get_settings
+from .broadcast_bus import Broadcast, BroadcastBus
+from ..telemetry.websocket_metrics import (
+    register_lag_observer,
+    websocket_connections,
+    websocket_messages_dropped,
+    websocket_send_lag,
+    websocket_slow_disconnects,
+)
+from ..telemetry.stages import timed_stage
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+# Close code sent to clients disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class ManagedConnection:
+    """
+    A WebSocket with its own bounded outbound queue, drained by a writer task.
+
+    Replies to the client (`send_json`) wait for room in the queue; broadcasts
+    (`offer`) never wait and apply the manager's slow-consumer policy instead.
+    The policy only ever drops broadcasts, so a streamed reply stays intact.
+    """
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, channel: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.manager = manager
+        self.websocket = websocket
+        self.channel = channel
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        # (enqueued at, message, is broadcast)
+        self._pending: Deque[Tuple[float, Any, bool]] = deque()
+        self._sending_since: Optional[float] = None
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest unsent message has been waiting, including one being sent"""
+        oldest = self._sending_since
+        if self._pending and (oldest is None or self._pending[0][0] < oldest):
+            oldest = self._pending[0][0]
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def _enqueue(self, message: Any, broadcast: bool = False) -> None:
+        self._pending.append((time.monotonic(), message, broadcast))
+        self._drained.clear()
+        self._ready.set()
+
+    async def send_json(self, message: Any) -> None:
+        """Queue a message for this client, waiting while the queue is full"""
+        if self.closed:
+            raise WebSocketDisconnect(1006)
+        try:
+            while len(self._pending) >= self.manager.max_queue_size:
+                self._space.clear()
+                await asyncio.wait_for(self._space.wait(), self.manager.send_timeout)
+                if self.closed:
+                    raise WebSocketDisconnect(1006)
+        except asyncio.TimeoutError:
+            await self.manager.close_slow(self)
+            raise WebSocketDisconnect(SLOW_CONSUMER_CLOSE_CODE)
+        self._enqueue(message)
+
+    def offer(self, message: Any) -> bool:
+        """Queue a broadcast without waiting; returns False if it was not queued"""
+        if self.closed:
+            return False
+        if len(self._pending) >= self.manager.max_queue_size:
+            policy = self.manager.slow_consumer_policy
+            if policy == "disconnect":
+                asyncio.create_task(self.manager.close_slow(self))
+                return False
+            self.dropped += 1
+            websocket_messages_dropped.add(1, {"policy": policy, "channel": self.channel})
+            if policy == "drop_newest" or not self._drop_oldest_broadcast():
+                return False
+        self._enqueue(message, broadcast=True)
+        return True
+
+    def _drop_oldest_broadcast(self) -> bool:
+        """Remove the oldest queued broadcast; False if the queue holds only replies"""
+        for index, (_, _, broadcast) in enumerate(self._pending):
+            if broadcast:
+                del self._pending[index]
+                return True
+        return False
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                if not self._pending:
+                    self._drained.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                enqueued_at, message, _ = self._pending.popleft()
+                self._space.set()
+                self._sending_since = enqueued_at
+                with timed_stage("websocket_send", span=False, channel=self.channel):
+                    await self.websocket.send_json(message)
+                self._sending_since = None
+                self.sent += 1
+                websocket_send_lag.record((time.monotonic() - enqueued_at) * 1000, {"channel": self.channel})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The client is gone; stop queueing for it
+            logging.info(f"WebSocket writer for connection {self.id} stopped: {str(e)}")
+            self.closed = True
+            self._space.set()
+            self._drained.set()
+            self.manager.forget(self)
+
+    async def close(self, drain_timeout: float = 1.0) -> None:
+        """Stop the writer, first giving queued messages `drain_timeout` seconds to go out"""
+        if not self.closed and drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._drained.wait(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.closed = True
+        self._space.set()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+
+class ConnectionManager:
+    """
+    Registry of open WebSockets with concurrent, non-blocking fan-out.
+
+    Each connection has a queue of at most `max_queue_size` messages. When a
+    broadcast finds a queue full, `slow_consumer_policy` decides: drop the
+    oldest queued broadcast, drop the new one, or disconnect the client.
+    With a broadcast bus attached, broadcasts also reach the clients of other
+    workers.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 256,
+        slow_consumer_policy: str = "drop_oldest",
+        send_timeout: float = 10.0
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.max_queue_size = max_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self._connections: Dict[str, ManagedConnection] = {}
+        self.bus: Optional[BroadcastBus] = None
+
+    async def attach_bus(self, bus: BroadcastBus) -> None:
+        """Route broadcasts through `bus` so every worker delivers them"""
+        await self.detach_bus()
+        await bus.start(self.deliver)
+        self.bus = bus
+
+    async def detach_bus(self) -> None:
+        if self.bus is not None:
+            bus, self.bus = self.bus, None
+            await bus.stop()
+
+    def connect(self, websocket: WebSocket, channel: str = "default") -> ManagedConnection:
+        """Register an accepted WebSocket and start its writer"""
+        connection = ManagedConnection(self, websocket, channel)
+        self._connections[connection.id] = connection
+        websocket_connections.add(1, {"channel": channel})
+        return connection
+
+    def forget(self, connection: ManagedConnection) -> None:
+        if self._connections.pop(connection.id, None) is not None:
+            websocket_connections.add(-1, {"channel": connection.channel})
+
+    async def disconnect(self, connection: ManagedConnection, drain_timeout: float = 1.0) -> None:
+        """Unregister a connection after flushing what is still queued for it"""
+        self.forget(connection)
+        await connection.close(drain_timeout)
+
+    async def close_slow(self, connection: ManagedConnection) -> None:
+        """Disconnect a client that cannot keep up"""
+        if connection.closed:
+            return
+        logging.warning(f"Disconnecting slow WebSocket consumer {connection.id} ({connection.queued} messages queued)")
+        websocket_slow_disconnects.add(1, {"channel": connection.channel})
+        self.forget(connection)
+        await connection.close(drain_timeout=0)
+        try:
+            await connection.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass  # Already closed
+
+    def connections(self, channel: Optional[str] = None) -> List[ManagedConnection]:
+        return [c for c in self._connections.values() if channel is None or c.channel == channel]
+
+    def broadcast_local(self, message: Any, channel: Optional[str] = None) -> int:
+        """Queue `message` for every connection in this process; returns how many accepted it"""
+        # Iterate over a snapshot, connections may go away while we offer
+        return sum(1 for connection in self.connections(channel) if connection.offer(message))
+
+    def deliver(self, broadcasts: List[Broadcast]) -> int:
+        """Fan out a batch of (channel, message) broadcasts received from the bus"""
+        return sum(self.broadcast_local(message, channel) for channel, message in broadcasts)
+
+    async def broadcast(self, message: Any, channel: Optional[str] = None) -> int:
+        """
+        Send `message` to all connections (optionally one channel) without waiting on any of them.
+
+        Returns the number of connections in this worker that accepted it.
+        """
+        if self.bus is None:
+            return self.broadcast_local(message, channel)
+        return await self.bus.publish(message, channel)
+
+    def lag_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-connection queue depth, lag and counters"""
+        return {
+            connection.id: {
+                "channel": connection.channel,
+                "queued": connection.queued,
+                "lag_ms": connection.lag * 1000,
+                "sent": connection.sent,
+                "dropped": connection.dropped
+            }
+            for connection in list(self._connections.values())
+        }
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+_connection_manager: Optional[ConnectionManager] = None
+
+def get_connection_manager() -> ConnectionManager:
+    """Return the process-wide connection manager, configured from settings on first use"""
+    global _connection_manager
+    if _connection_manager is None:
+        settings = get_settings()
+        _connection_manager = ConnectionManager(
+            max_queue_size=settings.websocket_send_queue_size,
+            slow_consumer_policy=settings.websocket_slow_consumer_policy,
+            send_timeout=settings.websocket_send_timeout
+        )
+        register_lag_observer(_connection_manager.lag_stats)
+    return _connection_manager
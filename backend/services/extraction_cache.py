@@ -0,0 +1,118 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import os
+from .extraction_service import EXTRACTOR_VERSION
+from ..telemetry.extraction_metrics import (
+    extraction_cache_evictions,
+    extraction_cache_hits,
+    extraction_cache_misses,
+)
+
+class ExtractionCache:
+    """
+    Content-addressed cache for extracted document text.
+
+    Entries are keyed by the SHA-256 of the decoded file bytes, the extractor
+    kind and EXTRACTOR_VERSION. An in-memory LRU tier bounded by total text
+    length sits in front of an optional on-disk tier that survives restarts.
+    """
+
+    def __init__(self, max_chars: int = 64 * 1024 * 1024, cache_dir: Optional[str] = None):
+        self.max_chars = max_chars
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data: bytes, kind: str) -> str:
+        """Build the cache key for the given file bytes and extractor kind"""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{kind}-v{EXTRACTOR_VERSION}-{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up extracted text, promoting disk hits into memory"""
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+            self._record_hit("memory")
+            return text
+
+        if self.cache_dir:
+            text = await asyncio.to_thread(self._read_disk, key)
+            if text is not None:
+                self._remember(key, text)
+                self._record_hit("disk")
+                return text
+
+        self.misses += 1
+        extraction_cache_misses.add(1)
+        return None
+
+    async def put(self, key: str, text: str) -> None:
+        """Store extracted text in memory and, if enabled, on disk"""
+        self._remember(key, text)
+        if self.cache_dir:
+            try:
+                await asyncio.to_thread(self._write_disk, key, text)
+            except OSError as e:
+                logging.error(f"Error writing extraction cache entry: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters and the current in-memory size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "chars": self._chars
+        }
+
+    def clear(self):
+        """Clear the in-memory tier"""
+        self._entries.clear()
+        self._chars = 0
+
+    def _record_hit(self, tier: str) -> None:
+        self.hits += 1
+        extraction_cache_hits.add(1, {"tier": tier})
+
+    def _remember(self, key: str, text: str) -> None:
+        size = len(text)
+        if size > self.max_chars:
+            return
+        if key in self._entries:
+            self._chars -= len(self._entries.pop(key))
+        self._entries[key] = text
+        self._chars += size
+        while self._chars > self.max_chars:
+            _, evicted = self._entries.popitem(last=False)
+            self._chars -= len(evicted)
+            self.evictions += 1
+            extraction_cache_evictions.add(1)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[-2:], f"{key}.txt")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Atomic rename so concurrent workers never read a partial file
+        os.replace(tmp_path, path)
@@ -0,0 +1,552 @@
+from typing import Any, AsyncGenerator, Callable, List, Optional, Set, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty, Full
+import multiprocessing
+import asyncio
+import io
+import logging
+import os
+import pickle
+import signal
+import threading
+
+# Bump whenever extractor output changes so cached text is not reused
+EXTRACTOR_VERSION = "2"
+
+class ExtractionError(Exception):
+    """Base error for document extraction jobs"""
+
+class ExtractionQueueFullError(ExtractionError):
+    """Raised when the extraction queue is at capacity"""
+
+class ExtractionTimeoutError(ExtractionError):
+    """Raised when an extraction job exceeds its timeout"""
+
+def _put_batch(batches, item, stop) -> bool:
+    # Bounded queue: wait for the consumer, but give up once it has stopped listening
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+def extract_pdf_page_batches(data: bytes, batches, stop, batch_size: int = 4, max_pages: int = 0) -> int:
+    """
+    Parse a PDF once and stream its page text in batches. Runs inside a worker process.
+
+    Puts (total_pages, first_page_index, texts) on `batches` for every
+    `batch_size` pages, then None. Returns early once `stop` is set.
+
+    Args:
+        data: Raw PDF bytes
+        batches: Bounded queue (e.g. a multiprocessing manager queue) read by the caller
+        stop: Event set by the caller when it wants no more pages
+        batch_size: Pages per queued batch
+        max_pages: Stop after this many pages (0 = no limit)
+
+    Returns:
+        Total page count of the document
+    """
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total_pages = len(pdf_reader.pages)
+    end = min(total_pages, max_pages) if max_pages else total_pages
+    for start in range(0, end, batch_size):
+        texts = [pdf_reader.pages[index].extract_text() for index in range(start, min(start + batch_size, end))]
+        if not _put_batch(batches, (total_pages, start, texts), stop):
+            return total_pages
+    _put_batch(batches, None, stop)
+    return total_pages
+
+# Long side of an A4 page; images without a trustworthy resolution are assumed to show one
+PAGE_LONG_SIDE_INCHES = 11.69
+
+def _otsu_threshold(image) -> int:
+    """Grey level that best separates ink from paper in a grayscale image"""
+    histogram = image.histogram()
+    total = sum(histogram)
+    grand_sum = sum(level * count for level, count in enumerate(histogram))
+    background = background_sum = 0
+    best_level, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (grand_sum - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+def _row_means(image) -> List[float]:
+    from PIL import Image
+    return list(image.resize((1, image.height), Image.BOX).tobytes())
+
+def _skew_angle(image, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """
+    Rotation in degrees that lines text up horizontally, found by projection profiles.
+
+    Text lines give the sharpest row profile when they are level, so every
+    candidate angle is tried on a reduced copy and the sharpest one wins.
+    """
+    from PIL import Image
+    sample = image
+    if sample.width > 1000:
+        sample = sample.resize((1000, max(1, sample.height * 1000 // sample.width)), Image.BILINEAR)
+
+    def sharpness(angle: float) -> float:
+        rows = _row_means(sample.rotate(angle, resample=Image.BILINEAR, fillcolor=255))
+        return sum((below - above) ** 2 for above, below in zip(rows, rows[1:]))
+
+    steps = int(max_angle / step)
+    return max((i * step for i in range(-steps, steps + 1)), key=lambda angle: (sharpness(angle), -abs(angle)))
+
+def preprocess_image(image, target_dpi: int = 300, binarize: bool = True, deskew: bool = False):
+    """
+    Prepare a decoded image for Tesseract and return it as a grayscale image.
+
+    Applies the EXIF orientation, flattens transparency onto white, downscales
+    to about `target_dpi` (never upscales), optionally straightens skewed
+    scans and binarizes with an Otsu threshold.
+
+    Args:
+        image: PIL image, ideally fresh from Image.open so JPEGs can be decoded reduced
+        target_dpi: Resolution to reduce to, assuming the image shows an A4 page (0 = keep)
+        binarize: Convert to black and white
+        deskew: Detect and undo a rotation of up to 5 degrees
+    """
+    from PIL import Image, ImageOps
+
+    # Scanner and phone dpi tags are unreliable; judge resolution by pixels per page
+    long_side = round(target_dpi * PAGE_LONG_SIDE_INCHES) if target_dpi else max(image.size)
+    scale = min(1.0, long_side / max(image.size))
+    # Lets the JPEG decoder produce luma only, reduced by 1/2, 1/4 or 1/8 where that still fits
+    image.draft("L", (round(image.width * scale), round(image.height * scale)))
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        image = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image.alpha_composite(rgba)
+    if image.mode != "L":
+        image = image.convert("L")
+
+    scale = long_side / max(image.size)
+    if scale < 1.0:
+        size = (round(image.width * scale), round(image.height * scale))
+        image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+    if deskew:
+        angle = _skew_angle(image)
+        if angle:
+            image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+
+    if binarize:
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda value: 255 if value > threshold else 0)
+    return image
+
+def band_boxes(image, bands: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Split an image into `bands` horizontal strips, cut along the blankest rows.
+
+    Cuts move up to a quarter band away from the even split to find a gap
+    between text lines, so no line is cut in half. Returned top to bottom,
+    which is the reading order the strips' text is joined in.
+    """
+    width, height = image.size
+    rows = _row_means(image)
+    window = height // (bands * 4)
+    cuts = [0]
+    for k in range(1, bands):
+        target = k * height // bands
+        low, high = max(cuts[-1] + 1, target - window), min(height - 1, target + window)
+        if low > high:
+            continue
+        cuts.append(max(range(low, high + 1), key=lambda y: (rows[y], -abs(y - target))))
+    cuts.append(height)
+    return [(0, top, width, bottom) for top, bottom in zip(cuts, cuts[1:]) if bottom > top]
+
+def prepare_image_ocr(
+    data: bytes,
+    target_dpi: int = 300,
+    binarize: bool = True,
+    deskew: bool = False,
+    tile_min_pixels: int = 0,
+    tiles: int = 1
+) -> Tuple[Optional[str], List[bytes]]:
+    """
+    Preprocess an image and either OCR it or split it for parallel OCR. Runs inside a worker process.
+
+    Returns:
+        (text, []) for images below `tile_min_pixels` after preprocessing, or
+        (None, strips) with PNG encoded strips in reading order for OCR with
+        extract_tile_text
+    """
+    from PIL import Image
+    image = preprocess_image(Image.open(io.BytesIO(data)), target_dpi, binarize, deskew)
+    if tiles <= 1 or not tile_min_pixels or image.width * image.height < tile_min_pixels:
+        import pytesseract
+        return pytesseract.image_to_string(image), []
+
+    strips = []
+    for box in band_boxes(image, tiles):
+        out = io.BytesIO()
+        image.crop(box).save(out, format="PNG", compress_level=1)
+        strips.append(out.getvalue())
+    return None, strips
+
+def extract_tile_text(data: bytes) -> str:
+    """
+    OCR an image strip produced by prepare_image_ocr. Runs inside a worker process.
+
+    Args:
+        data: PNG bytes of an already preprocessed strip
+    """
+    from PIL import Image
+    import pytesseract
+    return pytesseract.image_to_string(Image.open(io.BytesIO(data)))
+
+class _Slot:
+    """
+    One admitted place in the extraction queue.
+
+    Held by the caller and by each job it submits; the place is freed once
+    the caller is finished and every job has left its worker.
+    """
+
+    def __init__(self, executor: "ExtractionExecutor"):
+        self._executor = executor
+        self._holders = 1
+
+    def hold(self) -> None:
+        self._holders += 1
+
+    def release(self) -> None:
+        self._holders -= 1
+        if self._holders == 0:
+            self._executor._in_flight -= 1
+
+def _call_job(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a job in a worker, turning errors the server cannot unpickle into ExtractionError"""
+    try:
+        return func(*args)
+    except Exception as e:
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            # e.g. pytesseract's TesseractNotFoundError; unpickling it would break the whole pool
+            raise ExtractionError(f"{type(e).__name__}: {e}") from None
+        raise
+
+def _report_worker(pids) -> None:
+    # Pool initializer: tell the server process which PID this worker has
+    pids.put(os.getpid())
+
+class _WorkerPool:
+    """
+    A spawn process pool that knows its worker PIDs and its unfinished jobs.
+
+    A retired pool takes no new jobs; the executor terminates its workers once
+    nothing but hung jobs are left on it.
+    """
+
+    def __init__(self, max_workers: int):
+        context = multiprocessing.get_context("spawn")
+        self._reported = context.Queue()
+        self._pids: Set[int] = set()
+        # Spawn keeps workers independent of the threads running in the server process
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_report_worker,
+            initargs=(self._reported,)
+        )
+        self.jobs: Set[Future] = set()
+        self.hung: Set[Future] = set()
+        self.retired = False
+
+    @property
+    def pids(self) -> List[int]:
+        """PIDs of the workers started so far"""
+        while True:
+            try:
+                self._pids.add(self._reported.get_nowait())
+            except Empty:
+                return sorted(self._pids)
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        future = self.executor.submit(_call_job, func, *args)
+        self.jobs.add(future)
+        return future
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=cancel_futures)
+
+    def terminate(self) -> None:
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass  # Already exited
+
+class ExtractionExecutor:
+    """
+    Bounded process pool for CPU-heavy document extraction.
+
+    Jobs beyond `max_workers + max_queue_depth` in flight are rejected with
+    ExtractionQueueFullError instead of piling up behind a busy pool; a tiled
+    OCR page counts as one job however many strips it runs.
+
+    A job still running at its timeout retires its pool: new jobs go to a
+    fresh pool, the other jobs on the old one finish normally, and then its
+    workers are terminated, so a hung document cannot hold a worker forever.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        job_timeout: Optional[float] = 60.0,
+        max_queue_depth: int = 32
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.job_timeout = job_timeout
+        self.max_queue_depth = max_queue_depth
+        self._pool: Optional[_WorkerPool] = None
+        # Pools with a timed-out job, draining their other jobs before they are terminated
+        self._retired: Set[_WorkerPool] = set()
+        # Serves the queues that stream PDF pages back from the workers
+        self._manager = None
+        self._manager_lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of admitted jobs (or tiled pages) that have not finished yet"""
+        return self._in_flight
+
+    @property
+    def worker_pids(self) -> List[int]:
+        """Process ids of the current pool's workers, e.g. to read their memory use"""
+        return self._pool.pids if self._pool is not None else []
+
+    def _get_pool(self) -> _WorkerPool:
+        if self._pool is None:
+            self._pool = _WorkerPool(self.max_workers)
+        return self._pool
+
+    def _admit(self) -> "_Slot":
+        if self._in_flight >= self.max_workers + self.max_queue_depth:
+            raise ExtractionQueueFullError("Document extraction queue is full, please retry later")
+        self._in_flight += 1
+        return _Slot(self)
+
+    async def run(self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run `func(*args)` in the process pool and await its result.
+
+        Args:
+            func: Module-level (picklable) function to execute
+            timeout: Per-job timeout in seconds, defaults to `job_timeout`
+        """
+        slot = self._admit()
+        try:
+            return await self._submit(slot, func, args, timeout)
+        finally:
+            slot.release()
+
+    async def _submit(self, slot: "_Slot", func: Callable[..., Any], args: Tuple, timeout: Optional[float] = None) -> Any:
+        """Run one job for an admitted slot; the slot stays taken until the worker is done with it"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise ExtractionError("Document extraction pool is unavailable, please retry")
+        slot.hold()
+
+        def on_done(_future):
+            # Released only when the worker is really done, so abandoned jobs still count
+            try:
+                loop.call_soon_threadsafe(self._job_finished, pool, future, slot)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        future.add_done_callback(on_done)
+
+        timeout = self.job_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                # The worker is stuck in the job; it would keep its slot until the job ends
+                self._retire_pool(pool, future)
+            raise ExtractionTimeoutError(f"Document extraction timed out after {timeout}s")
+        except asyncio.CancelledError:
+            # Drop the job if it has not been picked up by a worker yet
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise ExtractionError("Document extraction worker crashed")
+
+    def _job_finished(self, pool: _WorkerPool, future: Future, slot: "_Slot") -> None:
+        pool.jobs.discard(future)
+        slot.release()
+        if pool.retired:
+            self._stop_if_drained(pool)
+
+    def _reset_pool(self, pool: _WorkerPool) -> None:
+        # A worker died (e.g. killed for memory); the next job starts a fresh pool
+        if self._pool is pool:
+            logging.error("Document extraction pool is broken, restarting it")
+            self._pool = None
+            # Its jobs all fail with BrokenProcessPool already; stop the surviving workers too
+            pool.shutdown(cancel_futures=False)
+            pool.terminate()
+
+    def _retire_pool(self, pool: _WorkerPool, hung: Future) -> None:
+        pool.hung.add(hung)
+        if self._pool is pool:
+            logging.warning("Document extraction job timed out, moving new jobs to a fresh pool")
+            self._pool = None
+        if not pool.retired:
+            pool.retired = True
+            self._retired.add(pool)
+            # Jobs already queued on the old pool still run there
+            pool.shutdown(cancel_futures=False)
+        self._stop_if_drained(pool)
+
+    def _stop_if_drained(self, pool: _WorkerPool) -> None:
+        if pool in self._retired and pool.jobs <= pool.hung:
+            logging.warning(f"Terminating workers of {len(pool.hung)} timed-out document extraction job(s)")
+            self._retired.discard(pool)
+            pool.terminate()
+
+    def _open_page_channel(self) -> Tuple[Any, Any]:
+        """A bounded batch queue and a stop event shared with the worker (blocking)"""
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+            # Two batches of read-ahead; the worker waits for the caller beyond that
+            return self._manager.Queue(maxsize=2), self._manager.Event()
+
+    async def _next_batch(self, batches, job: asyncio.Future) -> Optional[Tuple[int, int, List[str]]]:
+        while True:
+            try:
+                return await asyncio.to_thread(batches.get, True, 0.1)
+            except Empty:
+                if job.done():
+                    job.result()  # Raises the worker's error, a timeout or queue-full
+                    return None
+
+    async def iter_pdf_pages(
+        self,
+        data: bytes,
+        batch_size: int = 4,
+        max_pages: int = 0
+    ) -> AsyncGenerator[Tuple[int, int, str], None]:
+        """
+        Extract PDF text page by page in the process pool.
+
+        One worker job parses the document once and streams pages back in
+        batches of `batch_size`. It stays at most two batches ahead of the
+        caller, so closing the generator early stops it from parsing the rest
+        of the document. `job_timeout` applies to the whole document.
+
+        Args:
+            data: Raw PDF bytes
+            batch_size: Number of pages handed back per batch
+            max_pages: Stop after this many pages (0 = no limit)
+
+        Yields:
+            Tuples of (page_number, total_pages, page_text), page numbers starting at 1
+        """
+        batches, stop = await asyncio.to_thread(self._open_page_channel)
+        job = asyncio.ensure_future(
+            self.run(extract_pdf_page_batches, data, batches, stop, batch_size, max_pages)
+        )
+        try:
+            while True:
+                batch = await self._next_batch(batches, job)
+                if batch is None:
+                    break
+                total_pages, start, texts = batch
+                for offset, text in enumerate(texts):
+                    yield start + offset + 1, total_pages, text
+            await job
+        finally:
+            if not job.done():
+                # The caller stopped early; let the worker return instead of parsing on
+                await asyncio.to_thread(stop.set)
+                job.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    async def extract_image_text(
+        self,
+        data: bytes,
+        target_dpi: int = 300,
+        binarize: bool = True,
+        deskew: bool = False,
+        tile_min_pixels: int = 0,
+        tiles: int = 1
+    ) -> str:
+        """
+        OCR an image in the process pool.
+
+        Images still larger than `tile_min_pixels` after preprocessing are cut
+        into `tiles` horizontal strips that are OCRed by parallel jobs, and their
+        text is joined top to bottom. The page takes one place in the queue for
+        all its jobs, and a failed strip cancels the others.
+
+        Args:
+            data: Raw image bytes
+            target_dpi, binarize, deskew: Preprocessing options, see preprocess_image
+            tile_min_pixels: Pixel count from which images are split (0 = never)
+            tiles: Number of strips for large images
+        """
+        slot = self._admit()
+        try:
+            text, strips = await self._submit(
+                slot, prepare_image_ocr, (data, target_dpi, binarize, deskew, tile_min_pixels, tiles)
+            )
+            if text is not None:
+                return text
+            jobs = [asyncio.ensure_future(self._submit(slot, extract_tile_text, (strip,))) for strip in strips]
+            try:
+                texts = await asyncio.gather(*jobs)
+            except BaseException:
+                for job in jobs:
+                    job.cancel()
+                # Let the cancellations land, so no sibling's error goes unretrieved
+                await asyncio.gather(*jobs, return_exceptions=True)
+                raise
+        finally:
+            slot.release()
+        # Tesseract ends every page with a form feed; keep one at the very end only
+        return "\n".join(text.strip("\n\f") for text in texts if text.strip()) + "\n\f"
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            logging.info("Shutting down document extraction pool")
+            self._pool.shutdown()
+            self._pool = None
+
+    def shutdown(self) -> None:
+        """Stop the pool, cancel all jobs that have not started and terminate hung workers"""
+        self._shutdown_pool()
+        for pool in self._retired:
+            pool.terminate()
+        self._retired.clear()
+        with self._manager_lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -0,0 +1,61 @@
+from typing import Dict, Optional, Tuple
+import logging
+import httpx
+from openai import AsyncOpenAI
+from ..config import get_settings
+
+class OpenAIClientRegistry:
+    """
+    Process-wide registry of AsyncOpenAI clients.
+
+    One client (and one pooled HTTP connection set) is kept per API key and base
+    URL, so agents and services reuse keep-alive connections instead of opening
+    new ones per request. Closed from the FastAPI lifespan on shutdown.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, Optional[str]], AsyncOpenAI] = {}
+
+    def get_client(self, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """Return the shared client for `api_key` (defaults to the configured key)"""
+        settings = get_settings()
+        api_key = api_key or settings.openai_api_key
+        key = (api_key, settings.openai_base_url)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=settings.openai_base_url,
+                max_retries=settings.openai_max_retries,
+                http_client=httpx.AsyncClient(
+                    http2=settings.openai_http2,
+                    limits=httpx.Limits(
+                        max_connections=settings.openai_max_connections,
+                        max_keepalive_connections=settings.openai_max_keepalive_connections,
+                        keepalive_expiry=settings.openai_keepalive_expiry
+                    ),
+                    timeout=httpx.Timeout(
+                        settings.openai_timeout,
+                        connect=settings.openai_connect_timeout
+                    )
+                )
+            )
+            self._clients[key] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close all clients and their connection pools"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logging.error(f"Error closing OpenAI client: {str(e)}")
+
+# Create a singleton instance
+openai_clients = OpenAIClientRegistry()
+
+def get_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client"""
+    return openai_clients.get_client(api_key)
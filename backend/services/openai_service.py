@@ -1,13 +1,9 @@
-from openai import AsyncOpenAI
-import os
-from dotenv import load_dotenv
-load_dotenv()
-
-# Initialize the OpenAI client
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-if not client.api_key:
-    raise ValueError("OPENAI_API_KEY environment variable is not set")
+from .openai_clients import get_openai_client
+from .token_budget import TokenBudget, fit_messages
+from ..telemetry.openai_metrics import create_chat_completion
+from ..telemetry.stages import timed
 
+@timed("llm_call", endpoint="generate_chat_response")
 async def generate_chat_response(user_message: str, context: str = "") -> str:
     """
     Generate chat response using GPT-4
@@ -31,35 +27,46 @@ async def generate_chat_response(user_message: str, context: str = "") -> str:
             "content": user_message
         })
 
-        response = await client.chat.completions.create(
+        response = await create_chat_completion(
+            get_openai_client(),
+            "generate_chat_response",
             model="gpt-4",
-            messages=messages
+            messages=fit_messages("gpt-4", messages)
         )
         return response.choices[0].message.content
     except Exception as e:
         raise Exception(f"Error generating chat response: {str(e)}")
 
+@timed("llm_call", endpoint="generate_extraction_prompt")
 async def generate_extraction_prompt(document_content: str, instruction_text: str) -> str:
     """
     Generate extraction prompt using GPT-4
     """
     try:
-        response = await client.chat.completions.create(
+        system_message = {
+            "role": "system",
+            "content": "You are an expert at creating extraction prompts for document processing."
+        }
+        prefix = "Create an extraction prompt for the following document content: "
+        instructions = f"\nBased on these instructions: {instruction_text}"
+        
+        # Shorten the document, not the instructions, if the prompt would overflow the context window
+        budget = TokenBudget("gpt-4")
+        available = budget.remaining([system_message, {"role": "user", "content": prefix + instructions}])
+        document_content = budget.counter.truncate_text(document_content, available)
+
+        response = await create_chat_completion(
+            get_openai_client(),
+            "generate_extraction_prompt",
             model="gpt-4",
             messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert at creating extraction prompts for document processing."
-                },
+                system_message,
                 {
                     "role": "user",
-                    "content": (
-                        f"Create an extraction prompt for the following document content: {document_content}\n"
-                        f"Based on these instructions: {instruction_text}"
-                    )
+                    "content": f"{prefix}{document_content}{instructions}"
                 }
             ]
         )
         return response.choices[0].message.content
     except Exception as e:
-        raise Exception(f"Error generating prompt: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Error generating prompt: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,303 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Context window sizes in tokens, matched by longest model-name prefix
+MODEL_CONTEXT_LIMITS: Dict[str, int] = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4-32k": 32_768,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+}
+DEFAULT_CONTEXT_LIMIT = 8_192
+
+# Fixed per-message and per-request overhead of the chat format
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REQUEST = 3
+
+# Characters per token used when no tokenizer encoding is available
+CHARS_PER_TOKEN = 4
+
+POLICIES = ("drop_oldest", "summarize", "truncate")
+
+TRUNCATION_MARKER = " [...]"
+
+def get_context_limit(model: str) -> int:
+    """Return the context window of `model`, ignoring provider prefixes like 'openai/'"""
+    name = model.rsplit("/", 1)[-1].lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_LIMITS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_LIMIT
+    return MODEL_CONTEXT_LIMITS[max(matches, key=len)]
+
+# Encoding used for models tiktoken does not know
+FALLBACK_ENCODING = "cl100k_base"
+
+# Encodings loaded by `load_encodings`, by name; counting never loads one itself
+_encodings: Dict[str, Any] = {}
+
+def _encoding_name(model: str) -> Optional[str]:
+    """Name of the tiktoken encoding for `model`; None if tiktoken is not installed"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_name_for_model(model.rsplit("/", 1)[-1])
+    except KeyError:
+        return FALLBACK_ENCODING
+
+def load_encodings(models: List[str]) -> List[str]:
+    """
+    Load the tokenizer encodings for `models`, returning the names loaded.
+
+    Blocking: tiktoken reads its data from TIKTOKEN_CACHE_DIR (or its default
+    cache) and downloads it when missing, so call this off the event loop at
+    startup. Counters for encodings that fail to load keep estimating.
+    """
+    names = {_encoding_name(model) for model in models} | {FALLBACK_ENCODING}
+    if None in names:
+        return []
+    import tiktoken
+    for name in sorted(names - set(_encodings)):
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            logger.warning(f"Tokenizer {name} unavailable, estimating token counts: {str(e)}")
+    return sorted(names & set(_encodings))
+
+class TokenCounter:
+    """
+    Counts chat message tokens with the model's local tokenizer.
+
+    Falls back to a characters-per-token estimate until `load_encodings` has
+    loaded the encoding, so a request never waits on a tokenizer download.
+    Message counts are cached by content hash, so a growing conversation only
+    tokenizes the messages that are new.
+    """
+
+    def __init__(self, model: str, max_cached_messages: int = 4096):
+        self.model = model
+        self.max_cached_messages = max_cached_messages
+        self._encoding_name = _encoding_name(model)
+        self._message_counts: "OrderedDict[str, int]" = OrderedDict()
+
+    @property
+    def encoding(self):
+        return _encodings.get(self._encoding_name)
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate_text(self, text: str, max_tokens: int) -> str:
+        """Cut `text` to at most `max_tokens` tokens, marking the cut"""
+        if self.count_text(text) <= max_tokens:
+            return text
+        keep = max(max_tokens - self.count_text(TRUNCATION_MARKER), 0)
+        encoding = self.encoding
+        if encoding is None:
+            head = text[:keep * CHARS_PER_TOKEN]
+        else:
+            head = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+        return head + TRUNCATION_MARKER
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Count the tokens of one message, served from the cache when seen before"""
+        key = hashlib.sha256(
+            json.dumps(message, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        if self.encoding is None:
+            key = "estimate:" + key  # Not reused once the real encoding is loaded
+        count = self._message_counts.get(key)
+        if count is not None:
+            self._message_counts.move_to_end(key)
+            return count
+
+        count = TOKENS_PER_MESSAGE + self.count_text(message.get("role", ""))
+        content = message.get("content")
+        if isinstance(content, str):
+            count += self.count_text(content)
+        elif content:
+            count += self.count_text(json.dumps(content, ensure_ascii=False, default=str))
+        if message.get("name"):
+            count += 1 + self.count_text(message["name"])
+        if message.get("tool_calls"):
+            count += self.count_text(json.dumps(message["tool_calls"], ensure_ascii=False, default=str))
+
+        self._message_counts[key] = count
+        while len(self._message_counts) > self.max_cached_messages:
+            self._message_counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return TOKENS_PER_REQUEST + sum(self.count_message(message) for message in messages)
+
+_counters: Dict[str, TokenCounter] = {}
+
+def get_token_counter(model: str) -> TokenCounter:
+    """Return the process-wide counter for `model`, so cached counts are shared"""
+    counter = _counters.get(model)
+    if counter is None:
+        counter = _counters[model] = TokenCounter(model)
+    return counter
+
+def summarize_messages(messages: List[Dict[str, Any]], max_chars: int = 200) -> str:
+    """Extractive summary of dropped turns: the first sentence of each message"""
+    lines = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str) or not content.strip():
+            continue
+        first = re.split(r"(?<=[.!?])\s", content.strip(), maxsplit=1)[0]
+        if len(first) > max_chars:
+            first = first[:max_chars] + TRUNCATION_MARKER
+        lines.append(f"{message.get('role', 'user')}: {first}")
+    return "Summary of earlier conversation:\n" + "\n".join(lines)
+
+class TokenBudget:
+    """
+    Fits chat messages into a model's context window.
+
+    The leading system messages (instructions, document context) and the
+    current turn (the last user message and anything after it) are pinned.
+    History in between is reduced according to `policy`:
+
+    - "drop_oldest": drop the oldest turns
+    - "summarize": replace dropped turns with a short extractive summary
+    - "truncate": shorten old turns to an excerpt before dropping any
+
+    If the pinned messages alone exceed the budget, the largest of them
+    (except the first system prompt) are truncated.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        policy: str = "drop_oldest",
+        reserve_output_tokens: int = 1024,
+        max_context_tokens: Optional[int] = None,
+        truncated_turn_tokens: int = 64
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown token budget policy: {policy}")
+        self.model = model
+        self.policy = policy
+        self.reserve_output_tokens = reserve_output_tokens
+        self.max_context_tokens = max_context_tokens or get_context_limit(model)
+        self.truncated_turn_tokens = truncated_turn_tokens
+        self.counter = get_token_counter(model)
+
+    @property
+    def max_input_tokens(self) -> int:
+        return max(self.max_context_tokens - self.reserve_output_tokens, 0)
+
+    def count(self, messages: List[Dict[str, Any]]) -> int:
+        return self.counter.count_messages(messages)
+
+    def remaining(self, messages: List[Dict[str, Any]]) -> int:
+        """Tokens still available for input after `messages`"""
+        return max(self.max_input_tokens - self.count(messages), 0)
+
+    def fit(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return `messages` reduced to fit the input budget; the input list is not modified"""
+        limit = self.max_input_tokens
+        total = self.count(messages)
+        if total <= limit:
+            return messages
+
+        head, history, current = _split_messages(messages)
+        turns = _group_turns(history)
+        dropped: List[Dict[str, Any]] = []
+
+        if self.policy == "truncate":
+            # Shorten the oldest turns first, keeping their structure
+            for turn in turns:
+                if total <= limit:
+                    break
+                for i, message in enumerate(turn):
+                    if isinstance(message.get("content"), str):
+                        shortened = dict(message, content=self.counter.truncate_text(message["content"], self.truncated_turn_tokens))
+                        total += self.counter.count_message(shortened) - self.counter.count_message(message)
+                        turn[i] = shortened
+
+        summary: Optional[Dict[str, Any]] = None
+        while turns and total > limit:
+            turn = turns.pop(0)
+            total -= sum(self.counter.count_message(message) for message in turn)
+            dropped.extend(turn)
+            if self.policy == "summarize":
+                if summary is not None:
+                    total -= self.counter.count_message(summary)
+                summary = {"role": "system", "content": summarize_messages(dropped)}
+                # Keep the summary from crowding out the remaining conversation
+                summary["content"] = self.counter.truncate_text(summary["content"], limit // 4)
+                total += self.counter.count_message(summary)
+
+        if dropped:
+            logger.info(f"Token budget: dropped {len(dropped)} history messages for {self.model}")
+
+        prefix = head + ([summary] if summary else [])
+        kept = [message for turn in turns for message in turn]
+        result = prefix + kept + current
+        total = self.count(result)
+        if total > limit:
+            # Everything but the first system prompt and remaining history may be shortened
+            pinned = list(range(1, len(prefix))) + list(range(len(prefix) + len(kept), len(result)))
+            result = self._truncate(result, pinned, total, limit)
+        return result
+
+    def _truncate(self, messages: List[Dict[str, Any]], indexes: List[int], total: int, limit: int) -> List[Dict[str, Any]]:
+        """Truncate the largest of the messages at `indexes` until the budget is met"""
+        candidates = [i for i in indexes if isinstance(messages[i].get("content"), str)]
+        while total > limit and candidates:
+            index = max(candidates, key=lambda i: self.counter.count_message(messages[i]))
+            candidates.remove(index)
+            message = messages[index]
+            keep = max(self.counter.count_text(message["content"]) - (total - limit), 0)
+            shortened = dict(message, content=self.counter.truncate_text(message["content"], keep))
+            total += self.counter.count_message(shortened) - self.counter.count_message(message)
+            messages[index] = shortened
+        if total > limit:
+            logger.warning(f"Token budget: prompt for {self.model} still exceeds {limit} tokens")
+        return messages
+
+def _split_messages(messages: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """Split into leading system messages, history, and the current turn"""
+    start = 0
+    while start < len(messages) and messages[start].get("role") == "system":
+        start += 1
+    last_user = len(messages)
+    for i in range(len(messages) - 1, start - 1, -1):
+        if messages[i].get("role") == "user":
+            last_user = i
+            break
+    return list(messages[:start]), list(messages[start:last_user]), list(messages[last_user:])
+
+def _group_turns(history: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group history so tool results are never separated from the call that produced them"""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in history:
+        if message.get("role") == "tool" and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+    return turns
+
+def fit_messages(model: str, messages: List[Dict[str, Any]], policy: str = "drop_oldest", **kwargs) -> List[Dict[str, Any]]:
+    """Convenience wrapper: fit `messages` into the context window of `model`"""
+    return TokenBudget(model, policy=policy, **kwargs).fit(messages)
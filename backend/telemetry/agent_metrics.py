@@ -0,0 +1,53 @@
+from opentelemetry import metrics
+
+meter = metrics.get_meter("agent.runs")
+
+agent_queue_depth = meter.create_up_down_counter(
+    name="agent.queue.depth",
+    description="Number of agent runs waiting for a worker",
+    unit="runs"
+)
+
+agent_queue_wait = meter.create_histogram(
+    name="agent.queue.wait",
+    description="Time agent runs spent waiting for a worker",
+    unit="ms"
+)
+
+agent_run_duration = meter.create_histogram(
+    name="agent.run.duration",
+    description="Duration of agent runs on a worker",
+    unit="ms"
+)
+
+agent_runs_active = meter.create_up_down_counter(
+    name="agent.runs.active",
+    description="Number of agent runs currently executing",
+    unit="runs"
+)
+
+# Labelled with the reason: "queue_full" or "timeout"
+agent_runs_rejected = meter.create_counter(
+    name="agent.runs.rejected",
+    description="Number of agent runs rejected by admission control",
+    unit="runs"
+)
+
+# Agent pool metrics, labelled with the agent type
+agent_pool_checkouts = meter.create_counter(
+    name="agent.pool.checkouts",
+    description="Number of agent checkouts, labelled hit (reused) or miss (built)",
+    unit="agents"
+)
+
+agent_pool_idle = meter.create_up_down_counter(
+    name="agent.pool.idle",
+    description="Number of idle, pre-built agents in the pool",
+    unit="agents"
+)
+
+agent_pool_in_use = meter.create_up_down_counter(
+    name="agent.pool.in_use",
+    description="Number of agents checked out of the pool",
+    unit="agents"
+)
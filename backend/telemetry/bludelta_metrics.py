@@ -0,0 +1,35 @@
+from typing import Callable, Dict
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+meter = metrics.get_meter("bludelta.client")
+
+bludelta_request_duration = meter.create_histogram(
+    name="bludelta.request.duration",
+    description="Duration of BluDelta requests, including retries",
+    unit="ms"
+)
+
+bludelta_request_retries = meter.create_counter(
+    name="bludelta.request.retries",
+    description="Number of retried BluDelta requests",
+    unit="requests"
+)
+
+bludelta_requests_in_flight = meter.create_up_down_counter(
+    name="bludelta.requests.in_flight",
+    description="Number of BluDelta requests currently in progress",
+    unit="requests"
+)
+
+def register_pool_observer(get_stats: Callable[[], Dict[str, int]]) -> None:
+    """Export connection pool usage, labelled by connection state"""
+    def observe(options):
+        return [Observation(value, {"state": state}) for state, value in get_stats().items()]
+
+    meter.create_observable_gauge(
+        name="bludelta.pool.connections",
+        callbacks=[observe],
+        description="Connections in the BluDelta HTTP pool",
+        unit="connections"
+    )
@@ -0,0 +1,22 @@
+from opentelemetry import metrics
+
+meter = metrics.get_meter("document.extraction")
+
+# Extracted-text cache metrics, labelled with the cache tier ("memory" or "disk")
+extraction_cache_hits = meter.create_counter(
+    name="extraction.cache.hits",
+    description="Number of extracted-text cache hits",
+    unit="requests"
+)
+
+extraction_cache_misses = meter.create_counter(
+    name="extraction.cache.misses",
+    description="Number of extracted-text cache misses",
+    unit="requests"
+)
+
+extraction_cache_evictions = meter.create_counter(
+    name="extraction.cache.evictions",
+    description="Number of entries evicted from the in-memory extracted-text cache",
+    unit="entries"
+)
@@ -1,37 +1,23 @@
-from opentelemetry import trace, metrics
-from opentelemetry.trace import Status, StatusCode
-from opentelemetry.metrics import Instrument
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
-from openinference.instrumentation.openai import OpenAIInstrumentor
-from phoenix.otel import register
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+from contextlib import contextmanager
 from functools import wraps
+from opentelemetry import trace, metrics
+from opentelemetry.trace import Span, Status, StatusCode
 import time
-from backend.config import get_settings
-
-settings = get_settings()
-
-# Set up Phoenix tracer provider
-tracer_provider = register(
-    project_name="bluapp-llm",
-    endpoint=settings.otel_exporter_otlp_endpoint
-)
 
-# Instrument OpenAI
-OpenAIInstrumentor().instrument(tracer_provider=tracer_provider)
+# USD per million tokens: (input, cached input, output); matched by longest model prefix
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-4": (30.00, 30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+}
 
-# Set up metrics with HTTP exporter
-metric_exporter = OTLPMetricExporter(
-    endpoint=settings.phoenix_collector_endpoint + "/v1/metrics"
-)
-metric_reader = PeriodicExportingMetricReader(metric_exporter)
-meter_provider = MeterProvider(metric_readers=[metric_reader])
-metrics.set_meter_provider(meter_provider)
-
-# Get tracer and meter
+# Providers are installed by init_telemetry() at startup; until then these are no-op proxies
 tracer = trace.get_tracer("openai.client")
 meter = metrics.get_meter("openai.client")
 
@@ -42,6 +28,7 @@ llm_request_duration = meter.create_histogram(
     unit="ms"
 )
 
+# Labelled with the token type: prompt, completion or cached (prompt tokens served from the prompt cache)
 llm_request_tokens = meter.create_histogram(
     name="llm.request.tokens",
     description="Number of tokens in request/response",
@@ -54,39 +41,187 @@ llm_request_count = meter.create_counter(
     unit="requests"
 )
 
+llm_cache_requests = meter.create_counter(
+    name="llm.cache.requests",
+    description="Response cache lookups by result (hit, miss, bypass)",
+    unit="requests"
+)
+
+llm_time_to_first_token = meter.create_histogram(
+    name="llm.time_to_first_token",
+    description="Time from sending a streamed request to its first content or tool call delta",
+    unit="ms"
+)
+
+llm_output_throughput = meter.create_histogram(
+    name="llm.output.throughput",
+    description="Completion tokens per second of streamed responses, after the first token",
+    unit="tokens/s"
+)
+
+llm_turn_round_trips = meter.create_histogram(
+    name="llm.turn.round_trips",
+    description="LLM calls needed to answer one user turn",
+    unit="requests"
+)
+
+llm_tool_duration = meter.create_histogram(
+    name="llm.tool.duration",
+    description="Execution time of tools called by the model",
+    unit="ms"
+)
+
+llm_request_cost = meter.create_histogram(
+    name="llm.request.cost",
+    description="Estimated cost of LLM requests, from MODEL_PRICES",
+    unit="USD"
+)
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    """Estimated request cost in USD; None for models without a known price"""
+    name = model.rsplit("/", 1)[-1].lower()
+    matches = [prefix for prefix in MODEL_PRICES if name.startswith(prefix)]
+    if not matches:
+        return None
+    input_price, cached_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+def record_usage(usage: Any, attributes: Dict[str, str], span: Optional[Span] = None) -> int:
+    """
+    Record token counts and estimated cost from an OpenAI-style `usage` object.
+
+    Returns:
+        The number of completion tokens, 0 if `usage` is missing
+    """
+    if not usage:
+        return 0
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    llm_request_tokens.record(prompt_tokens, {**attributes, "type": "prompt"})
+    llm_request_tokens.record(completion_tokens, {**attributes, "type": "completion"})
+    llm_request_tokens.record(cached_tokens, {**attributes, "type": "cached"})
+    cost = estimate_cost(attributes["model"], prompt_tokens, completion_tokens, cached_tokens)
+    if cost is not None:
+        llm_request_cost.record(cost, attributes)
+    if span is not None:
+        span.set_attribute("llm.usage.prompt_tokens", prompt_tokens)
+        span.set_attribute("llm.usage.completion_tokens", completion_tokens)
+        span.set_attribute("llm.usage.cached_tokens", cached_tokens)
+        if cost is not None:
+            span.set_attribute("llm.cost_usd", cost)
+    return completion_tokens
+
+def _finish_request(span: Span, attributes: Dict[str, str], start_time: float, status: str = "ok", error: Optional[BaseException] = None) -> None:
+    duration = (time.perf_counter() - start_time) * 1000
+    llm_request_duration.record(duration, {**attributes, "status": status})
+    llm_request_count.add(1, {**attributes, "status": status})
+    span.set_attribute("llm.request.duration_ms", duration)
+    if error is not None:
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    else:
+        span.set_status(Status(StatusCode.OK))
+
+@contextmanager
+def llm_request_span(model: str, endpoint: str) -> Iterator[Tuple[Span, Dict[str, str]]]:
+    """
+    Trace and time one LLM request made outside `create_chat_completion`, e.g. through LiteLLM.
+
+    Yields the span and the metric attributes, for `record_usage`.
+    """
+    attributes = {"model": model, "endpoint": endpoint}
+    start_time = time.perf_counter()
+    with tracer.start_as_current_span("llm.request", attributes={"llm.model": model, "llm.endpoint": endpoint}) as span:
+        try:
+            yield span, attributes
+        except BaseException as e:
+            _finish_request(span, attributes, start_time, "error", e)
+            raise
+        _finish_request(span, attributes, start_time)
+
 def trace_openai_request(func):
+    """
+    Decorator tracing an async function that returns a chat completion.
+
+    Kept for code written against the original decorator; it records the
+    same request span, duration, count, tokens and cost as
+    `create_chat_completion`, with the function name as the endpoint and the
+    `model` keyword argument as the model. Streamed responses are not
+    instrumented, call `create_chat_completion` for those.
+    """
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        with tracer.start_as_current_span("llm.request") as span:
-            start_time = time.time()
-            
-            try:
-                # Execute the OpenAI request
-                response = await func(*args, **kwargs)
-                
-                # Record metrics
-                duration = (time.time() - start_time) * 1000  # Convert to ms
-                llm_request_duration.record(duration)
-                llm_request_count.add(1)
-                
-                # Add response tokens to metrics if available
-                if hasattr(response, 'usage'):
-                    prompt_tokens = response.usage.prompt_tokens
-                    completion_tokens = response.usage.completion_tokens
-                    llm_request_tokens.record(prompt_tokens, {"type": "prompt"})
-                    llm_request_tokens.record(completion_tokens, {"type": "completion"})
-                
-                # Add span attributes
-                span.set_attribute("llm.provider", "openai")
-                span.set_attribute("llm.request.duration_ms", duration)
-                if hasattr(response, 'model'):
-                    span.set_attribute("llm.model", response.model)
-                
-                span.set_status(Status(StatusCode.OK))
-                return response
-                
-            except Exception as e:
-                span.set_status(Status(StatusCode.ERROR, str(e)))
-                raise
-                
-    return wrapper 
\ No newline at end of file
+        with llm_request_span(kwargs.get("model") or "unknown", func.__name__) as (span, attributes):
+            span.set_attribute("llm.provider", "openai")
+            response = await func(*args, **kwargs)
+            record_usage(getattr(response, "usage", None), attributes, span)
+            return response
+    return wrapper
+
+async def create_chat_completion(client: Any, endpoint: str, **kwargs) -> Any:
+    """
+    Call `client.chat.completions.create(**kwargs)` with tracing and metrics.
+
+    Records duration, tokens (including cached prompt tokens) and estimated cost
+    with `model` and `endpoint` attributes. Streamed calls (`stream=True`) also
+    record time-to-first-token and output tokens/sec; they request usage in
+    the final chunk and return a wrapped stream that records once consumed.
+    """
+    attributes = {"model": kwargs["model"], "endpoint": endpoint}
+    span = tracer.start_span("llm.request", attributes={"llm.provider": "openai", "llm.model": kwargs["model"], "llm.endpoint": endpoint})
+    start_time = time.perf_counter()
+    if kwargs.get("stream"):
+        kwargs.setdefault("stream_options", {"include_usage": True})
+    try:
+        # Current while the request is sent, so instrumentation spans nest under it
+        with trace.use_span(span):
+            response = await client.chat.completions.create(**kwargs)
+    except BaseException as e:
+        _finish_request(span, attributes, start_time, "error", e)
+        span.end()
+        raise
+    if kwargs.get("stream"):
+        return _instrument_stream(response, span, attributes, start_time)
+    record_usage(getattr(response, "usage", None), attributes, span)
+    _finish_request(span, attributes, start_time)
+    span.end()
+    return response
+
+async def _instrument_stream(stream: Any, span: Span, attributes: Dict[str, str], start_time: float) -> AsyncIterator[Any]:
+    first_token_at: Optional[float] = None
+    deltas = 0
+    usage = None
+    status = "ok"
+    error: Optional[BaseException] = None
+    try:
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices:
+                delta = chunk.choices[0].delta
+                if delta.content or delta.tool_calls:
+                    deltas += 1
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        ttft = (first_token_at - start_time) * 1000
+                        llm_time_to_first_token.record(ttft, attributes)
+                        span.set_attribute("llm.time_to_first_token_ms", ttft)
+            yield chunk
+    except GeneratorExit:
+        # The consumer stopped reading before the end of the stream
+        status = "cancelled"
+        raise
+    except BaseException as e:
+        status, error = "error", e
+        raise
+    finally:
+        # Without usage (e.g. the stream was abandoned), count content deltas as tokens
+        completion_tokens = record_usage(usage, attributes, span) or deltas
+        if first_token_at is not None and status == "ok":
+            elapsed = time.perf_counter() - first_token_at
+            if elapsed > 0 and completion_tokens > 1:
+                llm_output_throughput.record(completion_tokens / elapsed, attributes)
+        _finish_request(span, attributes, start_time, status, error)
+        span.end()
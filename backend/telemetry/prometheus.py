@@ -0,0 +1,83 @@
+from typing import Dict, List, Mapping, Optional
+import math
+import re
+from opentelemetry.sdk.metrics.export import Gauge, Histogram, InMemoryMetricReader, Sum
+
+# Prometheus base-unit suffixes for the units used by our instruments
+UNIT_SUFFIXES = {"ms": "milliseconds", "s": "seconds", "By": "bytes"}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def metric_name(name: str, unit: Optional[str] = None) -> str:
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+    suffix = UNIT_SUFFIXES.get(unit or "")
+    if suffix and not name.endswith(suffix):
+        name = f"{name}_{suffix}"
+    return name
+
+def format_labels(attributes: Optional[Mapping], **extra: str) -> str:
+    labels = {**(attributes or {}), **extra}
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{re.sub(r"[^a-zA-Z0-9_]", "_", key)}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class PrometheusMetrics:
+    """
+    Local metric reader rendering the Prometheus text exposition format.
+
+    Registered with the MeterProvider next to (or instead of) the OTLP exporter,
+    so /metrics can be scraped without the Phoenix collector running.
+    """
+
+    def __init__(self):
+        self.reader = InMemoryMetricReader()
+
+    def render(self) -> str:
+        data = self.reader.get_metrics_data()
+        lines: List[str] = []
+        seen: Dict[str, bool] = {}
+        for resource_metrics in data.resource_metrics if data else []:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    name = metric_name(metric.name, metric.unit)
+                    if name in seen:
+                        continue
+                    seen[name] = True
+                    lines.extend(self._render_metric(name, metric))
+        return "\n".join(lines) + "\n"
+
+    def _render_metric(self, name: str, metric) -> List[str]:
+        data = metric.data
+        lines = [f"# HELP {name} {metric.description or metric.name}"]
+        if isinstance(data, Histogram):
+            lines.append(f"# TYPE {name} histogram")
+            for point in data.data_points:
+                cumulative = 0
+                for bound, count in zip(list(point.explicit_bounds) + [math.inf], point.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(point.attributes, le=format_value(float(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(point.attributes)} {format_value(point.sum)}")
+                lines.append(f"{name}_count{format_labels(point.attributes)} {point.count}")
+        elif isinstance(data, Sum) and data.is_monotonic:
+            lines.append(f"# TYPE {name} counter")
+            for point in data.data_points:
+                lines.append(f"{name}_total{format_labels(point.attributes)} {format_value(point.value)}")
+        elif isinstance(data, (Sum, Gauge)):
+            lines.append(f"# TYPE {name} gauge")
+            for point in data.data_points:
+                lines.append(f"{name}{format_labels(point.attributes)} {format_value(point.value)}")
+        else:
+            return []
+        return lines
+
+# Attached to the MeterProvider by init_telemetry() when the /metrics endpoint is enabled
+prometheus_metrics = PrometheusMetrics()
@@ -0,0 +1,83 @@
+import atexit
+import logging
+from ..config import Settings
+from .prometheus import prometheus_metrics
+
+_meter_provider = None
+_tracer_provider = None
+
+def init_telemetry(settings: Settings) -> bool:
+    """
+    Install the metric readers and, when enabled, Phoenix tracing and the OTLP metric exporter.
+
+    Called from the FastAPI lifespan; until then instruments created with
+    `metrics.get_meter` and `trace.get_tracer` are no-op proxies. The local
+    /metrics reader works without a collector. Returns False when neither is
+    enabled in settings.
+    """
+    global _meter_provider, _tracer_provider
+    if _meter_provider is not None:
+        return True
+    if not (settings.telemetry_enabled or settings.metrics_endpoint_enabled):
+        return False
+
+    # Imported here: the SDK, exporters and Phoenix are only needed when telemetry is on
+    from opentelemetry import metrics
+    from opentelemetry.sdk.metrics import MeterProvider
+
+    metric_readers = []
+    if settings.metrics_endpoint_enabled:
+        metric_readers.append(prometheus_metrics.reader)
+
+    if settings.telemetry_enabled:
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        from phoenix.otel import register
+
+        # Set up Phoenix tracer provider
+        _tracer_provider = register(
+            project_name="bluapp-llm",
+            endpoint=settings.otel_exporter_otlp_endpoint
+        )
+
+        if settings.telemetry_instrument_openai:
+            from openinference.instrumentation.openai import OpenAIInstrumentor
+            OpenAIInstrumentor().instrument(tracer_provider=_tracer_provider)
+
+        # Set up metrics with HTTP exporter
+        metric_exporter = OTLPMetricExporter(
+            endpoint=settings.phoenix_collector_endpoint + "/v1/metrics"
+        )
+        metric_readers.append(PeriodicExportingMetricReader(metric_exporter))
+
+    _meter_provider = MeterProvider(metric_readers=metric_readers)
+    metrics.set_meter_provider(_meter_provider)
+    return True
+
+def flush_telemetry() -> None:
+    """Export pending spans and metrics without stopping the providers"""
+    for provider in (_meter_provider, _tracer_provider):
+        if provider is None:
+            continue
+        try:
+            provider.force_flush()
+        except Exception as e:
+            logging.error(f"Error flushing telemetry: {str(e)}")
+
+def shutdown_telemetry() -> None:
+    """
+    Flush the exporters and shut the providers down, stopping their export threads.
+
+    Called from the lifespan on exit. The OpenTelemetry providers are process
+    globals, so telemetry is not initialised again afterwards.
+    """
+    flush_telemetry()
+    for provider in (_meter_provider, _tracer_provider):
+        if provider is None:
+            continue
+        # The SDK would shut it down again at interpreter exit and warn about it
+        atexit.unregister(provider.shutdown)
+        try:
+            provider.shutdown()
+        except Exception as e:
+            logging.error(f"Error shutting down telemetry: {str(e)}")
@@ -0,0 +1,65 @@
+from typing import Any, Callable, Iterator, Optional, TypeVar
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import asyncio
+import time
+from opentelemetry import metrics, trace
+from opentelemetry.trace import Span
+
+tracer = trace.get_tracer("bluapp.pipeline")
+meter = metrics.get_meter("bluapp.pipeline")
+
+# Labelled with the stage name (decode, ocr, pdf_parse, llm_call, tool_call, ...) and status
+stage_duration = meter.create_histogram(
+    name="pipeline.stage.duration",
+    description="Duration of chat and document pipeline stages",
+    unit="ms"
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+@contextmanager
+def timed_stage(stage: str, span: bool = True, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a pipeline stage, recording a `stage.<name>` span and a duration sample.
+
+    Works in sync and async code alike. Pass `span=False` for very frequent
+    stages (e.g. individual WebSocket sends) to only record the histogram.
+
+    Args:
+        stage: Stage name, used as the `stage` attribute
+        span: Whether to start a span for the stage
+        **attributes: Extra span and metric attributes, e.g. model or file type
+    """
+    attributes["stage"] = stage
+    status = "ok"
+    start = time.perf_counter()
+    context = tracer.start_as_current_span(f"stage.{stage}", attributes=attributes) if span else nullcontext()
+    with context as current:
+        try:
+            yield current
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            stage_duration.record((time.perf_counter() - start) * 1000, {**attributes, "status": status})
+
+def timed(stage: str, span: bool = True, **attributes: Any) -> Callable[[F], F]:
+    """Decorator timing every call of a sync or async function as `stage`"""
+    def decorator(func: F) -> F:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed_stage(stage, span, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage, span, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
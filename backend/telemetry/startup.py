@@ -0,0 +1,96 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import importlib.abc
+import logging
+import sys
+import time
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path hook timing the execution of top-level packages and backend modules"""
+
+    def __init__(self, timings: Dict[str, float], prefix: str):
+        self.timings = timings
+        self.prefix = prefix
+
+    def _tracked(self, fullname: str) -> bool:
+        return "." not in fullname or fullname.startswith(self.prefix)
+
+    def find_spec(self, fullname, path, target=None):
+        if not self._tracked(fullname):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Built-in and frozen importers are classes shared by all modules; leave them alone
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+        timings = self.timings
+
+        def timed_exec_module(module):
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                timings[fullname] = time.perf_counter() - start
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+class StartupTimer:
+    """
+    Records how long application startup takes and where the time goes.
+
+    `profile_imports()` times every top-level package and backend module
+    imported while it is active (cumulative, including what they import);
+    `stage()` times named initialization steps such as telemetry or warm-up.
+    """
+
+    def __init__(self, prefix: str = "backend."):
+        self.created = time.perf_counter()
+        self.imports: Dict[str, float] = {}
+        self.stages: Dict[str, float] = {}
+        self._finder = _ImportTimer(self.imports, prefix)
+
+    def profile_imports(self) -> None:
+        if self._finder not in sys.meta_path:
+            sys.meta_path.insert(0, self._finder)
+
+    def stop_profiling_imports(self) -> None:
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    def slowest_imports(self, limit: int = 15) -> List[Tuple[str, float]]:
+        return sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def report(self, limit: int = 15) -> Dict[str, object]:
+        """Elapsed time since creation, the slowest imports and every stage, in milliseconds"""
+        return {
+            "elapsed_ms": round((time.perf_counter() - self.created) * 1000, 1),
+            "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in self.slowest_imports(limit)},
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+        }
+
+    def log_report(self, limit: int = 15, logger: Optional[logging.Logger] = None) -> None:
+        report = self.report(limit)
+        lines = [f"Startup took {report['elapsed_ms']} ms"]
+        lines += [f"  import {name}: {ms} ms" for name, ms in report["imports_ms"].items()]
+        lines += [f"  init {name}: {ms} ms" for name, ms in report["stages_ms"].items()]
+        (logger or logging.getLogger(__name__)).info("\n".join(lines))
+
+# Started by backend.main before its imports, reported once the lifespan has run
+startup_timer = StartupTimer()
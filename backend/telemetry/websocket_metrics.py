@@ -0,0 +1,51 @@
+from typing import Callable, Dict
+from opentelemetry import metrics
+from opentelemetry.metrics import Observation
+
+meter = metrics.get_meter("websocket.connections")
+
+websocket_connections = meter.create_up_down_counter(
+    name="websocket.connections",
+    description="Number of open WebSocket connections, labelled by channel",
+    unit="connections"
+)
+
+websocket_send_lag = meter.create_histogram(
+    name="websocket.send.lag",
+    description="Time outbound messages waited in a connection's send queue",
+    unit="ms"
+)
+
+# Labelled with the slow-consumer policy that dropped the message
+websocket_messages_dropped = meter.create_counter(
+    name="websocket.messages.dropped",
+    description="Number of outbound messages dropped for slow consumers",
+    unit="messages"
+)
+
+websocket_slow_disconnects = meter.create_counter(
+    name="websocket.slow_consumer.disconnects",
+    description="Number of connections closed for falling too far behind",
+    unit="connections"
+)
+
+def register_lag_observer(get_lags: Callable[[], Dict[str, Dict[str, float]]]) -> None:
+    """Export the current send lag and queue depth of every connection"""
+    def observe_lag(options):
+        return [Observation(stats["lag_ms"], {"connection": cid, "channel": stats["channel"]}) for cid, stats in get_lags().items()]
+
+    def observe_depth(options):
+        return [Observation(stats["queued"], {"connection": cid, "channel": stats["channel"]}) for cid, stats in get_lags().items()]
+
+    meter.create_observable_gauge(
+        name="websocket.connection.lag",
+        callbacks=[observe_lag],
+        description="Age of the oldest unsent message per connection",
+        unit="ms"
+    )
+    meter.create_observable_gauge(
+        name="websocket.connection.queued",
+        callbacks=[observe_depth],
+        description="Outbound messages queued per connection",
+        unit="messages"
+    )
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import pytest
+from ..agents.executor import AgentQueueFullError, AgentRunExecutor
+
+@pytest.mark.asyncio
+async def test_agent_executor_rejects_when_full():
+    executor = AgentRunExecutor(max_workers=1, max_queue_depth=1, policy="reject", queue_timeout=5)
+    release = threading.Event()
+    try:
+        # Test runs return their result
+        assert await executor.run(lambda x: x * 2, 21) == 42
+
+        running = await executor.submit(release.wait, 5)
+        queued = asyncio.create_task(executor.run(lambda: "queued"))
+        await asyncio.sleep(0.01)
+        assert executor.stats() == {"running": 1, "queued": 1}
+
+        # Test a run beyond workers + queue depth is rejected immediately
+        with pytest.raises(AgentQueueFullError):
+            await executor.run(lambda: "rejected")
+
+        release.set()
+        assert await running is True
+        assert await queued == "queued"
+        assert executor.stats() == {"running": 0, "queued": 0}
+    finally:
+        release.set()
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_agent_executor_wait_policy():
+    executor = AgentRunExecutor(max_workers=1, max_queue_depth=0, policy="wait", queue_timeout=0.05)
+    release = threading.Event()
+    try:
+        running = await executor.submit(release.wait, 5)
+
+        # Test waiting callers are rejected once the queue timeout expires
+        with pytest.raises(AgentQueueFullError):
+            await executor.run(lambda: "late")
+
+        # Test waiting callers are admitted when a worker frees up
+        waiting = asyncio.create_task(executor.run(lambda: "admitted"))
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await running is True
+        executor.queue_timeout = 5
+        assert await waiting == "admitted"
+    finally:
+        release.set()
+        executor.shutdown()
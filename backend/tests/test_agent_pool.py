@@ -0,0 +1,34 @@
+import os
+import pytest
+from ..agents.base import AgentConfig
+from ..agents.factory import AgentType
+from ..agents.pool import AgentPool
+
+# Keep LiteLLM from fetching its model cost map in the background during the test
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+@pytest.mark.asyncio
+async def test_agent_pool():
+    pool = AgentPool(max_idle=2)
+    config = AgentConfig(model_name="gpt-4o-mini", api_key="test")
+
+    # Test warmed agents are handed out without building new ones
+    await pool.warm(AgentType.CHAT, config, 1)
+    assert pool.stats() == {"idle": 1, "in_use": 0}
+    agent = await pool.checkout(AgentType.CHAT, config)
+    assert pool.stats() == {"idle": 0, "in_use": 1}
+
+    # Test agents are reset on check-in and reused
+    agent.chat_history.append({"role": "user", "content": "hello"})
+    agent.agent.state["secret"] = "value"
+    pool.checkin(agent)
+    async with pool.agent(AgentType.CHAT, config) as reused:
+        assert reused is agent
+        assert reused.chat_history == []
+        assert reused.agent.state == {}
+
+    # Test a different config gets its own agent
+    other = await pool.checkout(AgentType.CHAT, config.model_copy(update={"planning_interval": 2}))
+    assert other is not agent
+    pool.checkin(other)
+    assert pool.stats() == {"idle": 2, "in_use": 0}
@@ -0,0 +1,53 @@
+import os
+import threading
+import pytest
+from smolagents.models import ChatMessage
+from ..agents.base import AgentConfig, BluAppAgent
+from ..agents.executor import AgentRunExecutor
+
+# Keep LiteLLM from fetching its model cost map in the background during the test
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+class ScriptedModel:
+    """Stand-in model: prints in the first step, answers in the second once released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, messages, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            return ChatMessage(role="assistant", content="Thought: look\nCode:\n```py\nprint('checked')\n```<end_code>")
+        # Wait until the consumer has seen the first step
+        self.release.wait(timeout=5)
+        return ChatMessage(role="assistant", content="Thought: done\nCode:\n```py\nfinal_answer('42')\n```<end_code>")
+
+def create_agent(model: ScriptedModel) -> BluAppAgent:
+    agent = BluAppAgent(AgentConfig(model_name="gpt-4o-mini", api_key="test", verbosity_level=0), tools=[], use_code_agent=True, executor=AgentRunExecutor(max_workers=1))
+    agent.agent.model = model
+    return agent
+
+@pytest.mark.asyncio
+async def test_steps_are_streamed_live():
+    model = ScriptedModel()
+    agent = create_agent(model)
+
+    steps = []
+    released_before_second_step = None
+    async for step in agent.process_message("What is the answer?"):
+        steps.append(step)
+        if len(steps) == 1:
+            # Test the first step arrives while the run is still waiting on the model
+            released_before_second_step = model.calls <= 2 and not model.release.is_set()
+            model.release.set()
+
+    assert released_before_second_step
+    assert [step.step_number for step in steps] == [1, 2]
+    assert "checked" in steps[0].observations
+    assert agent.chat_history[-1] == {"role": "assistant", "content": "42"}
+
+    # Test a second turn only yields its own steps
+    model.calls = 0
+    steps = [step async for step in agent.process_message("Again?")]
+    assert [step.step_number for step in steps] == [1, 2]
@@ -0,0 +1,121 @@
+import json
+import queue
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from ..benchmarks.corpus import make_scanned_image, make_text_pdf
+from ..benchmarks.extraction import build_cases, measure
+from ..benchmarks.fake_openai import CODE_AGENT_PROMPT_START, FakeLLMConfig, code_agent_reply, create_app
+from ..benchmarks.load import AgentStepError, check_agent_steps
+from ..benchmarks.report import compare, latency_summary, percentile
+from ..services.extraction_service import extract_pdf_page_batches
+
+def test_percentiles():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5, 1, 3], 100) == 5
+    summary = latency_summary([0.1, 0.2, 0.3])
+    assert summary["p50_ms"] == 200.0
+    assert summary["max_ms"] == 300.0
+
+def test_compare_flags_regressions_in_the_bad_direction():
+    baseline = {"scenarios": {"chat": {"latency": {"p99_ms": 100.0}, "throughput_rps": 10.0, "error_rate": 0.0}}}
+    faster = {"scenarios": {"chat": {"latency": {"p99_ms": 50.0}, "throughput_rps": 20.0, "error_rate": 0.0}}}
+    slower = {"scenarios": {"chat": {"latency": {"p99_ms": 130.0}, "throughput_rps": 8.0, "error_rate": 0.1}}}
+
+    assert compare(faster, baseline) == []
+    regressions = compare(slower, baseline)
+    assert [line.split(":")[0] for line in regressions] == [
+        "scenarios.chat.error_rate",
+        "scenarios.chat.latency.p99_ms",
+        "scenarios.chat.throughput_rps"
+    ]
+    # A looser per-metric threshold lets the latency change through
+    assert len(compare(slower, baseline, thresholds={"*.p99_ms": 0.5})) == 2
+
+def test_fake_openai_answers_agents_with_tool_calls():
+    client = TestClient(create_app(FakeLLMConfig(latency=0, token_delay=0, completion_tokens=4)))
+    tools = [{"type": "function", "function": {"name": name}} for name in ("analyze_document", "final_answer")]
+
+    response = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "Analyze document doc-1"}],
+        "tools": tools
+    })
+    call = response.json()["choices"][0]["message"]["tool_calls"][0]
+    assert call["function"]["name"] == "analyze_document"
+
+    response = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "user", "content": "Analyze document doc-1"},
+            {"role": "user", "content": "Observation: done"}
+        ],
+        "tools": tools
+    })
+    call = response.json()["choices"][0]["message"]["tool_calls"][0]
+    assert call["function"]["name"] == "final_answer"
+
+def test_fake_openai_answers_code_agents_with_code():
+    config = FakeLLMConfig(code_steps=1)
+    system = {"role": "system", "content": f"{CODE_AGENT_PROMPT_START}. Tools: analyze_document. Observation: ..."}
+    messages = [system, {"role": "user", "content": "New task:\nAnalyze document doc-1"}]
+
+    replies = []
+    for _ in range(3):
+        reply = code_agent_reply({"messages": messages}, config)
+        replies.append(reply)
+        messages = messages + [
+            {"role": "assistant", "content": reply},
+            {"role": "user", "content": "Observation:\nExecution logs:\n"}
+        ]
+    assert "analyze_document('bench-doc'" in replies[0]
+    assert "print('Intermediate step 1')" in replies[1]
+    assert "```py\nfinal_answer('Benchmark answer')\n```" in replies[2]
+
+    # Planning prompts and plain chat get text
+    assert code_agent_reply({"messages": [{"role": "system", "content": "You are a world expert at making plans"}]}, config) is None
+    assert code_agent_reply({"messages": [{"role": "user", "content": "Hello"}]}, config) is None
+
+def test_check_agent_steps():
+    check_agent_steps([{"step": 1, "error": None}, {"step": 2, "error": None}], max_steps=6)
+    with pytest.raises(AgentStepError):
+        check_agent_steps([{"step": 6, "error": None}], max_steps=6)
+    with pytest.raises(AgentStepError):
+        check_agent_steps([{"step": 1, "error": {"message": "Error in code parsing"}}, {"step": 2, "error": None}], max_steps=6)
+
+def test_fake_openai_streams_tokens_and_usage():
+    client = TestClient(create_app(FakeLLMConfig(latency=0, token_delay=0, completion_tokens=3)))
+    response = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    })
+    events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content") or "" for c in chunks if c["choices"])
+    assert text == "token0 token1 token2 "
+    assert chunks[-1]["usage"]["completion_tokens"] == 3
+
+def test_corpus_is_deterministic():
+    assert make_text_pdf(3) == make_text_pdf(3)
+    assert make_text_pdf(3, seed=1) != make_text_pdf(3)
+    assert make_scanned_image(50) == make_scanned_image(50)
+
+    batches = queue.Queue()
+    assert extract_pdf_page_batches(make_text_pdf(3), batches, threading.Event(), batch_size=10) == 3
+    total_pages, start, texts = batches.get_nowait()
+    assert (total_pages, start) == (3, 0)
+    assert texts[2].startswith("Page 3 of 3")
+
+def test_measure_extractors():
+    cases = build_cases(["pdf"], [5], [])
+    assert sorted(cases) == ["pdf.5p"]
+    extractor, documents = cases["pdf.5p"]
+    result = measure(extractor, documents, repeat=1, warmup=1, batch_size=2)
+    assert result["pages"] == 5
+    assert result["pages_per_sec"] > 0
+    assert result["page_latency"]["p50_ms"] > 0
+    assert result["worker_peak_rss_bytes"] > 0
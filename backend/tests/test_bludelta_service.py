@@ -0,0 +1,86 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from ..config import Settings
+from ..services.bludelta_service import BluDeltaService
+
+def create_stand_in(failures: int) -> FastAPI:
+    """Local stand-in for BluDelta that fails the first `failures` document lookups"""
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/analyze")
+    async def analyze(request: Request):
+        body = await request.json()
+        if body["doc_id"] == "missing":
+            return JSONResponse(status_code=404, content={"detail": "not found"})
+        return {"doc_id": body["doc_id"], "prompt": body["prompt"], "fields": {"total": "42.00"}}
+
+    @app.get("/documents/{doc_id}")
+    async def document_info(doc_id: str):
+        app.state.calls += 1
+        if app.state.calls <= failures:
+            return JSONResponse(status_code=503, content={"detail": "busy"})
+        return {"doc_id": doc_id, "pages": 1}
+
+    return app
+
+def create_service(app: FastAPI, max_retries: int = 3) -> BluDeltaService:
+    settings = Settings(
+        openai_api_key="test",
+        bludelta_service_url="http://bludelta.test",
+        bludelta_max_retries=max_retries,
+        bludelta_retry_backoff=0.001
+    )
+    return BluDeltaService(settings=settings, transport=httpx.ASGITransport(app=app))
+
+@pytest.mark.asyncio
+async def test_bludelta_service():
+    app = create_stand_in(failures=2)
+    service = create_service(app)
+    try:
+        # Test analysis request
+        result = await service.analyze_document("doc-1", "Extract the total")
+        assert result["fields"]["total"] == "42.00"
+
+        # Test idempotent lookups are retried on 503
+        info = await service.get_document_info("doc-1")
+        assert info == {"doc_id": "doc-1", "pages": 1}
+        assert app.state.calls == 3
+
+        # Test the client is reused across calls
+        client = service._get_client()
+        await service.get_document_info("doc-2")
+        assert service._get_client() is client
+    finally:
+        await service.aclose()
+
+@pytest.mark.asyncio
+async def test_bludelta_service_gives_up_after_retries():
+    app = create_stand_in(failures=10)
+    service = create_service(app, max_retries=1)
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await service.get_document_info("doc-1")
+        assert app.state.calls == 2
+    finally:
+        await service.aclose()
+
+@pytest.mark.asyncio
+async def test_analyze_documents_batch():
+    app = create_stand_in(failures=0)
+    service = create_service(app)
+    try:
+        # Test results come back in request order, with per-item errors
+        results = await service.analyze_documents(["doc-1", "missing", "doc-3"], "Extract", concurrency=2)
+        assert [item["doc_id"] for item in results] == ["doc-1", "missing", "doc-3"]
+        assert results[0]["result"]["prompt"] == "Extract"
+        assert "404" in results[1]["error"]
+        assert results[2]["result"]["doc_id"] == "doc-3"
+
+        # Test streaming yields every document once
+        items = [item async for item in service.iter_analyze_documents(["a", "b"], "Extract")]
+        assert sorted(item["index"] for item in items) == [0, 1]
+    finally:
+        await service.aclose()
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import sqlite3
+import time
+import pytest
+from ..services.broadcast_bus import SQLiteBroadcastBus
+from ..services.connection_manager import ConnectionManager
+from .test_connection_manager import FakeWebSocket
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_reaches_other_workers(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    workers = [ConnectionManager(), ConnectionManager()]
+    clients = [FakeWebSocket(), FakeWebSocket()]
+    connections = []
+    for manager, client in zip(workers, clients):
+        await manager.attach_bus(SQLiteBroadcastBus(path, poll_interval=0.01))
+        connections.append(manager.connect(client, channel="agent"))
+    try:
+        for i in range(3):
+            assert await workers[0].broadcast({"n": i}, channel="agent") == 1
+        await workers[1].broadcast({"n": "other"}, channel="chat")
+
+        for _ in range(100):
+            if len(clients[1].sent) == 3:
+                break
+            await asyncio.sleep(0.01)
+
+        # Test both workers deliver every message exactly once, in order
+        expected = [{"n": i} for i in range(3)]
+        assert clients[1].sent == expected
+        assert clients[0].sent == expected
+    finally:
+        for manager, connection in zip(workers, connections):
+            await manager.disconnect(connection)
+            await manager.detach_bus()
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_skips_malformed_rows(tmp_path):
+    path = str(tmp_path / "broadcast.db")
+    received = []
+    bus = SQLiteBroadcastBus(path, poll_interval=0.01)
+    await bus.start(received.extend)
+    try:
+        other = sqlite3.connect(path)
+        with other:
+            for payload in ("{not json", json.dumps({"n": 1})):
+                other.execute(
+                    "INSERT INTO broadcasts (origin, channel, payload, created) VALUES (?, ?, ?, ?)",
+                    ("other-worker", "agent", payload, time.time())
+                )
+        other.close()
+
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert received == [("agent", {"n": 1})]
+        # The bad row did not stop the poll loop
+        assert not bus._task.done()
+    finally:
+        await bus.stop()
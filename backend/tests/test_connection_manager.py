@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from ..services.connection_manager import ConnectionManager
+
+class FakeWebSocket:
+    """Records sent messages; `stall` blocks sends until released"""
+
+    def __init__(self, stall: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+        if not stall:
+            self.release.set()
+
+    async def send_json(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_on_slow_clients():
+    manager = ConnectionManager(max_queue_size=2, slow_consumer_policy="drop_oldest")
+    fast, slow = FakeWebSocket(), FakeWebSocket(stall=True)
+    fast_conn = manager.connect(fast, channel="agent")
+    slow_conn = manager.connect(slow, channel="agent")
+    other = manager.connect(FakeWebSocket(), channel="chat")
+
+    for i in range(4):
+        assert await manager.broadcast({"n": i}, channel="agent") == 2
+        await asyncio.sleep(0)
+
+    # Test the fast client got everything while the stalled one is still blocked
+    assert fast.sent == [{"n": i} for i in range(4)]
+    assert other.websocket.sent == []
+    stats = manager.lag_stats()[slow_conn.id]
+    assert stats["queued"] == 2
+    assert stats["dropped"] == 1
+    assert stats["lag_ms"] > 0
+
+    # Test the oldest queued messages were dropped for the stalled client
+    slow.release.set()
+    await manager.disconnect(slow_conn)
+    assert slow.sent == [{"n": 0}, {"n": 2}, {"n": 3}]
+    await manager.disconnect(fast_conn)
+    await manager.disconnect(other)
+    assert len(manager) == 0
+
+@pytest.mark.asyncio
+async def test_drop_oldest_never_drops_replies():
+    manager = ConnectionManager(max_queue_size=4, slow_consumer_policy="drop_oldest")
+    slow = FakeWebSocket(stall=True)
+    conn = manager.connect(slow, channel="chat")
+
+    # A streamed answer interleaved with a burst of broadcasts
+    await conn.send_json({"type": "delta", "content": "Hel"})
+    await asyncio.sleep(0)  # The writer is now stuck sending the first delta
+    await conn.send_json({"type": "delta", "content": "lo"})
+    await conn.send_json({"type": "message", "content": "Hello"})
+    for i in range(5):
+        assert conn.offer({"n": i}) is True
+    assert conn.dropped == 3
+
+    slow.release.set()
+    await manager.disconnect(conn)
+    assert slow.sent == [
+        {"type": "delta", "content": "Hel"},
+        {"type": "delta", "content": "lo"},
+        {"type": "message", "content": "Hello"},
+        {"n": 3},
+        {"n": 4}
+    ]
+
+    # Test a queue holding only replies turns broadcasts away instead
+    slow = FakeWebSocket(stall=True)
+    conn = manager.connect(slow, channel="chat")
+    for part in ("a", "b", "c", "d", "e"):
+        await conn.send_json({"type": "delta", "content": part})
+        await asyncio.sleep(0)
+    assert conn.offer({"n": 5}) is False
+    slow.release.set()
+    await manager.disconnect(conn)
+    assert [m["content"] for m in slow.sent] == ["a", "b", "c", "d", "e"]
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_clients():
+    manager = ConnectionManager(max_queue_size=1, slow_consumer_policy="disconnect")
+    slow = FakeWebSocket(stall=True)
+    conn = manager.connect(slow)
+
+    for i in range(3):
+        await manager.broadcast({"n": i})
+    await asyncio.sleep(0.01)
+
+    assert slow.closed_with == 1013
+    assert conn.closed
+    assert len(manager) == 0
+    assert await manager.broadcast({"n": 3}) == 0
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ConnectionManager(slow_consumer_policy="block")
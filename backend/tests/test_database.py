@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import Settings
+from ..database.engine import (
+    create_async_db_engine,
+    engine_options,
+    prompt_rows,
+    result_rows,
+    to_async_url,
+    upsert_prompts,
+    upsert_results,
+    upsert_statement,
+)
+from ..database.models import AnalysisResult, Base, Prompt
+
+def test_async_url_and_pool_options():
+    # Test sync drivers are swapped for async ones
+    assert to_async_url("postgresql://user:secret@db:5432/bludelta") == "postgresql+asyncpg://user:secret@db:5432/bludelta"
+    assert to_async_url("sqlite:///./prompts.db") == "sqlite+aiosqlite:///./prompts.db"
+    assert to_async_url("postgresql+asyncpg://db/bludelta") == "postgresql+asyncpg://db/bludelta"
+    with pytest.raises(ValueError):
+        to_async_url("oracle://db")
+
+    # Test pool settings apply to server databases only
+    settings = Settings(openai_api_key="test", database_pool_size=7, database_pool_recycle=60)
+    options = engine_options("postgresql+asyncpg://db/bludelta", settings)
+    assert options["pool_size"] == 7 and options["pool_recycle"] == 60 and options["pool_pre_ping"]
+    assert "pool_size" not in engine_options("sqlite+aiosqlite://", settings)
+
+def test_bulk_upsert_statements():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    results = [{"doc_id": f"doc-{i}", "prompt": "Extract", "result": {"total": i}} for i in range(3)]
+
+    with engine.begin() as conn:
+        conn.execute(upsert_statement(Prompt, prompt_rows({"invoice": "v1", "receipt": "v1"}), "sqlite"))
+        conn.execute(upsert_statement(AnalysisResult, result_rows(results), "sqlite"))
+
+    # Test existing rows are updated in place
+    results[0]["result"] = {"total": 42}
+    with engine.begin() as conn:
+        conn.execute(upsert_statement(Prompt, prompt_rows({"invoice": "v2"}), "sqlite"))
+        conn.execute(upsert_statement(AnalysisResult, result_rows(results[:1]), "sqlite"))
+
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Prompt)) == 2
+        assert conn.scalar(select(Prompt.prompt).where(Prompt.doc_type == "invoice")) == "v2"
+        assert conn.scalar(select(func.count()).select_from(AnalysisResult)) == 3
+        assert conn.scalar(select(AnalysisResult.result).where(AnalysisResult.doc_id == "doc-0")) == {"total": 42}
+    engine.dispose()
+
+@pytest.mark.asyncio
+async def test_async_engine_bulk_upsert(tmp_path):
+    settings = Settings(openai_api_key="test")
+    engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}", settings)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        # Test many prompts are written and then updated through the async session
+        async with AsyncSession(engine) as session:
+            assert await upsert_prompts(session, {f"type-{i}": "v1" for i in range(1200)}) == 1200
+            await upsert_prompts(session, {"type-0": "v2"})
+            assert await session.scalar(select(func.count()).select_from(Prompt)) == 1200
+            assert await session.scalar(select(Prompt.prompt).where(Prompt.doc_type == "type-0")) == "v2"
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_without_native_upsert(tmp_path):
+    settings = Settings(openai_api_key="test")
+    engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}", settings)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        # Act as a database with no INSERT ... ON CONFLICT, e.g. SQL Server
+        engine.sync_engine.dialect.name = "mssql"
+        results = [{"doc_id": f"doc-{i}", "prompt": "Extract", "result": {"total": i}} for i in range(3)]
+
+        async with AsyncSession(engine) as session:
+            assert await upsert_results(session, results) == 3
+            results[0]["result"] = {"total": 42}
+            assert await upsert_results(session, results[:1]) == 1
+            assert await session.scalar(select(func.count()).select_from(AnalysisResult)) == 3
+            assert await session.scalar(select(AnalysisResult.result).where(AnalysisResult.doc_id == "doc-0")) == {"total": 42}
+    finally:
+        await engine.dispose()
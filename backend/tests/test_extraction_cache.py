@@ -0,0 +1,30 @@
+import pytest
+from ..services.extraction_cache import ExtractionCache
+
+@pytest.mark.asyncio
+async def test_extraction_cache(tmp_path):
+    cache = ExtractionCache(max_chars=10, cache_dir=str(tmp_path))
+    key_a = cache.make_key(b"invoice-a", "pdf")
+    key_b = cache.make_key(b"invoice-b", "pdf")
+
+    # Test keys depend on content and extractor kind
+    assert key_a != key_b
+    assert key_a != cache.make_key(b"invoice-a", "image")
+
+    # Test miss, then hit after storing
+    assert await cache.get(key_a) is None
+    await cache.put(key_a, "aaaaaa")
+    assert await cache.get(key_a) == "aaaaaa"
+
+    # Test LRU eviction once the size bound is exceeded
+    await cache.put(key_b, "bbbbbb")
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 1
+
+    # Test evicted entries are served from the disk tier
+    assert await cache.get(key_a) == "aaaaaa"
+
+    # Test the disk tier survives a new cache instance
+    restarted = ExtractionCache(max_chars=10, cache_dir=str(tmp_path))
+    assert await restarted.get(key_b) == "bbbbbb"
+    assert restarted.stats()["hits"] == 1
@@ -0,0 +1,183 @@
+import asyncio
+import io
+import time
+import PyPDF2
+import pytest
+from PIL import Image, ImageDraw
+from ..services.extraction_service import (
+    ExtractionExecutor,
+    ExtractionQueueFullError,
+    ExtractionTimeoutError,
+    band_boxes,
+    prepare_image_ocr,
+    preprocess_image,
+)
+
+def text_page(width=1240, height=1754, lines=20):
+    """A white page with dark bars standing in for text lines"""
+    image = Image.new("L", (width, height), 230)
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        top = 100 + line * 70
+        draw.rectangle((100, top, width - 100, top + 30), fill=20)
+    return image
+
+@pytest.mark.asyncio
+async def test_extraction_executor():
+    executor = ExtractionExecutor(max_workers=1, job_timeout=5.0, max_queue_depth=0)
+    try:
+        # Test running a job in the pool
+        result = await executor.run(sorted, [3, 1, 2])
+        assert result == [1, 2, 3]
+
+        # Test rejecting jobs beyond the queue depth
+        running = asyncio.create_task(executor.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(ExtractionQueueFullError):
+            await executor.run(time.sleep, 0)
+        await running
+
+        # Test per-job timeout
+        with pytest.raises(ExtractionTimeoutError):
+            await executor.run(time.sleep, 1.0, timeout=0.1)
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_extraction_executor_recycles_timed_out_workers():
+    executor = ExtractionExecutor(max_workers=1, job_timeout=5.0, max_queue_depth=0)
+    try:
+        await executor.run(sorted, [1])  # Start the worker, so the timeout hits a running job
+        with pytest.raises(ExtractionTimeoutError):
+            await executor.run(time.sleep, 30, timeout=0.2)
+
+        # The hung worker is gone: its slot is free and the next job runs right away
+        for _ in range(50):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert executor.in_flight == 0
+        assert await executor.run(sorted, [2, 1], timeout=10) == [1, 2]
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_timed_out_job_does_not_break_other_jobs():
+    executor = ExtractionExecutor(max_workers=2, job_timeout=10.0, max_queue_depth=0)
+    try:
+        # Both on workers of the same pool
+        other = asyncio.create_task(executor.run(time.sleep, 1.0))
+        with pytest.raises(ExtractionTimeoutError):
+            await executor.run(time.sleep, 30, timeout=0.3)
+
+        # Test the other job finishes normally, then the hung worker is stopped
+        assert await other is None
+        for _ in range(50):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_iter_pdf_pages():
+    writer = PyPDF2.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    executor = ExtractionExecutor(max_workers=1)
+    try:
+        # Test all pages are yielded in order
+        pages = [page async for page in executor.iter_pdf_pages(buffer.getvalue(), batch_size=2)]
+        assert [(number, total) for number, total, _ in pages] == [(1, 5), (2, 5), (3, 5), (4, 5), (5, 5)]
+
+        # Test extraction stops at the page budget
+        pages = [page async for page in executor.iter_pdf_pages(buffer.getvalue(), batch_size=2, max_pages=3)]
+        assert [number for number, _, _ in pages] == [1, 2, 3]
+
+        # Test closing early stops the worker job instead of parsing the rest
+        writer = PyPDF2.PdfWriter()
+        for _ in range(200):
+            writer.add_blank_page(width=200, height=200)
+        large = io.BytesIO()
+        writer.write(large)
+        pages = executor.iter_pdf_pages(large.getvalue(), batch_size=1)
+        assert (await pages.__anext__())[:2] == (1, 200)
+        await pages.aclose()
+        for _ in range(50):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_tiled_ocr_takes_one_queue_place():
+    buffer = io.BytesIO()
+    text_page().save(buffer, format="PNG")
+    executor = ExtractionExecutor(max_workers=1, job_timeout=30.0, max_queue_depth=0)
+    try:
+        page = asyncio.create_task(executor.extract_image_text(buffer.getvalue(), 0, True, False, 1_000_000, 3))
+        await asyncio.sleep(0)
+        # The page holds the only place, and its own strips do not need another
+        with pytest.raises(ExtractionQueueFullError):
+            await executor.run(sorted, [1])
+        # Without tesseract the strips fail, which must cancel the others rather than lose them
+        outcome, = await asyncio.gather(page, return_exceptions=True)
+        assert not isinstance(outcome, ExtractionQueueFullError)
+        for _ in range(50):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.1)
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+def test_preprocess_image():
+    # Sideways colour photo with EXIF orientation, twice the target resolution
+    photo = text_page(2480, 3508).convert("RGB").rotate(90, expand=True)
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", exif=exif.tobytes())
+
+    image = preprocess_image(Image.open(io.BytesIO(buffer.getvalue())), target_dpi=150)
+    assert image.mode == "L"
+    assert image.size == (1240, 1754)
+    assert set(image.tobytes()) == {0, 255}
+
+    # Transparent areas become paper, not ink
+    transparent = Image.new("RGBA", (50, 50), (0, 0, 0, 0))
+    assert set(preprocess_image(transparent, target_dpi=0, binarize=False).tobytes()) == {255}
+
+    # Small images are never upscaled
+    assert preprocess_image(text_page(300, 400), target_dpi=300).size == (300, 400)
+
+def test_deskew():
+    skewed = text_page().rotate(3, resample=Image.BILINEAR, fillcolor=230)
+    straight = preprocess_image(skewed, target_dpi=0, deskew=True)
+    # A level page has rows that are all paper between the text lines
+    rows = [straight.crop((0, y, straight.width, y + 1)) for y in range(straight.height)]
+    blank = sum(1 for row in rows if set(row.tobytes()) == {255})
+    assert blank > straight.height * 0.5
+
+def test_band_boxes_cut_between_lines():
+    image = preprocess_image(text_page(), target_dpi=0)
+    boxes = band_boxes(image, 4)
+    assert len(boxes) == 4
+    assert boxes[0][1] == 0 and boxes[-1][3] == image.height
+    for _, top, _, _ in boxes[1:]:
+        assert set(image.crop((0, top, image.width, top + 1)).tobytes()) == {255}
+
+def test_prepare_image_ocr_splits_large_images():
+    buffer = io.BytesIO()
+    text_page().save(buffer, format="PNG")
+    text, strips = prepare_image_ocr(buffer.getvalue(), 0, True, False, 1_000_000, 3)
+    assert text is None
+    assert len(strips) == 3
+    heights = [Image.open(io.BytesIO(strip)).height for strip in strips]
+    assert sum(heights) == 1754
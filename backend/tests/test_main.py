@@ -0,0 +1,92 @@
+import asyncio
+import base64
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from ..main import app
+    # No lifespan: validation errors are answered before any service is needed
+    return TestClient(app)
+
+def test_chat_rejects_malformed_json(client):
+    response = client.post("/chat", content=b'{"bad"', headers={"content-type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "json_invalid"
+
+def test_chat_rejects_file_form_field_without_upload(client):
+    response = client.post("/chat", data={"content": "Hello", "file": "not a file"}, files={"unused": ("a.txt", b"x")})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "file"]
+
+@pytest.mark.asyncio
+async def test_health_reports_agent_pool_warmup(client, monkeypatch):
+    from .. import main
+    started, release = asyncio.Event(), asyncio.Event()
+    async def slow_warm(count):
+        started.set()
+        await release.wait()
+    monkeypatch.setattr(main.agent_router, "warm_agent_pool", slow_warm)
+
+    main.app.state.agent_pool = "warming"
+    warmup = asyncio.create_task(main.warm_agent_pool(main.app, 1))
+    await started.wait()
+    assert client.get("/health").json() == {"status": "ok", "ready": False, "agent_pool": "warming"}
+
+    release.set()
+    await warmup
+    assert client.get("/health").json() == {"status": "ok", "ready": True, "agent_pool": "ready"}
+
+@pytest.mark.asyncio
+async def test_chat_rejects_oversized_uploads_while_reading(client, monkeypatch):
+    from .. import main
+    monkeypatch.setattr(main.settings, "max_upload_bytes", 1000)
+    # Multipart body whose file part never ends; the server has to stop reading on its own
+    chunks = [b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.pdf"\r\n\r\n'] + [b"x" * 1000] * 1000
+    received = []
+    async def receive():
+        received.append(1)
+        return {"type": "http.request", "body": chunks[len(received) - 1], "more_body": True}
+    sent = []
+    async def send(message):
+        sent.append(message)
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "path": "/chat", "raw_path": b"/chat",
+        "root_path": "", "scheme": "http", "query_string": b"", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")]
+    }
+    await main.app(scope, receive, send)
+    assert sent[0]["status"] == 413
+    assert len(received) < 1000
+
+    response = client.post("/chat", files={"file": ("a.pdf", b"x" * 1001, "application/pdf")}, data={"content": "Hi"})
+    assert response.status_code == 413
+
+    content = base64.b64encode(b"x" * 1001).decode()
+    response = client.post("/chat", json={"content": "Hi", "file": {"content": content, "type": "application/pdf"}})
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_websocket_rejects_oversized_inline_file(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from .. import main
+    monkeypatch.setattr(main.settings, "max_upload_bytes", 1000)
+    class FakeWebSocket:
+        def __init__(self, frames):
+            self.frames = list(frames)
+        async def receive(self):
+            return self.frames.pop(0)
+        async def receive_bytes(self):
+            return self.frames.pop(0)["bytes"]
+
+    content = "data:application/pdf;base64," + base64.b64encode(b"x" * 1001).decode()
+    frame = {"type": "websocket.receive", "text": json.dumps({"content": "Hi", "file": {"content": content, "type": "application/pdf"}})}
+    with pytest.raises(main.UploadTooLargeError):
+        await main.receive_chat_message(FakeWebSocket([frame]))
+
+    # An announced size within the limit does not let a client send more than it announced
+    frame = {"type": "websocket.receive", "text": json.dumps({"content": "Hi", "file": {"type": "application/pdf", "size": 500}})}
+    with pytest.raises(ValueError, match="more file data"):
+        await main.receive_chat_message(FakeWebSocket([frame, {"bytes": b"x" * 400}, {"bytes": b"x" * 400}]))
@@ -0,0 +1,105 @@
+import pytest
+from openai.types.chat import ChatCompletionChunk
+from opentelemetry.sdk.metrics import MeterProvider
+from ..telemetry.openai_metrics import create_chat_completion, estimate_cost, trace_openai_request
+from ..telemetry.prometheus import PrometheusMetrics
+from ..telemetry import setup
+from ..telemetry.stages import timed
+
+def test_prometheus_rendering():
+    local = PrometheusMetrics()
+    meter = MeterProvider(metric_readers=[local.reader]).get_meter("test")
+    meter.create_histogram("pipeline.stage.duration", unit="ms").record(12.5, {"stage": "ocr"})
+    meter.create_counter("llm.request.count").add(2, {"model": 'gpt-"4"'})
+    meter.create_up_down_counter("agent.runs.active").add(1)
+
+    text = local.render()
+    assert "# TYPE pipeline_stage_duration_milliseconds histogram" in text
+    assert 'pipeline_stage_duration_milliseconds_bucket{stage="ocr",le="25.0"} 1' in text
+    assert 'pipeline_stage_duration_milliseconds_bucket{stage="ocr",le="+Inf"} 1' in text
+    assert 'pipeline_stage_duration_milliseconds_count{stage="ocr"} 1' in text
+    assert 'llm_request_count_total{model="gpt-\\"4\\""} 2' in text
+    assert "# TYPE agent_runs_active gauge" in text
+
+@pytest.mark.asyncio
+async def test_timed_passes_results_and_errors_through():
+    @timed("sync_stage")
+    def double(x):
+        return x * 2
+
+    @timed("async_stage", endpoint="test")
+    async def fail():
+        raise ValueError("boom")
+
+    assert double(21) == 42
+    with pytest.raises(ValueError):
+        await fail()
+
+def chunk(content=None, usage=None):
+    return ChatCompletionChunk.model_validate({
+        "id": "chunk",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [] if usage else [{"index": 0, "delta": {"content": content}}],
+        "usage": usage
+    })
+
+@pytest.mark.asyncio
+async def test_trace_openai_request_passes_results_and_errors_through():
+    usage = type("Usage", (), {"prompt_tokens": 5, "completion_tokens": 2})()
+
+    @trace_openai_request
+    async def complete(model: str, fail: bool = False):
+        if fail:
+            raise RuntimeError("rate limited")
+        return type("Response", (), {"usage": usage})()
+
+    assert complete.__name__ == "complete"
+    assert (await complete(model="gpt-4o-mini")).usage is usage
+    with pytest.raises(RuntimeError):
+        await complete(model="gpt-4o-mini", fail=True)
+
+def test_estimate_cost():
+    # Test the longest model prefix wins and cached prompt tokens are discounted
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert estimate_cost("openai/gpt-4o", 1_000_000, 1_000_000, cached_tokens=1_000_000) == pytest.approx(11.25)
+    assert estimate_cost("unknown-model", 10, 10) is None
+
+@pytest.mark.asyncio
+async def test_streamed_completion_is_passed_through():
+    requests = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+
+            async def stream():
+                yield chunk("Hel")
+                yield chunk("lo")
+                yield chunk(usage={"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7})
+            return stream()
+
+    client = type("FakeClient", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+    stream = await create_chat_completion(client, "test", model="gpt-4o-mini", messages=[], stream=True)
+    chunks = [item async for item in stream]
+
+    # Test usage is requested for streams and every chunk reaches the caller
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    assert [c.choices[0].delta.content for c in chunks if c.choices] == ["Hel", "lo"]
+    assert chunks[-1].usage.completion_tokens == 2
+
+def test_shutdown_telemetry_flushes_then_stops_providers(monkeypatch):
+    calls = []
+    class FakeProvider:
+        def __init__(self, name):
+            self.name = name
+        def force_flush(self):
+            calls.append(("flush", self.name))
+        def shutdown(self):
+            calls.append(("shutdown", self.name))
+    monkeypatch.setattr(setup, "_meter_provider", FakeProvider("meter"))
+    monkeypatch.setattr(setup, "_tracer_provider", FakeProvider("tracer"))
+
+    setup.shutdown_telemetry()
+    assert calls == [("flush", "meter"), ("flush", "tracer"), ("shutdown", "meter"), ("shutdown", "tracer")]
@@ -20,4 +20,43 @@ async def test_prompt_store():
     # Test clearing prompts
     store.clear()
     prompt = await store.get_prompt("invoice")
-    assert prompt is None 
\ No newline at end of file
+    assert prompt is None 
+
+@pytest.mark.asyncio
+async def test_prompt_store_durable(tmp_path):
+    url = f"sqlite:///{tmp_path / 'prompts.db'}"
+    worker_a = PromptStore(url, cache_ttl=60)
+    worker_b = PromptStore(url, cache_ttl=0)
+    try:
+        # Test prompts written by one worker are visible to another
+        assert await worker_b.get_prompt("invoice") is None
+        assert await worker_a.store_prompt("invoice", "Analyze this invoice") is True
+        assert await worker_b.get_prompt("invoice") == "Analyze this invoice"
+
+        # Test cached entries are served until they expire or are invalidated
+        await worker_b.store_prompt("invoice", "Extract the invoice total")
+        assert await worker_a.get_prompt("invoice") == "Analyze this invoice"
+        worker_a.invalidate("invoice")
+        assert await worker_a.get_prompt("invoice") == "Extract the invoice total"
+
+        # Test prompts survive a restart
+        worker_a.close()
+        restarted = PromptStore(url)
+        assert await restarted.get_prompt("invoice") == "Extract the invoice total"
+        restarted.close()
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+@pytest.mark.asyncio
+async def test_prompt_store_without_native_upsert(tmp_path):
+    store = PromptStore(f"sqlite:///{tmp_path / 'prompts.db'}", cache_ttl=0)
+    try:
+        # Act as a database with no INSERT ... ON CONFLICT, e.g. SQL Server
+        store._get_engine().dialect.name = "mssql"
+        assert await store.store_prompts({"invoice": "v1", "receipt": "v1"}) is True
+        assert await store.store_prompt("invoice", "v2") is True
+        assert await store.get_prompt("invoice") == "v2"
+        assert await store.get_prompt("receipt") == "v1"
+    finally:
+        store.close()
@@ -0,0 +1,41 @@
+import pytest
+from ..agents.response_cache import ResponseCache
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "What is the invoice total?"}
+]
+
+@pytest.mark.asyncio
+async def test_response_cache(tmp_path):
+    cache = ResponseCache(max_entries=1, ttl=60, cache_dir=str(tmp_path))
+
+    # Test only deterministic, non-streaming requests are cacheable
+    assert cache.is_cacheable({"temperature": 0})
+    assert not cache.is_cacheable({})
+    assert not cache.is_cacheable({"temperature": 0.7})
+    assert not cache.is_cacheable({"temperature": 0, "stream": True})
+    assert not cache.is_cacheable({"temperature": 0, "n": 2})
+
+    # Test keys are canonical and cover model, messages and params
+    key = cache.make_key("gpt-4o-mini", MESSAGES, {"temperature": 0, "tool_choice": "auto"})
+    assert key == cache.make_key("gpt-4o-mini", MESSAGES, {"tool_choice": "auto", "temperature": 0})
+    assert key != cache.make_key("gpt-4o", MESSAGES, {"temperature": 0, "tool_choice": "auto"})
+    assert key != cache.make_key("gpt-4o-mini", MESSAGES[:1], {"temperature": 0, "tool_choice": "auto"})
+
+    # Test miss, then hit
+    assert await cache.get(key) is None
+    await cache.put(key, {"id": "resp-1"})
+    assert await cache.get(key) == {"id": "resp-1"}
+    assert cache.stats()["hit_ratio"] == 0.5
+
+    # Test LRU eviction falls back to the disk backend
+    other = cache.make_key("gpt-4o-mini", MESSAGES, {"temperature": 0})
+    await cache.put(other, {"id": "resp-2"})
+    assert cache.stats()["entries"] == 1
+    assert await cache.get(key) == {"id": "resp-1"}
+
+    # Test expired entries are not served
+    expired = ResponseCache(ttl=-1)
+    await expired.put(key, {"id": "resp-1"})
+    assert await expired.get(key) is None
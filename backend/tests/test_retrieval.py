@@ -0,0 +1,47 @@
+import pytest
+from ..agents.retrieval import BM25Index, DocumentRetriever, chunk_text
+
+def make_document() -> str:
+    filler = "\n\n".join(f"Section {i}: general terms and conditions apply to this agreement." for i in range(200))
+    return (
+        f"{filler}\n\n"
+        "Payment: the invoice total of 1,234.56 EUR is due within 30 days.\n\n"
+        f"{filler}"
+    )
+
+def test_chunk_text():
+    text = make_document()
+    chunks = chunk_text(text, chunk_size=500, overlap=100)
+
+    # Test chunks respect the size limit and cover the whole text
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert "invoice total" in "".join(chunks)
+
+    # Test oversized paragraphs are split on whitespace
+    long_chunks = chunk_text("word " * 1000, chunk_size=100, overlap=0)
+    assert all(len(chunk) <= 100 for chunk in long_chunks)
+
+def test_bm25_index():
+    index = BM25Index([
+        "delivery address and shipping terms",
+        "the invoice total is due within 30 days",
+        "general terms and conditions"
+    ])
+    assert index.search("what is the invoice total?", top_k=1)[0][0] == 1
+    assert index.search("unrelated question", top_k=1) == []
+
+@pytest.mark.asyncio
+async def test_document_retriever():
+    retriever = DocumentRetriever(chunk_size=500, chunk_overlap=100, top_k=2, min_chars=1000)
+    text = make_document()
+
+    # Test short documents are passed through unchanged
+    assert await retriever.select_context("short document", "anything") == "short document"
+
+    # Test large documents are reduced to the relevant chunks
+    context = await retriever.select_context(text, "When is the invoice total due?")
+    assert "1,234.56 EUR" in context
+    assert len(context) <= 2 * 500 + 20
+
+    # Test the index is cached per document
+    assert await retriever.get_index(text) is await retriever.get_index(text)
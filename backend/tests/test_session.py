@@ -0,0 +1,120 @@
+import pytest
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from ..agents.openai_agent import OpenAIAgent
+from ..agents.session import ChatSession, SessionStore
+
+class FakeCompletions:
+    """Records requests and answers with a fixed reply"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, model, messages, **kwargs):
+        self.requests.append([dict(message) for message in messages])
+        return ChatCompletion.model_validate({
+            "id": "resp",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": f"Answer {len(self.requests)}"}
+            }]
+        })
+
+class FakeStreamingCompletions:
+    """Streams text and a tool call in the first response, then the answer"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, model, messages, **kwargs):
+        self.requests.append([dict(message) for message in messages])
+        if len(self.requests) == 1:
+            deltas = [
+                {"content": "Let me look. "},
+                {"tool_calls": [{"index": 0, "id": "call_1", "type": "function", "function": {"name": "analyze_document", "arguments": "{}"}}]}
+            ]
+        else:
+            deltas = [{"content": "Answer"}]
+        async def chunks():
+            for delta in deltas:
+                yield ChatCompletionChunk.model_validate({
+                    "id": "resp",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                })
+        return chunks()
+
+def test_session_bounds():
+    session = ChatSession(system_prompt="System", max_messages=4)
+    session.set_document("Invoice text")
+    prefix = session.history()
+
+    for i in range(3):
+        session.add_turn([
+            {"role": "user", "content": f"Question {i}"},
+            {"role": "assistant", "content": f"Answer {i}"}
+        ])
+
+    # Test the prefix is unchanged and the oldest turn was dropped
+    history = session.history()
+    assert history[:2] == prefix
+    assert session.turn_count == 2
+    assert history[2]["content"] == "Question 1"
+
+def test_session_store():
+    store = SessionStore(max_sessions=2)
+    first = store.create("System")
+
+    # Test sessions are resumable by id and new ids are issued for unknown ones
+    assert store.get_or_create(first.session_id) is first
+    assert store.get_or_create("unknown").session_id != "unknown"
+
+    # Test least recently used sessions are evicted
+    store.create("System")
+    assert store.get(first.session_id) is None
+
+    # Test expired sessions are dropped
+    expired = SessionStore(ttl=-1)
+    session = expired.create("System")
+    assert expired.get(session.session_id) is None
+
+@pytest.mark.asyncio
+async def test_agent_continues_session(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    agent = OpenAIAgent(model_name="gpt-4o-mini", api_key="test", system_prompt="System")
+    completions = FakeCompletions()
+    agent.async_client = type("FakeClient", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    session = ChatSession(system_prompt=agent.system_prompt)
+
+    context = {"document": {"text": "Invoice total: 42.00 EUR", "type": "application/pdf"}}
+    assert await agent.process_message("What is the total?", context, session=session) == "Answer 1"
+    assert await agent.process_message("And the currency?", session=session) == "Answer 2"
+
+    # Test the second request replays the first byte-for-byte and appends the new turn
+    first, second = completions.requests
+    assert second[:len(first)] == first
+    assert second[len(first)] == {"role": "assistant", "content": "Answer 1"}
+    assert second[-1] == {"role": "user", "content": "And the currency?"}
+    assert first[1]["content"] == "Document information: Invoice total: 42.00 EUR"
+
+@pytest.mark.asyncio
+async def test_streamed_message_keeps_text_before_tool_call(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    agent = OpenAIAgent(model_name="gpt-4o-mini", api_key="test", system_prompt="System")
+    completions = FakeStreamingCompletions()
+    agent.async_client = type("FakeClient", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    session = ChatSession(system_prompt=agent.system_prompt)
+
+    events = [event async for event in agent.stream_message("What is the total?", session=session)]
+    streamed = "".join(event["content"] for event in events if event["type"] == "delta")
+    assert streamed == "Let me look. Answer"
+    assert events[-1] == {"type": "message", "content": streamed}
+    assert session.history()[-1] == {"role": "assistant", "content": streamed}
+
+    # Test the text sent with the tool call is replayed to the model
+    assert completions.requests[1][-2]["content"] == "Let me look. "
@@ -0,0 +1,23 @@
+import sys
+import time
+from ..telemetry.startup import StartupTimer
+
+def test_startup_timer_records_imports_and_stages():
+    timer = StartupTimer()
+    sys.modules.pop("tabnanny", None)
+    finders = list(sys.meta_path)
+    timer.profile_imports()
+    try:
+        import tabnanny  # noqa: F401
+    finally:
+        timer.stop_profiling_imports()
+    assert sys.meta_path == finders
+
+    with timer.stage("warm"):
+        time.sleep(0.01)
+
+    # Test both the import and the stage show up in the report
+    report = timer.report()
+    assert "tabnanny" in report["imports_ms"]
+    assert report["stages_ms"]["warm"] >= 10
+    assert report["elapsed_ms"] >= report["stages_ms"]["warm"]
@@ -0,0 +1,98 @@
+import tiktoken
+from ..services import token_budget
+from ..services.token_budget import TokenBudget, get_context_limit, get_token_counter, load_encodings
+
+def make_conversation(turns: int):
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "system", "content": "Document information: " + "invoice line item " * 50}
+    ]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"Question {i}. " + "please check the totals " * 20})
+        messages.append({"role": "assistant", "content": f"Answer {i}. " + "the totals match " * 20})
+    messages.append({"role": "user", "content": "What is the invoice total?"})
+    return messages
+
+def test_context_limits():
+    assert get_context_limit("gpt-4o-mini") == 128_000
+    assert get_context_limit("openai/gpt-4") == 8_192
+    assert get_context_limit("unknown-model") == 8_192
+
+def test_message_counts_are_cached():
+    counter = get_token_counter("gpt-4o-mini")
+    message = {"role": "user", "content": "How many tokens is this?"}
+    count = counter.count_message(message)
+    assert count > 0
+    assert counter.count_message(dict(message)) == count
+    assert counter.count_messages([message, message]) > 2 * count
+
+def test_counting_never_loads_the_tokenizer(monkeypatch):
+    def no_download(name):
+        raise AssertionError("tokenizer loaded on the request path")
+    monkeypatch.setattr(tiktoken, "get_encoding", no_download)
+    monkeypatch.setattr(token_budget, "_encodings", {})
+
+    counter = token_budget.TokenCounter("gpt-4o-mini")
+    assert counter.count_text("x" * 40) == 10  # chars/4 estimate
+
+def test_load_encodings_fills_counters(monkeypatch):
+    class FakeEncoding:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+    loaded = []
+    def get_encoding(name):
+        loaded.append(name)
+        if name == "o200k_base":
+            raise OSError("offline")
+        return FakeEncoding()
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(token_budget, "_encodings", {})
+
+    assert load_encodings(["gpt-4o-mini", "unknown-model"]) == ["cl100k_base"]
+    assert sorted(loaded) == ["cl100k_base", "o200k_base"]
+    assert token_budget.TokenCounter("gpt-4").count_text("one two three") == 3
+    assert token_budget.TokenCounter("gpt-4o-mini").count_text("one two three") == 4
+
+def test_fit_drop_oldest():
+    messages = make_conversation(turns=10)
+    budget = TokenBudget("gpt-4o-mini", max_context_tokens=budget_size(messages), reserve_output_tokens=0)
+    fitted = budget.fit(messages)
+
+    # Test system messages and the current question are kept, oldest turns dropped
+    assert budget.count(fitted) <= budget.max_input_tokens
+    assert fitted[:2] == messages[:2]
+    assert fitted[-1] == messages[-1]
+    assert fitted[2]["content"].startswith("Question")
+    assert not any(m["content"].startswith("Question 0.") for m in fitted)
+    assert any(m["content"].startswith("Answer 9.") for m in fitted)
+
+    # Test prompts within budget are returned unchanged
+    assert TokenBudget("gpt-4o-mini").fit(messages) is messages
+
+def test_fit_summarize():
+    messages = make_conversation(turns=10)
+    budget = TokenBudget("gpt-4o-mini", policy="summarize", max_context_tokens=budget_size(messages), reserve_output_tokens=0)
+    fitted = budget.fit(messages)
+
+    assert budget.count(fitted) <= budget.max_input_tokens
+    assert fitted[2]["role"] == "system"
+    assert "Question 0." in fitted[2]["content"]
+
+def test_fit_truncates_oversized_context():
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "system", "content": "Document information: " + "page text " * 5000},
+        {"role": "user", "content": "Summarize the document."}
+    ]
+    budget = TokenBudget("gpt-4o-mini", max_context_tokens=1000, reserve_output_tokens=200)
+    fitted = budget.fit(messages)
+
+    # Test the document context is shortened, not the instructions or the question
+    assert budget.count(fitted) <= 800
+    assert fitted[0] == messages[0]
+    assert fitted[2] == messages[2]
+    assert fitted[1]["content"].endswith("[...]")
+
+def budget_size(messages) -> int:
+    """About half the size of the conversation"""
+    return get_token_counter("gpt-4o-mini").count_messages(messages) // 2
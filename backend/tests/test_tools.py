@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+from ..agents import tools
+
+class FakeBluDelta:
+    async def analyze_documents(self, doc_ids, prompt):
+        await asyncio.sleep(0)
+        return [{"index": i, "doc_id": doc_id, "result": {"prompt": prompt}} for i, doc_id in enumerate(doc_ids)]
+
+@pytest.mark.asyncio
+async def test_tools_run_on_the_app_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(tools, "bludelta_service", FakeBluDelta())
+    loop = asyncio.get_running_loop()
+
+    def call_from_worker():
+        # As smolagents does: a plain synchronous call from the agent's thread
+        tools.bind_event_loop(loop)
+        return tools.analyze_documents(doc_ids=["a", "b"], prompt="Extract")
+
+    result = await asyncio.to_thread(call_from_worker)
+    assert isinstance(result, list)
+    assert [item["doc_id"] for item in result] == ["a", "b"]
+
+    # Blocking on the loop from the loop itself would deadlock
+    tools.bind_event_loop(loop)
+    try:
+        with pytest.raises(RuntimeError):
+            tools.analyze_documents(doc_ids=["a"], prompt="Extract")
+    finally:
+        tools.bind_event_loop(None)
@@ -151,29 +151,20 @@ function App() {
       };
       setMessages(prev => [...prev, userMessage]);
 
-      // Prepare the request
-      const requestBody: any = {
-        content: inputText || "Please analyze this document",
-        role: 'user'
-      };
+      // Prepare the request as multipart form data so files are sent as raw bytes
+      const formData = new FormData();
+      formData.append('content', inputText || "Please analyze this document");
+      formData.append('role', 'user');
 
       // If there's a file, include it
       if (currentFile) {
-        const fileContent = await currentFile.arrayBuffer();
-        requestBody.file = {
-          content: Array.from(new Uint8Array(fileContent)),
-          type: currentFile.type,
-          name: currentFile.name
-        };
+        formData.append('file', currentFile, currentFile.name);
       }
 
-      // Send to backend
+      // Send to backend (the browser sets the multipart boundary header)
       const response = await fetch('/chat', {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(requestBody),
+        body: formData,
       });
 
       if (!response.ok) {